@@ -0,0 +1,7 @@
+"""Reproducible benchmarks for the morphological lexer.
+
+Run ``python -m benchmarks run`` to time tokenization, analysis and
+validation on seeded synthetic corpora, and ``python -m benchmarks compare``
+to flag regressions between two result files. ``python -m benchmarks
+startup`` times cold starts in fresh processes.
+"""
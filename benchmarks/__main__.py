@@ -0,0 +1,92 @@
+import argparse
+import json
+import sys
+
+from .compare import compare_results, format_comparison
+from .startup import compare_startup, format_startup, measure_startup
+from .suite import DEFAULT_SIZES, parse_size, run_benchmarks
+from .synthetic import SyntheticCorpus
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='run the benchmark suite')
+    run.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                     help='comma-separated corpus sizes (default: %(default)s)')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--camel', type=float, default=0.4,
+                     help='weight of camelCase identifiers')
+    run.add_argument('--snake', type=float, default=0.45,
+                     help='weight of snake_case identifiers')
+    run.add_argument('--constant', type=float, default=0.15,
+                     help='weight of CONSTANT_CASE identifiers')
+    run.add_argument('--affix-density', type=float, default=0.3)
+    run.add_argument('--error-rate', type=float, default=0.0005)
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--no-memory', action='store_true',
+                     help='skip the traced peak-memory runs')
+    run.add_argument('-o', '--output', help='write results JSON here')
+
+    compare = commands.add_parser('compare', help='compare two result files')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.10,
+                         help='allowed relative throughput drop')
+    compare.add_argument('--memory-threshold', type=float, default=0.10,
+                         help='allowed relative peak-memory growth')
+
+    startup = commands.add_parser(
+        'startup', help='time cold starts (import, first tokenize) in fresh processes')
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--baseline', help='earlier startup results to compare against')
+    startup.add_argument('--threshold', type=float, default=0.25,
+                         help='allowed relative slowdown')
+    startup.add_argument('-o', '--output', help='write results JSON here')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'startup':
+        document = measure_startup(repeat=args.repeat)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                handle.write(json.dumps(document, indent=4) + '\n')
+        baseline = document
+        if args.baseline:
+            with open(args.baseline) as handle:
+                baseline = json.load(handle)
+        rows = compare_startup(baseline, document, args.threshold)
+        print(format_startup(rows))
+        return 1 if any(row['regressed'] for row in rows) else 0
+
+    if args.command == 'run':
+        corpus = SyntheticCorpus(
+            seed=args.seed,
+            style_mix={'camelCase': args.camel, 'snake_case': args.snake,
+                       'CONSTANT_CASE': args.constant},
+            affix_density=args.affix_density, error_rate=args.error_rate)
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+        document = run_benchmarks(sizes, corpus, repeat=args.repeat,
+                                  memory=not args.no_memory,
+                                  progress=lambda line: print(line, file=sys.stderr))
+        text = json.dumps(document, indent=4)
+        if args.output:
+            with open(args.output, 'w') as handle:
+                handle.write(text + '\n')
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.current) as handle:
+        current = json.load(handle)
+    rows = compare_results(baseline, current, args.threshold, args.memory_threshold)
+    print(format_comparison(rows))
+    return 1 if any(row['regressions'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+
+from .suite import SCHEMA_VERSION
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.10,
+                    memory_threshold: float = 0.10) -> List[Dict]:
+    """
+    Compare two benchmark result documents stage by stage.
+
+    Args:
+        baseline (Dict): Earlier run
+        current (Dict): Run to check
+        threshold (float): Relative throughput drop flagged as a regression
+        memory_threshold (float): Relative peak-memory growth flagged as a
+            regression
+
+    Returns:
+        List[Dict]: One row per (stage, size) present in both runs, with
+        throughput and memory ratios and a 'regressions' list
+    """
+    for document in (baseline, current):
+        if document.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(
+                f"unsupported benchmark schema {document.get('schema_version')!r}, "
+                f"expected {SCHEMA_VERSION}")
+
+    previous = {(r['stage'], r['size_bytes']): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = previous.get((result['stage'], result['size_bytes']))
+        if old is None:
+            continue
+
+        throughput = _ratio(result['tokens_per_second'], old['tokens_per_second'])
+        memory = _ratio(result['peak_memory_mb'], old['peak_memory_mb'])
+        regressions = []
+        if throughput is not None and throughput < 1 - threshold:
+            regressions.append('throughput')
+        if memory is not None and memory > 1 + memory_threshold:
+            regressions.append('peak_memory')
+
+        rows.append({
+            'stage': result['stage'],
+            'size_bytes': result['size_bytes'],
+            'throughput_ratio': throughput,
+            'memory_ratio': memory,
+            'regressions': regressions
+        })
+    return rows
+
+
+def _ratio(new: Optional[float], old: Optional[float]) -> Optional[float]:
+    if new is None or not old:
+        return None
+    return new / old
+
+
+def format_comparison(rows: List[Dict]) -> str:
+    """Render comparison rows as a plain-text table"""
+    lines = [f"{'stage':<9} {'size':>12}  {'throughput':>10}  {'memory':>8}  status"]
+    for row in rows:
+        throughput = (f"{row['throughput_ratio']:.2f}x"
+                      if row['throughput_ratio'] is not None else '-')
+        memory = (f"{row['memory_ratio']:.2f}x"
+                  if row['memory_ratio'] is not None else '-')
+        status = ('REGRESSION: ' + ', '.join(row['regressions'])
+                  if row['regressions'] else 'ok')
+        lines.append(f"{row['stage']:<9} {row['size_bytes']:>12,}  "
+                     f"{throughput:>10}  {memory:>8}  {status}")
+    return '\n'.join(lines)
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Dict, List, Sequence
+import os
+import subprocess
+import sys
+import time
+
+from src import __version__
+
+from .suite import SCHEMA_VERSION, environment
+
+
+# Modules that importing the lexer and tokenizing a snippet must not load;
+# each is only needed by features a short-lived process rarely uses
+DEFERRED_MODULES = (
+    'tracemalloc', 'datetime', 'statistics', 'json', 'hashlib', 'tempfile',
+    'src.dfa', 'src.line_index', 'src.instrumentation', 'src.morpheme_dictionary'
+)
+
+METRICS = ('import_seconds', 'first_tokenize_seconds', 'process_seconds')
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter; prints the import and first-call times and
+# the deferred modules that got loaded anyway
+_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+from src.morphological_lexer import MorphologicalLexer
+imported = time.perf_counter()
+MorphologicalLexer().tokenize('processUserData = fetch(pre_processed_input) + 1')
+finished = time.perf_counter()
+loaded = [name for name in {modules!r} if name in sys.modules]
+print(imported - started, finished - imported, ','.join(loaded))
+"""
+
+
+def _run(arguments: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable] + arguments, cwd=_ROOT, check=True,
+                          stdout=subprocess.PIPE, universal_newlines=True)
+
+
+def measure_startup(repeat: int = 5) -> Dict:
+    """
+    Time cold starts: fresh interpreters that import the lexer, build one
+    and tokenize a short snippet.
+
+    Args:
+        repeat (int): Processes started per measurement; the fastest is
+            reported
+
+    Returns:
+        Dict: Versioned result document whose 'results' hold the import,
+        first tokenize and whole-process times (the latter minus a bare
+        interpreter start) and the deferred modules that were loaded
+    """
+    script = _SCRIPT.format(modules=DEFERRED_MODULES)
+    best = dict.fromkeys(METRICS + ('interpreter_seconds',), float('inf'))
+    loaded: Sequence[str] = ()
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _run(['-c', 'pass'])
+        best['interpreter_seconds'] = min(best['interpreter_seconds'],
+                                          time.perf_counter() - started)
+
+        started = time.perf_counter()
+        output = _run(['-c', script]).stdout.split(' ')
+        elapsed = time.perf_counter() - started
+        best['import_seconds'] = min(best['import_seconds'], float(output[0]))
+        best['first_tokenize_seconds'] = min(best['first_tokenize_seconds'], float(output[1]))
+        best['process_seconds'] = min(best['process_seconds'], elapsed)
+        loaded = [name for name in output[2].strip().split(',') if name]
+
+    best['process_seconds'] = max(0.0, best['process_seconds'] - best['interpreter_seconds'])
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'benchmark': 'startup',
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'library_version': __version__,
+        'environment': environment(),
+        'repeat': repeat,
+        'results': dict(best, deferred_modules_loaded=loaded)
+    }
+
+
+def compare_startup(baseline: Dict, current: Dict, threshold: float = 0.25,
+                    min_delta: float = 0.005) -> List[Dict]:
+    """
+    Compare two startup documents metric by metric.
+
+    Args:
+        baseline (Dict): Earlier run
+        current (Dict): Run to check
+        threshold (float): Relative slowdown flagged as a regression
+        min_delta (float): Slowdowns below this many seconds are treated
+            as noise
+
+    Returns:
+        List[Dict]: One row per metric with its 'ratio' (current over
+        baseline) and 'regressed'; a final 'deferred_modules_loaded' row
+        regresses whenever the current run loaded any deferred module
+    """
+    for document in (baseline, current):
+        if document.get('benchmark') != 'startup' or \
+                document.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError("not a startup result document of schema "
+                             f"{SCHEMA_VERSION}")
+
+    rows = []
+    for metric in METRICS:
+        old, new = baseline['results'][metric], current['results'][metric]
+        ratio = new / old if old else None
+        rows.append({'metric': metric, 'baseline': old, 'current': new, 'ratio': ratio,
+                     'regressed': (ratio is not None and ratio > 1 + threshold
+                                   and new - old >= min_delta)})
+
+    loaded = current['results']['deferred_modules_loaded']
+    rows.append({'metric': 'deferred_modules_loaded',
+                 'baseline': baseline['results']['deferred_modules_loaded'],
+                 'current': loaded, 'ratio': None, 'regressed': bool(loaded)})
+    return rows
+
+
+def format_startup(rows: List[Dict]) -> str:
+    """Human-readable table of compare_startup rows"""
+    lines = [f"{'metric':<24} {'baseline':>12} {'current':>12} {'ratio':>7}"]
+    for row in rows:
+        if row['metric'] == 'deferred_modules_loaded':
+            baseline, current = (','.join(row[key]) or '-' for key in ('baseline', 'current'))
+            ratio = ''
+        else:
+            baseline, current = (f"{row[key] * 1000:.1f}ms" for key in ('baseline', 'current'))
+            ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else '-'
+        flag = '  REGRESSION' if row['regressed'] else ''
+        lines.append(f"{row['metric']:<24} {baseline:>12} {current:>12} {ratio:>7}{flag}")
+    return '\n'.join(lines)
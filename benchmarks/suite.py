@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+import gc
+import platform
+import re
+import time
+import tracemalloc
+
+from src import __version__
+from src.morphological_lexer import MorphologicalLexer
+from src.result_analyzer import ResultAnalyzer
+from src.validation_framework import ValidationFramework
+
+from .synthetic import SyntheticCorpus
+
+
+# Bump when the layout of result files changes incompatibly
+SCHEMA_VERSION = 1
+
+STAGES = ('tokenize', 'analyze', 'validate')
+DEFAULT_SIZES = ('1KB', '10KB', '100KB', '1MB', '10MB', '100MB')
+
+_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes such as '512', '10KB' or '1.5MB' into bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*', text.upper())
+    if not match:
+        raise ValueError(f"invalid size: {text!r}")
+    return int(float(match.group(1)) * _UNITS[match.group(2) or 'B'])
+
+
+def environment() -> Dict[str, str]:
+    """Interpreter and platform details recorded with every result file"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine()
+    }
+
+
+def _measure(stage: Callable[[], object], repeat: int,
+             memory: bool) -> Tuple[float, float, object]:
+    """
+    Time a stage (best of ``repeat`` runs) and optionally measure its peak
+    traced memory in one extra run, so tracing never skews the timings.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        start = time.perf_counter()
+        result = stage()
+        best = min(best, time.perf_counter() - start)
+
+    peak = None
+    if memory:
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = stage()
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def run_benchmarks(sizes: Sequence[int], corpus: SyntheticCorpus,
+                   repeat: int = 3, memory: bool = True,
+                   progress: Callable[[str], None] = None) -> Dict:
+    """
+    Benchmark tokenize, analyze_tokens and validate_tokens separately.
+
+    Args:
+        sizes (Sequence[int]): Corpus sizes in bytes
+        corpus (SyntheticCorpus): Generator for the input text
+        repeat (int): Timed runs per stage; the fastest is reported
+        memory (bool): Also measure peak traced memory per stage
+        progress (Callable[[str], None]): Optional progress callback
+
+    Returns:
+        Dict: Versioned result document, see SCHEMA_VERSION
+    """
+    results: List[Dict] = []
+
+    for size in sizes:
+        code = corpus.generate(size)
+        lexer = MorphologicalLexer(metrics_level='off')
+        analyzer = ResultAnalyzer()
+        validator = ValidationFramework()
+
+        seconds, peak, tokens = _measure(lambda: lexer.tokenize(code), repeat, memory)
+        timings = [('tokenize', seconds, peak)]
+        for name, stage in (('analyze', lambda: analyzer.analyze_tokens(tokens)),
+                            ('validate', lambda: validator.validate_tokens(tokens))):
+            seconds, peak, _ = _measure(stage, repeat, memory)
+            timings.append((name, seconds, peak))
+
+        for name, seconds, peak in timings:
+            results.append({
+                'stage': name,
+                'size_bytes': size,
+                'tokens': len(tokens),
+                'seconds': seconds,
+                'tokens_per_second': len(tokens) / seconds if seconds else None,
+                'bytes_per_second': len(code) / seconds if seconds else None,
+                'peak_memory_mb': peak
+            })
+            if progress:
+                progress(f"{name:<9} {size:>12,} B  {len(tokens) / seconds:>12,.0f} tok/s"
+                         + (f"  {peak:>9.2f} MB" if peak is not None else ''))
+        del tokens
+
+    return {
+        'schema_version': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'library_version': __version__,
+        'environment': environment(),
+        'corpus': corpus.config(),
+        'repeat': repeat,
+        'results': results
+    }
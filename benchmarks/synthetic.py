@@ -0,0 +1,125 @@
+from typing import Dict, List, Optional
+import random
+
+
+# Word stock for identifier roots
+WORDS = [
+    'user', 'data', 'process', 'value', 'result', 'input', 'output', 'count',
+    'item', 'config', 'handle', 'request', 'response', 'buffer', 'token',
+    'parse', 'load', 'store', 'cache', 'index', 'record', 'stream', 'file',
+    'path', 'name', 'total', 'state', 'event', 'order', 'account', 'session',
+    'validate', 'compute', 'render', 'update', 'create', 'delete', 'query'
+]
+
+# Affixes the lexer's default morpheme_patterns recognizes
+PREFIXES = ['un', 'pre', 'post', 'sub', 'super', 'inter']
+SUFFIXES = ['able', 'ible', 'er', 'or', 'tion', 'sion', 'ment']
+
+KEYWORDS = ['def', 'class', 'return', 'if', 'while', 'for', 'import', 'from', 'as']
+OPERATORS = ['=', '+', '-', '*', '/', '==', '<', '>', '+=', '!=']
+ERROR_CHARACTERS = '@#$?`~'
+
+DEFAULT_STYLE_MIX = {'camelCase': 0.4, 'snake_case': 0.45, 'CONSTANT_CASE': 0.15}
+
+
+class SyntheticCorpus:
+    """
+    Seeded generator of Python-like source text.
+
+    The same seed and settings always produce the same text, so benchmark
+    runs on different machines or commits measure identical input.
+    """
+
+    def __init__(self, seed: int = 0,
+                 style_mix: Optional[Dict[str, float]] = None,
+                 affix_density: float = 0.3, error_rate: float = 0.0005):
+        """
+        Args:
+            seed (int): Random seed
+            style_mix (Optional[Dict[str, float]]): Relative weights of
+                camelCase, snake_case and CONSTANT_CASE identifiers
+            affix_density (float): Probability that an identifier word gets
+                a known prefix or suffix
+            error_rate (float): Probability per line of an unrecognized
+                character (e.g. '@')
+        """
+        self.seed = seed
+        self.style_mix = dict(style_mix or DEFAULT_STYLE_MIX)
+        self.affix_density = affix_density
+        self.error_rate = error_rate
+
+    def config(self) -> Dict:
+        """Settings that determine the generated text"""
+        return {
+            'seed': self.seed,
+            'style_mix': self.style_mix,
+            'affix_density': self.affix_density,
+            'error_rate': self.error_rate
+        }
+
+    def generate(self, size: int) -> str:
+        """
+        Generate roughly ``size`` characters of source (never less).
+
+        Args:
+            size (int): Target size in characters
+
+        Returns:
+            str: Generated source
+        """
+        rng = random.Random(f"{self.seed}:{size}")
+        styles = list(self.style_mix)
+        weights = [self.style_mix[style] for style in styles]
+
+        lines: List[str] = []
+        length = 0
+        while length < size:
+            line = self._line(rng, styles, weights)
+            if rng.random() < self.error_rate:
+                position = rng.randrange(len(line) + 1)
+                line = line[:position] + rng.choice(ERROR_CHARACTERS) + line[position:]
+            lines.append(line)
+            length += len(line) + 1
+        return '\n'.join(lines) + '\n'
+
+    def _identifier(self, rng: random.Random, styles: List[str],
+                    weights: List[float]) -> str:
+        words = []
+        for _ in range(rng.randint(1, 3)):
+            word = rng.choice(WORDS)
+            if rng.random() < self.affix_density:
+                if rng.random() < 0.5:
+                    word = rng.choice(PREFIXES) + word
+                else:
+                    word = word + rng.choice(SUFFIXES)
+            words.append(word)
+
+        style = rng.choices(styles, weights)[0]
+        if style == 'camelCase':
+            return words[0] + ''.join(w.capitalize() for w in words[1:])
+        if style == 'CONSTANT_CASE':
+            return '_'.join(words).upper()
+        return '_'.join(words)
+
+    def _line(self, rng: random.Random, styles: List[str],
+              weights: List[float]) -> str:
+        ident = lambda: self._identifier(rng, styles, weights)
+        indent = '    ' * rng.randint(0, 2)
+        kind = rng.random()
+
+        if kind < 0.1:
+            params = ', '.join(ident() for _ in range(rng.randint(0, 3)))
+            return f"def {ident()}({params}):"
+        if kind < 0.15:
+            return f"class {ident()}:"
+        if kind < 0.25:
+            return f"{indent}return {ident()} {rng.choice(OPERATORS)} {rng.randint(0, 999)}"
+        if kind < 0.35:
+            return f"{indent}if {ident()} > {rng.random() * 100:.2f}:"
+        if kind < 0.45:
+            return f'{indent}{ident()} = "{" ".join(rng.sample(WORDS, 3))}"'
+        if kind < 0.55:
+            return f"{indent}for {ident()} in {ident()}:"
+        args = ', '.join(ident() for _ in range(rng.randint(1, 3)))
+        return (f"{indent}{ident()} {rng.choice(OPERATORS)} "
+                f"{ident()}({args}) {rng.choice(OPERATORS)} [{rng.randint(0, 9)}]")
@@ -1,10 +1,14 @@
+from src.corpus import CorpusAnalyzer, CorpusReport, DEFAULT_EXTENSIONS, STAGES, check_stages
 from src.morphological_lexer import MorphologicalLexer
 from src.result_analyzer import ResultAnalyzer
 from src.validation_framework import ValidationFramework
+from src.watch import CorpusWatcher
+import argparse
+import json
 import sys
 
 
-def main():
+def run_demo():
     # Initialize components
     lexer = MorphologicalLexer()
     analyzer = ResultAnalyzer()
@@ -62,5 +66,140 @@ def main():
         print(f"{metric}: {value}")
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Morphological lexical analysis of source files. "
+                    "Without paths, runs a demo on a built-in sample.")
+    parser.add_argument('paths', nargs='*',
+                        help="files, directories or glob patterns; '-' reads stdin")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help="comma-separated stages to run (default: %(default)s)")
+    parser.add_argument('--format', choices=('ndjson', 'report'), default='ndjson',
+                        help="one JSON object per file, or one aggregated report")
+    parser.add_argument('-o', '--output', help="write output here instead of stdout")
+    parser.add_argument('--extensions', default=','.join(DEFAULT_EXTENSIONS),
+                        help="extensions collected from directories (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=32,
+                        help="files handed to a worker at a time")
+    parser.add_argument('--cache', metavar='PATH',
+                        help="SQLite result cache; unchanged files are not re-analyzed")
+    parser.add_argument('--cache-size', type=int, default=256, metavar='MB',
+                        help="size budget of the result cache (default: %(default)s)")
+    parser.add_argument('--prometheus', metavar='PATH',
+                        help="write per-phase timings and counters in Prometheus text format")
+    parser.add_argument('--fail-on-violations', action='store_true',
+                        help="exit with status 1 if any validation rule fails")
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="poll the paths every SECONDS and write an updated report "
+                             "(one JSON object per line) whenever files change")
+    return parser.parse_args(argv)
+
+
+def file_record(result):
+    """JSON-ready record for one per-file result"""
+    if 'error' in result:
+        return {'file': result['file'], 'error': result['error']}
+
+    record = {
+        'file': result['file'],
+        'tokens': result['tokens'],
+        'unrecognized': result['unrecognized']
+    }
+    if 'cached' in result:
+        record['cached'] = result['cached']
+    if 'analyzer' in result:
+        record['analysis'] = result['analyzer'].snapshot()
+    if 'violations' in result:
+        record['validation'] = {
+            rule: {'valid': not violations, 'violations': violations}
+            for rule, violations in result['violations'].items()
+        }
+    return record
+
+
+def run_batch(args):
+    try:
+        stages = check_stages(stage.strip() for stage in args.stages.split(',') if stage.strip())
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+    corpus = CorpusAnalyzer(workers=args.workers,
+                            extensions=[ext.strip() for ext in args.extensions.split(',')],
+                            cache_path=args.cache, cache_size=args.cache_size << 20,
+                            instrument=bool(args.prometheus))
+    report = CorpusReport(stages)
+    files = errors = violations = 0
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for batch in corpus.iter_batches(args.paths, stages, args.batch_size):
+            report.add_lexer_stats(batch)
+            for result in batch['results']:
+                if 'error' in result:
+                    errors += 1
+                else:
+                    files += 1
+                    violations += sum(map(len, result.get('violations', {}).values()))
+
+                if args.format == 'ndjson':
+                    output.write(json.dumps(file_record(result), default=str) + '\n')
+                else:
+                    report.add_file(result)
+            output.flush()
+
+        if args.format == 'report':
+            json.dump(report.compile(), output, indent=2, default=str)
+            output.write('\n')
+        if args.prometheus:
+            report.instrumentation.write_prometheus(args.prometheus)
+    except FileNotFoundError as exc:
+        print(f"error: no such file, directory or match: {exc}", file=sys.stderr)
+        return 2
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Analyzed {files} files: {violations} violations, {errors} unreadable",
+          file=sys.stderr)
+    if errors or (args.fail_on_violations and violations):
+        return 1
+    return 0
+
+
+def run_watch(args, polls=None):
+    watcher = CorpusWatcher(args.paths,
+                            extensions=[ext.strip() for ext in args.extensions.split(',')],
+                            workers=args.workers, batch_size=args.batch_size,
+                            cache_path=args.cache, cache_size=args.cache_size << 20)
+    output = open(args.output, 'a') if args.output else sys.stdout
+    try:
+        for changes in watcher.watch(args.watch, polls):
+            report = dict(watcher.report(), changes=changes)
+            output.write(json.dumps(report, default=str) + '\n')
+            output.flush()
+    except FileNotFoundError as exc:
+        print(f"error: no such file, directory or match: {exc}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.paths:
+        run_demo()
+        return 0
+    if args.watch is not None:
+        return run_watch(args)
+    return run_batch(args)
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
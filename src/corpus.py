@@ -0,0 +1,474 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from collections import Counter
+from functools import partial
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence
+import glob
+import os
+import sys
+
+from .instrumentation import Instrumentation
+from .metrics import METRICS_OFF
+from .morphological_lexer import MorphologicalLexer
+from .result_analyzer import ResultAnalyzer
+from .result_cache import DEFAULT_MAX_BYTES, ResultCache
+from .symbols import shared_symbols
+from .token_buffer import TokenBuffer
+from .validation_framework import ValidationFramework
+
+
+# File extensions picked up when a directory is given
+DEFAULT_EXTENSIONS = ('.py',)
+
+# Pipeline stages; tokenization always runs since the others need tokens
+STAGES = ('tokenize', 'analyze', 'validate')
+
+
+def collect_files(paths: Iterable[str],
+                  extensions: Sequence[str] = DEFAULT_EXTENSIONS) -> List[str]:
+    """
+    Expand files, directories and glob patterns into a sorted list of
+    source files.
+
+    Args:
+        paths (Iterable[str]): Files, directories and/or glob patterns
+            (``**`` matches recursively)
+        extensions (Sequence[str]): Extensions collected from directories;
+            explicitly listed or glob-matched files are always kept
+
+    Returns:
+        List[str]: Unique file paths
+    """
+    files = set()
+    for path in paths:
+        if not os.path.exists(path) and glob.has_magic(path):
+            matches = glob.glob(path, recursive=True)
+            if not matches:
+                raise FileNotFoundError(path)
+            files.update(collect_files(matches, extensions))
+        elif os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in names:
+                    if name.endswith(tuple(extensions)):
+                        files.add(os.path.join(root, name))
+        elif os.path.isfile(path):
+            files.add(path)
+        else:
+            raise FileNotFoundError(path)
+    return sorted(files)
+
+
+def check_stages(stages: Iterable[str]) -> tuple:
+    """Validate stage names, returning them in pipeline order"""
+    stages = set(stages)
+    unknown = stages.difference(STAGES)
+    if unknown:
+        raise ValueError(f"unknown stages: {', '.join(sorted(unknown))}; "
+                         f"expected any of {', '.join(STAGES)}")
+    return tuple(stage for stage in STAGES if stage in stages or stage == 'tokenize')
+
+
+def analyze_source(code: str, lexer: MorphologicalLexer,
+                   validator: Optional[ValidationFramework] = None,
+                   stages: Sequence[str] = STAGES,
+                   cache: Optional[ResultCache] = None) -> Dict:
+    """
+    Run the selected stages over one source text.
+
+    Args:
+        code (str): Source text
+        lexer (MorphologicalLexer): Lexer to tokenize with
+        validator (Optional[ValidationFramework]): Validator, created when
+            the validate stage runs and none is given
+        stages (Sequence[str]): Stages to run, see STAGES
+        cache (Optional[ResultCache]): Cache consulted before, and filled
+            after, running the stages, unless the validator has rules the
+            cache cannot identify. A hit adds the stored token and
+            error counts and tokenize time to the lexer's metrics, so
+            cached and fresh runs report the same totals; memory usage and
+            error span details only cover files actually tokenized.
+
+    Returns:
+        Dict: 'tokens' and 'unrecognized' counts, 'lexing_time' (seconds,
+        None when the lexer collects no metrics), plus an 'analyzer'
+        (ResultAnalyzer) and 'violations' per rule for the stages run, and
+        'cached' when a cache is given
+    """
+    if 'validate' in stages:
+        validator = validator or ValidationFramework()
+    else:
+        validator = None
+
+    key = cache.key(code, lexer, stages, validator) if cache is not None else None
+    if key is not None:
+        result = cache.get(key)
+        if result is not None:
+            lexer.token_count += result['tokens']
+            lexer.error_count += result['unrecognized']
+            if result['lexing_time'] is not None and lexer.metrics_level != METRICS_OFF:
+                lexer.metrics['processing_time'].add(result['lexing_time'])
+            result['cached'] = True
+            return result
+
+    errors_before = lexer.error_count
+    processing_time = lexer.metrics['processing_time']
+    runs_before, time_before = processing_time.count, processing_time.total
+    tokens = lexer.tokenize(code)
+    result = {
+        'tokens': len(tokens),
+        'unrecognized': lexer.error_count - errors_before,
+        'lexing_time': (processing_time.total - time_before
+                        if processing_time.count > runs_before else None)
+    }
+
+    if 'analyze' in stages:
+        # Count the lexer's morpheme ids directly when it attaches them
+        symbols = shared_symbols() if lexer.intern_morphemes else None
+        result['analyzer'] = ResultAnalyzer(lexer.instrumentation,
+                                            symbols=symbols).update(tokens)
+    if validator is not None:
+        result['violations'] = {
+            rule: outcome['violations']
+            for rule, outcome in validator.validate_tokens(tokens).items()
+        }
+
+    if cache is not None:
+        if key is not None:
+            cache.put(key, result, TokenBuffer.from_tokens(tokens, code))
+        result['cached'] = False
+    return result
+
+
+def _open_cache(cache_path: Optional[str], cache_size: int) -> Optional[ResultCache]:
+    return ResultCache(cache_path, cache_size) if cache_path else None
+
+
+def _read_source(path: str) -> str:
+    """Read a source file, or standard input for '-'"""
+    if path == '-':
+        return sys.stdin.read()
+    with open(path, encoding='utf-8', errors='replace') as source:
+        return source.read()
+
+
+def _analyze_batch(files: List[str], stages: Sequence[str],
+                   cache_path: Optional[str] = None,
+                   cache_size: int = DEFAULT_MAX_BYTES,
+                   instrument: bool = False) -> Dict:
+    """
+    Run the selected stages over each file of a batch.
+
+    Runs in a worker process; returns one result per file (see
+    analyze_source, with 'file' added, or 'file' and 'error' for unreadable
+    files) along with the batch's raw lexer metrics and, when instrumented,
+    its Instrumentation. A path of '-' reads standard input, which only
+    works in the parent process.
+    """
+    instrumentation = Instrumentation() if instrument else None
+    lexer = MorphologicalLexer(instrumentation=instrumentation)
+    validator = ValidationFramework(instrumentation)
+    cache = _open_cache(cache_path, cache_size)
+    results = []
+
+    try:
+        for path in files:
+            try:
+                code = _read_source(path)
+            except OSError as exc:
+                results.append({'file': path, 'error': str(exc)})
+                continue
+            result = analyze_source(code, lexer, validator, stages, cache)
+            result['file'] = path
+            results.append(result)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    batch = {
+        'results': results,
+        'metrics': lexer.metrics,
+        'token_count': lexer.token_count,
+        'error_count': lexer.error_count,
+        'identifier_cache': lexer.identifier_cache.stats()
+    }
+    if cache is not None:
+        batch['result_cache'] = cache.stats()
+    if instrumentation is not None:
+        batch['instrumentation'] = instrumentation
+    return batch
+
+
+def _analyze_shard(files: List[str], cache_path: Optional[str] = None,
+                   cache_size: int = DEFAULT_MAX_BYTES) -> Dict:
+    """
+    Tokenize, analyze and validate one shard of files.
+
+    Runs in a worker process; returns a mergeable ResultAnalyzer and raw
+    metric series rather than per-file reports so the parent can combine
+    shards exactly. As a one-off batch job it interns morphemes in the
+    process-wide SymbolTable, so analyzers count the lexer's ids directly.
+    """
+    lexer = MorphologicalLexer(intern_morphemes=True)
+    analyzer = ResultAnalyzer(symbols=shared_symbols())
+    validator = ValidationFramework()
+    cache = _open_cache(cache_path, cache_size)
+
+    shard = {
+        'files': 0,
+        'violations': {},
+        'errors': []
+    }
+
+    try:
+        for path in files:
+            try:
+                code = _read_source(path)
+            except OSError as exc:
+                shard['errors'].append({'file': path, 'error': str(exc)})
+                continue
+
+            result = analyze_source(code, lexer, validator, STAGES, cache)
+            analyzer.merge(result['analyzer'])
+            shard['files'] += 1
+
+            for rule, violations in result['violations'].items():
+                shard['violations'].setdefault(rule, []).extend(
+                    dict(violation, file=path) for violation in violations)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    shard['analyzer'] = analyzer
+    shard['metrics'] = lexer.metrics
+    shard['token_count'] = lexer.token_count
+    shard['error_count'] = lexer.error_count
+    shard['identifier_cache'] = lexer.identifier_cache.stats()
+    if cache is not None:
+        shard['result_cache'] = cache.stats()
+    return shard
+
+
+class CorpusAnalyzer:
+    """Analyze many files in parallel and merge the results into one report"""
+
+    def __init__(self, workers: Optional[int] = None,
+                 extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+                 shards_per_worker: int = 4, cache_path: Optional[str] = None,
+                 cache_size: int = DEFAULT_MAX_BYTES, instrument: bool = False):
+        """
+        Args:
+            workers (Optional[int]): Worker processes (defaults to the CPU
+                count); 1 analyzes in the current process
+            extensions (Sequence[str]): Extensions collected from directories
+            shards_per_worker (int): Shards created per worker, for balancing
+            cache_path (Optional[str]): ResultCache database shared by the
+                workers; unchanged files are then not re-analyzed
+            cache_size (int): Size budget of the cache in bytes
+            instrument (bool): Record Instrumentation spans and counters in
+                the workers of iter_batches, merged by CorpusReport
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.extensions = tuple(extensions)
+        self.shards_per_worker = max(1, shards_per_worker)
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.instrument = instrument
+
+    def analyze(self, paths: Iterable[str]) -> Dict:
+        """
+        Analyze all files under paths.
+
+        Args:
+            paths (Iterable[str]): Files and/or directories
+
+        Returns:
+            Dict: Report with the keys of ResultAnalyzer.analyze_tokens plus
+            'files_analyzed', 'validation', 'lexer_metrics', 'errors' and,
+            with a cache, 'result_cache' hit/miss counts
+        """
+        files = collect_files(paths, self.extensions)
+        shards = self._make_shards(files)
+
+        analyze_shard = partial(_analyze_shard, cache_path=self.cache_path,
+                                cache_size=self.cache_size)
+        if self.workers == 1 or len(shards) <= 1:
+            results = [analyze_shard(shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = list(executor.map(analyze_shard, shards))
+
+        return self._compile_report(results)
+
+    def iter_batches(self, paths: Iterable[str], stages: Sequence[str] = STAGES,
+                     batch_size: int = 32) -> Iterator[Dict]:
+        """
+        Analyze files in batches, yielding each batch as soon as it finishes.
+
+        Batches are yielded in completion order, not file order, and only a
+        bounded number are in flight at once, so per-file results can be
+        written out without holding the whole corpus in memory.
+
+        Args:
+            paths (Iterable[str]): Files, directories and/or glob patterns;
+                '-' reads standard input in the current process
+            stages (Sequence[str]): Stages to run, see STAGES
+            batch_size (int): Files per batch handed to a worker
+
+        Returns:
+            Iterator[Dict]: Batches with per-file 'results' and raw lexer
+            metrics, as returned by the worker
+        """
+        stages = check_stages(stages)
+        paths = list(paths)
+        files = collect_files([path for path in paths if path != '-'], self.extensions)
+        analyze_batch = partial(_analyze_batch, stages=stages,
+                                cache_path=self.cache_path,
+                                cache_size=self.cache_size,
+                                instrument=self.instrument)
+        if '-' in paths:
+            yield analyze_batch(['-'])
+        batch_size = max(1, batch_size)
+        batches = (files[i:i + batch_size] for i in range(0, len(files), batch_size))
+
+        if self.workers == 1 or len(files) <= batch_size:
+            for batch in batches:
+                yield analyze_batch(batch)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            for batch in batches:
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(executor.submit(analyze_batch, batch))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def _make_shards(self, files: List[str]) -> List[List[str]]:
+        """Split files into shards of roughly equal total size"""
+        shard_count = min(len(files), self.workers * self.shards_per_worker)
+        if shard_count == 0:
+            return []
+
+        shards = [[] for _ in range(shard_count)]
+        loads = [0] * shard_count
+
+        # Largest files first, each to the currently lightest shard
+        sized = sorted(((self._file_size(path), path) for path in files),
+                       reverse=True)
+        for size, path in sized:
+            lightest = loads.index(min(loads))
+            shards[lightest].append(path)
+            loads[lightest] += size
+
+        return [shard for shard in shards if shard]
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _compile_report(self, results: List[Dict]) -> Dict:
+        """Merge per-shard results into a single report"""
+        report = CorpusReport()
+        for shard in results:
+            report.add(shard['files'], shard['analyzer'], shard['violations'],
+                       shard['errors'])
+            report.add_lexer_stats(shard)
+        return report.compile()
+
+
+class CorpusReport:
+    """Incrementally merged corpus report"""
+
+    def __init__(self, stages: Sequence[str] = STAGES):
+        """
+        Args:
+            stages (Sequence[str]): Stages that were run; analysis and
+                validation sections are only reported for their stages
+        """
+        self.stages = check_stages(stages)
+        self.analyzer = ResultAnalyzer()
+        self.files = 0
+        self.violations: Dict[str, List[Dict]] = {}
+        self.errors: List[Dict] = []
+
+        # Merged lexer metrics, reported through get_metrics
+        self.lexer = MorphologicalLexer()
+        self.cache_stats = Counter()
+        self.result_cache_stats: Optional[Counter] = None
+        self.instrumentation = Instrumentation()
+
+    def add(self, files: int, analyzer: Optional[ResultAnalyzer] = None,
+            violations: Optional[Dict[str, List[Dict]]] = None,
+            errors: Iterable[Dict] = ()) -> None:
+        """Fold in the results for some files"""
+        self.files += files
+        self.errors.extend(errors)
+        if analyzer is not None:
+            self.analyzer.merge(analyzer)
+        for rule, rule_violations in (violations or {}).items():
+            self.violations.setdefault(rule, []).extend(rule_violations)
+
+    def add_file(self, result: Dict) -> None:
+        """Fold in one per-file result from CorpusAnalyzer.iter_batches"""
+        if 'error' in result:
+            self.add(0, errors=[{'file': result['file'], 'error': result['error']}])
+            return
+        violations = {
+            rule: [dict(violation, file=result['file']) for violation in rule_violations]
+            for rule, rule_violations in result.get('violations', {}).items()
+        }
+        self.add(1, result.get('analyzer'), violations)
+
+    def add_lexer_stats(self, stats: Dict) -> None:
+        """Fold in the raw lexer metrics of a shard or batch"""
+        for name, series in stats['metrics'].items():
+            self.lexer.metrics[name].merge(series)
+        self.lexer.token_count += stats['token_count']
+        self.lexer.error_count += stats['error_count']
+        self.cache_stats.update({key: value
+                                 for key, value in stats['identifier_cache'].items()
+                                 if key != 'maxsize'})
+        if 'instrumentation' in stats:
+            self.instrumentation.merge(stats['instrumentation'])
+        if 'result_cache' in stats:
+            if self.result_cache_stats is None:
+                self.result_cache_stats = Counter()
+            self.result_cache_stats.update(stats['result_cache'])
+
+    def compile(self) -> Dict:
+        """
+        Build the report.
+
+        Returns:
+            Dict: The keys of ResultAnalyzer.analyze_tokens (analyze stage)
+            plus 'files_analyzed', 'validation' (validate stage),
+            'lexer_metrics', 'result_cache' (when caching) and 'errors'
+        """
+        report = {}
+        if 'analyze' in self.stages:
+            if self.analyzer.analysis_timestamp is None:
+                self.analyzer.analysis_timestamp = datetime.now()
+            report = self.analyzer.snapshot()
+        report['files_analyzed'] = self.files
+        if 'validate' in self.stages:
+            report['validation'] = {
+                rule: {'valid': not rule_violations, 'violations': rule_violations}
+                for rule, rule_violations in self.violations.items()
+            }
+        lexer_metrics = self.lexer.get_metrics()
+        if lexer_metrics:
+            lexer_metrics['identifier_cache'] = dict(self.cache_stats)
+        report['lexer_metrics'] = lexer_metrics
+        if self.result_cache_stats is not None:
+            report['result_cache'] = dict(self.result_cache_stats)
+        report['errors'] = self.errors
+        return report
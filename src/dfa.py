@@ -0,0 +1,635 @@
+from bisect import bisect_right
+from typing import List, Dict, Optional, Iterator, Tuple, Any
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Bump whenever the table layout or the compiler's output changes
+TABLE_FORMAT = 1
+
+# Blocks of characters classified at a time by finditer
+CLASSIFY_BLOCK = 1 << 16
+
+# Category flags of a character, combined into a 3-bit code for non-ASCII
+# characters whose membership in a character set depends only on them
+_DIGIT, _SPACE, _WORD = 1, 2, 4
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: (_DIGIT, False),
+    sre_parse.CATEGORY_NOT_DIGIT: (_DIGIT, True),
+    sre_parse.CATEGORY_SPACE: (_SPACE, False),
+    sre_parse.CATEGORY_NOT_SPACE: (_SPACE, True),
+    sre_parse.CATEGORY_WORD: (_WORD, False),
+    sre_parse.CATEGORY_NOT_WORD: (_WORD, True)
+}
+
+_UNSUPPORTED_FLAGS = (sre_parse.SRE_FLAG_IGNORECASE | sre_parse.SRE_FLAG_LOCALE
+                      | sre_parse.SRE_FLAG_ASCII)
+
+
+def _category_flags(char: str) -> int:
+    """Digit/space/word flags of a character, as re defines them for str"""
+    return ((_DIGIT if char.isdecimal() else 0)
+            | (_SPACE if char.isspace() else 0)
+            | (_WORD if char.isalnum() or char == '_' else 0))
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class _CharSet:
+    """Set of characters: code point ranges and categories, maybe negated"""
+    __slots__ = ('negate', 'ranges', 'categories')
+
+    def __init__(self, negate: bool = False):
+        self.negate = negate
+        self.ranges: List[Tuple[int, int]] = []
+        self.categories: List[Tuple[int, bool]] = []
+
+    def contains(self, code: int, flags: int) -> bool:
+        found = (any(low <= code <= high for low, high in self.ranges)
+                 or any(bool(flags & flag) != negated for flag, negated in self.categories))
+        return found != self.negate
+
+
+class _NFA:
+    """Thompson NFA: epsilon edges and character set edges per state"""
+
+    def __init__(self):
+        self.epsilon: List[List[int]] = []
+        self.edges: List[List[Tuple[int, int]]] = []
+        self.charsets: List[_CharSet] = []
+
+    def state(self) -> int:
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.epsilon) - 1
+
+    def charset(self, charset: _CharSet) -> int:
+        self.charsets.append(charset)
+        return len(self.charsets) - 1
+
+
+class CompiledDFA:
+    """
+    Deterministic state-transition table compiled from a token pattern set.
+
+    Matches the longest token at each position; when several patterns
+    match the same longest text, the one declared first wins (keywords
+    before identifiers). Scanning takes time linear in the input, with no
+    backtracking. ``finditer`` and ``match`` mirror the methods of the
+    master regex, returning DFAMatch objects whose ``lastgroup`` is the
+    token type.
+    """
+
+    def __init__(self, table: Dict[str, Any]):
+        """
+        Args:
+            table (Dict[str, Any]): Table as built by compile_dfa or loaded
+                from its JSON form
+        """
+        if table.get('format') != TABLE_FORMAT:
+            raise ValueError(f"unsupported DFA table format {table.get('format')!r}")
+        self.table = table
+        self.names: List[str] = table['names']
+        self.transitions: List[List[int]] = table['transitions']
+        self.accepts: List[List[int]] = table['accepts']
+        self.start_state: int = table['start']
+        self.boundaries: List[Tuple[bool, bool]] = [tuple(flags) for flags in table['boundaries']]
+        self._asserting = any(before or after for before, after in self.boundaries)
+        self._points: List[int] = table['points']
+        self._unicode: List[List[int]] = table['unicode']
+        self._classify = _ClassMap(self)
+
+        # Per state with self-loops, a translation of input classes to 0
+        # (stays in the state) or 1, so runs such as identifier bodies or
+        # whitespace are skipped with one bytes.find
+        self._loops: List[Optional[bytes]] = []
+        for row in self.transitions:
+            state = len(self._loops)
+            loops = state and any(target == state for target in row)
+            self._loops.append(bytes(int(target != state) for target in row).ljust(256, b'\x01')
+                               if loops else None)
+
+        # Input classes to 1 if some token can start with them, so runs of
+        # unrecognized characters are skipped with one bytes.find as well
+        self._starts = bytes(int(target != 0)
+                             for target in self.transitions[self.start_state]).ljust(256, b'\x00')
+
+    @property
+    def state_count(self) -> int:
+        """Number of states, including the dead state 0"""
+        return len(self.transitions)
+
+    def to_json(self) -> str:
+        """Serialized table, loadable with CompiledDFA.from_json"""
+        return json.dumps(self.table, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'CompiledDFA':
+        return cls(json.loads(text))
+
+    def character_class(self, char: str) -> int:
+        """Input class of a character (index into the transition rows)"""
+        code = ord(char)
+        if code < 128:
+            return self.table['ascii'][code]
+        interval = bisect_right(self._points, code) - 1
+        return self._unicode[interval][_category_flags(char)]
+
+    def finditer(self, string: str, pos: int = 0) -> Iterator['DFAMatch']:
+        """
+        Yield successive non-overlapping matches, skipping characters at
+        which no pattern matches.
+
+        Args:
+            string (str): Text to scan
+            pos (int): Offset to start scanning from
+
+        Yields:
+            DFAMatch: One match per token
+        """
+        transitions = self.transitions
+        accepts = self.accepts
+        initial = self.start_state
+        length = len(string)
+        base = pos
+        classes = starts = b''
+        window = 0
+        runs: List[Optional[bytes]] = []
+
+        while pos < length:
+            # Classify the next block of characters once it is needed; a
+            # token running past the block end classifies a longer one
+            index = pos - base
+            if index >= window:
+                base, index = pos, 0
+                classes = self._classes(string, pos, pos + CLASSIFY_BLOCK)
+                window = len(classes)
+                runs = self._runs(classes)
+                starts = classes.translate(self._starts)
+
+            state = initial
+            end = -1
+            accepted = 0
+            while True:
+                if index >= window:
+                    if base + window >= length:
+                        break
+                    classes = self._classes(string, base, base + 2 * window)
+                    window = len(classes)
+                    runs = self._runs(classes)
+                    starts = classes.translate(self._starts)
+                state = transitions[state][classes[index]]
+                if not state:
+                    break
+                index += 1
+                run = runs[state]
+                if run is not None:
+                    index = run.find(1, index)
+                    if index < 0:
+                        index = window
+                if accepts[state]:
+                    end = index
+                    accepted = state
+
+            if end < 0:
+                pos = self._next_start(starts, base, window, pos)
+                continue
+
+            end += base
+            token = accepts[accepted][0]
+            if self._asserting:
+                token, end = self._check_boundaries(string, pos, end, accepted)
+                if token < 0:
+                    pos = self._next_start(starts, base, window, pos)
+                    continue
+            yield DFAMatch(string, self.names[token], pos, end)
+            pos = end
+
+    @staticmethod
+    def _next_start(starts: bytes, base: int, window: int, pos: int) -> int:
+        """Offset of the first character after ``pos`` that can start a
+        token, or the end of the classified block"""
+        index = starts.find(1, pos - base + 1)
+        return base + index if index >= 0 else base + window
+
+    def match(self, string: str, pos: int = 0) -> Optional['DFAMatch']:
+        """Match a token at exactly ``pos``, or return None"""
+        end, state = self._longest_match(string, pos, len(string) + 1)
+        if end < 0:
+            return None
+        token = self.accepts[state][0]
+        if self._asserting:
+            token, end = self._check_boundaries(string, pos, end, state)
+            if token < 0:
+                return None
+        return DFAMatch(string, self.names[token], pos, end)
+
+    def _classes(self, string: str, start: int, end: int) -> bytes:
+        """Input classes of string[start:end], one byte per character"""
+        return string[start:end].translate(self._classify).encode('latin-1')
+
+    def _runs(self, classes: bytes) -> List[Optional[bytes]]:
+        """Per state, which of ``classes`` leave its self-loop (see _loops)"""
+        return [classes.translate(loop) if loop is not None else None
+                for loop in self._loops]
+
+    def _check_boundaries(self, string: str, start: int, end: int,
+                          state: int) -> Tuple[int, int]:
+        """
+        Pick the first pattern accepted at ``state`` whose \\b assertions
+        hold for string[start:end], falling back to shorter matches.
+
+        Returns:
+            Tuple[int, int]: Pattern index (-1 if none) and match end
+        """
+        while True:
+            for token in self.accepts[state]:
+                if self._boundaries_hold(string, start, end, token):
+                    return token, end
+            end, state = self._longest_match(string, start, end)
+            if end < 0:
+                return -1, -1
+
+    def _boundaries_hold(self, string: str, start: int, end: int, token: int) -> bool:
+        before, after = self.boundaries[token]
+        if before and start > 0 and _is_word(string[start - 1]) == _is_word(string[start]):
+            return False
+        if after and end < len(string) and _is_word(string[end - 1]) == _is_word(string[end]):
+            return False
+        return True
+
+    def _longest_match(self, string: str, start: int, limit: int) -> Tuple[int, int]:
+        """Longest accepting end before ``limit`` and its state, or (-1, 0)"""
+        state = self.start_state
+        end, accepted = -1, 0
+        for position in range(start, limit - 1):
+            state = self.transitions[state][self.character_class(string[position])]
+            if not state:
+                break
+            if self.accepts[state]:
+                end, accepted = position + 1, state
+        return end, accepted
+
+
+class DFAMatch:
+    """Match of a CompiledDFA, with the subset of the re.Match API the lexer uses"""
+    __slots__ = ('string', 'lastgroup', '_start', '_end')
+
+    def __init__(self, string: str, lastgroup: str, start: int, end: int):
+        self.string = string
+        self.lastgroup = lastgroup
+        self._start = start
+        self._end = end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def span(self) -> Tuple[int, int]:
+        return self._start, self._end
+
+    def group(self) -> str:
+        return self.string[self._start:self._end]
+
+    def __repr__(self) -> str:
+        return f"DFAMatch({self.lastgroup!r}, span={self.span()}, match={self.group()!r})"
+
+
+class _ClassMap(dict):
+    """str.translate table mapping code points to input classes, filled on demand"""
+
+    def __init__(self, dfa: CompiledDFA):
+        super().__init__(enumerate(dfa.table['ascii']))
+        self._dfa = dfa
+
+    def __missing__(self, code: int) -> int:
+        value = self[code] = self._dfa.character_class(chr(code))
+        return value
+
+
+def compile_dfa(patterns: Dict[str, str]) -> CompiledDFA:
+    """
+    Compile a token pattern set into a DFA.
+
+    Supports the regular subset of Python regex syntax: literals, character
+    sets with ranges and \\d, \\s, \\w categories, ``.``, alternation,
+    groups, greedy repetition and \\b at the very start or end of a pattern.
+    Lazy repetition (the scan always takes the longest match),
+    backreferences, lookaround, other anchors, possessive or atomic groups
+    and the IGNORECASE, ASCII and LOCALE flags are rejected.
+
+    Args:
+        patterns (Dict[str, str]): Token type to regex mapping, in priority
+            order
+
+    Returns:
+        CompiledDFA: Compiled scanner
+
+    Raises:
+        ValueError: If a pattern uses unsupported syntax or matches the
+            empty string
+    """
+    nfa = _NFA()
+    start = nfa.state()
+    names = list(patterns)
+    final_states = {}
+    boundaries = []
+
+    for index, name in enumerate(names):
+        parsed = sre_parse.parse(patterns[name])
+        if parsed.state.flags & _UNSUPPORTED_FLAGS:
+            raise ValueError(f"pattern {name!r}: IGNORECASE, ASCII and LOCALE are not supported")
+        items = list(parsed)
+        before = bool(items) and items[0] == (sre_parse.AT, sre_parse.AT_BOUNDARY)
+        after = len(items) > before and items[-1] == (sre_parse.AT, sre_parse.AT_BOUNDARY)
+        items = items[int(before):len(items) - int(after)]
+        boundaries.append([before, after])
+
+        dotall = bool(parsed.state.flags & sre_parse.SRE_FLAG_DOTALL)
+        entry, exit_ = _build(nfa, items, name, dotall)
+        nfa.epsilon[start].append(entry)
+        final_states[exit_] = index
+
+    ascii_classes, points, unicode_classes, class_count = _partition(nfa.charsets)
+    if class_count > 256:
+        raise ValueError("pattern set needs more than 256 character classes")
+
+    # Character set ids each input class belongs to
+    members = [set() for _ in range(class_count)]
+    for code, cls in enumerate(ascii_classes):
+        members[cls] = {i for i, charset in enumerate(nfa.charsets)
+                        if charset.contains(code, _category_flags(chr(code)))}
+    for interval, by_flags in enumerate(unicode_classes):
+        for flags, cls in enumerate(by_flags):
+            members[cls] = {i for i, charset in enumerate(nfa.charsets)
+                            if charset.contains(points[interval], flags)}
+
+    transitions, accepts, start_state = _subset_construction(
+        nfa, start, final_states, members, class_count)
+    if accepts[start_state]:
+        raise ValueError(f"pattern {names[accepts[start_state][0]]!r} matches the empty string")
+    transitions, accepts, start_state = _minimize(transitions, accepts, start_state)
+
+    return CompiledDFA({
+        'format': TABLE_FORMAT,
+        'names': names,
+        'boundaries': boundaries,
+        'ascii': ascii_classes,
+        'points': points,
+        'unicode': unicode_classes,
+        'transitions': transitions,
+        'accepts': accepts,
+        'start': start_state
+    })
+
+
+def _build(nfa: _NFA, items: List, name: str, dotall: bool) -> Tuple[int, int]:
+    """Thompson construction of a parsed sequence; returns (entry, exit)"""
+    entry = current = nfa.state()
+    for op, value in items:
+        if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+            charset = _CharSet(negate=op == sre_parse.NOT_LITERAL)
+            charset.ranges.append((value, value))
+            current = _edge(nfa, current, charset)
+        elif op == sre_parse.ANY:
+            charset = _CharSet(negate=not dotall)
+            if not dotall:
+                charset.ranges.append((10, 10))
+            current = _edge(nfa, current, charset)
+        elif op == sre_parse.IN:
+            current = _edge(nfa, current, _charset(value, name))
+        elif op == sre_parse.SUBPATTERN:
+            add_flags, del_flags, sub = value[1], value[2], value[3]
+            if add_flags & _UNSUPPORTED_FLAGS:
+                raise ValueError(f"pattern {name!r}: IGNORECASE, ASCII and LOCALE are not supported")
+            sub_dotall = (dotall or bool(add_flags & sre_parse.SRE_FLAG_DOTALL)) \
+                and not del_flags & sre_parse.SRE_FLAG_DOTALL
+            current = _append(nfa, current, _build(nfa, list(sub), name, sub_dotall))
+        elif op == sre_parse.BRANCH:
+            branch_exit = nfa.state()
+            for alternative in value[1]:
+                sub_entry, sub_exit = _build(nfa, list(alternative), name, dotall)
+                nfa.epsilon[current].append(sub_entry)
+                nfa.epsilon[sub_exit].append(branch_exit)
+            current = branch_exit
+        elif op == sre_parse.MIN_REPEAT:
+            # Longest-match scanning cannot honor shortest-match semantics
+            raise ValueError(f"pattern {name!r}: lazy quantifiers are not supported "
+                             f"(use a negated class, e.g. /\\*([^*]|\\*+[^*/])*\\*+/)")
+        elif op == sre_parse.MAX_REPEAT:
+            low, high, sub = value
+            for _ in range(low):
+                current = _append(nfa, current, _build(nfa, list(sub), name, dotall))
+            if high == sre_parse.MAXREPEAT:
+                sub_entry, sub_exit = _build(nfa, list(sub), name, dotall)
+                loop_exit = nfa.state()
+                nfa.epsilon[current] += [sub_entry, loop_exit]
+                nfa.epsilon[sub_exit] += [sub_entry, loop_exit]
+                current = loop_exit
+            else:
+                optional_exit = nfa.state()
+                for _ in range(high - low):
+                    nfa.epsilon[current].append(optional_exit)
+                    current = _append(nfa, current, _build(nfa, list(sub), name, dotall))
+                nfa.epsilon[current].append(optional_exit)
+                current = optional_exit
+        else:
+            raise ValueError(f"pattern {name!r}: unsupported regex construct {op}")
+    return entry, current
+
+
+def _edge(nfa: _NFA, state: int, charset: _CharSet) -> int:
+    target = nfa.state()
+    nfa.edges[state].append((nfa.charset(charset), target))
+    return target
+
+
+def _append(nfa: _NFA, state: int, fragment: Tuple[int, int]) -> int:
+    nfa.epsilon[state].append(fragment[0])
+    return fragment[1]
+
+
+def _charset(items: List, name: str) -> _CharSet:
+    """Character set of a parsed [...] class"""
+    charset = _CharSet()
+    for op, value in items:
+        if op == sre_parse.NEGATE:
+            charset.negate = True
+        elif op == sre_parse.LITERAL:
+            charset.ranges.append((value, value))
+        elif op == sre_parse.RANGE:
+            charset.ranges.append(value)
+        elif op == sre_parse.CATEGORY and value in _CATEGORIES:
+            charset.categories.append(_CATEGORIES[value])
+        else:
+            raise ValueError(f"pattern {name!r}: unsupported character set item {op} {value}")
+    return charset
+
+
+def _partition(charsets: List[_CharSet]) -> Tuple[List[int], List[int], List[List[int]], int]:
+    """
+    Split all characters into classes that no character set distinguishes.
+
+    ASCII characters are classified individually. Above ASCII, code points
+    between consecutive range endpoints only differ by their category flags,
+    so each interval gets one class per flag combination.
+
+    Returns:
+        Tuple: ASCII classes, interval start points, per-interval classes
+        by category flags, and the number of classes
+    """
+    signatures: Dict[Tuple[bool, ...], int] = {}
+
+    def classify(code: int, flags: int) -> int:
+        signature = tuple(charset.contains(code, flags) for charset in charsets)
+        return signatures.setdefault(signature, len(signatures))
+
+    ascii_classes = [classify(code, _category_flags(chr(code))) for code in range(128)]
+
+    points = {128}
+    for charset in charsets:
+        for low, high in charset.ranges:
+            for point in (low, high + 1):
+                if 128 < point <= 0x10FFFF:
+                    points.add(point)
+    points = sorted(points)
+    unicode_classes = [[classify(point, flags) for flags in range(8)] for point in points]
+    return ascii_classes, points, unicode_classes, len(signatures)
+
+
+def _subset_construction(nfa: _NFA, start: int, final_states: Dict[int, int],
+                         members: List[set], class_count: int) -> Tuple[List, List, int]:
+    """Powerset construction; state 0 of the result is the dead state"""
+
+    def closure(states):
+        stack = list(states)
+        seen = set(states)
+        while stack:
+            for target in nfa.epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+    initial = closure([start])
+    ids = {frozenset(): 0, initial: 1}
+    order = [frozenset(), initial]
+    transitions = [[0] * class_count]
+    accepts = [[]]
+
+    index = 1
+    while index < len(order):
+        states = order[index]
+        row = []
+        for cls in range(class_count):
+            targets = [target for state in states for charset, target in nfa.edges[state]
+                       if charset in members[cls]]
+            subset = closure(targets) if targets else frozenset()
+            if subset not in ids:
+                ids[subset] = len(order)
+                order.append(subset)
+            row.append(ids[subset])
+        transitions.append(row)
+        accepts.append(sorted(final_states[state] for state in states if state in final_states))
+        index += 1
+    return transitions, accepts, 1
+
+
+def _minimize(transitions: List[List[int]], accepts: List[List[int]],
+              start: int) -> Tuple[List[List[int]], List[List[int]], int]:
+    """Merge equivalent states by partition refinement, keeping 0 as dead"""
+    groups = [(0,) if state == 0 else (1, tuple(accepts[state]))
+              for state in range(len(transitions))]
+    while True:
+        keys = [(groups[state],) + tuple(groups[target] for target in transitions[state])
+                for state in range(len(transitions))]
+        numbering: Dict[Tuple, int] = {keys[0]: 0}
+        for key in keys:
+            numbering.setdefault(key, len(numbering))
+        refined = [numbering[key] for key in keys]
+        if len(set(refined)) == len(set(groups)):
+            break
+        groups = refined
+
+    blocks = {}
+    for state in range(len(transitions)):
+        blocks.setdefault(groups[state], state)
+    renumber = {group: index for index, group in enumerate(sorted(blocks, key=blocks.get))}
+    new_transitions = [[renumber[groups[target]] for target in transitions[blocks[group]]]
+                       for group in sorted(blocks, key=blocks.get)]
+    new_accepts = [accepts[blocks[group]] for group in sorted(blocks, key=blocks.get)]
+    return new_transitions, new_accepts, renumber[groups[start]]
+
+
+def pattern_key(patterns: Dict[str, str]) -> str:
+    """Hash identifying a pattern set (in priority order) and table format"""
+    content = json.dumps([TABLE_FORMAT, list(patterns.items())])
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Directory compiled tables are stored in unless another is given"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'morphological_lexer')
+
+
+# Tables compiled or loaded by this process, by pattern_key
+_loaded: Dict[str, CompiledDFA] = {}
+
+
+def load_dfa(patterns: Dict[str, str], cache_dir: Optional[str] = None) -> CompiledDFA:
+    """
+    Compiled DFA for a pattern set, compiling it at most once per cache.
+
+    Tables are kept per process and written to ``cache_dir`` as JSON named
+    by the pattern hash, so later processes load them instead of compiling.
+    Unreadable or stale files are recompiled; a cache directory that cannot
+    be written is ignored.
+
+    Args:
+        patterns (Dict[str, str]): Token type to regex mapping, in priority
+            order
+        cache_dir (Optional[str]): Table directory (default_cache_dir()
+            when None)
+
+    Returns:
+        CompiledDFA: Compiled scanner
+    """
+    key = pattern_key(patterns)
+    dfa = _loaded.get(key)
+    if dfa is not None:
+        return dfa
+
+    path = os.path.join(cache_dir or default_cache_dir(), f'dfa-{key}.json')
+    try:
+        with open(path, encoding='utf-8') as handle:
+            dfa = CompiledDFA.from_json(handle.read())
+        if dfa.names != list(patterns):
+            dfa = None
+    except (OSError, ValueError, KeyError, TypeError):
+        dfa = None
+
+    if dfa is None:
+        dfa = compile_dfa(patterns)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as handle:
+                handle.write(dfa.to_json())
+            os.replace(temporary, path)
+        except OSError:
+            pass
+
+    _loaded[key] = dfa
+    return dfa
@@ -0,0 +1,313 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import List, Callable, Tuple, Union, TYPE_CHECKING
+
+from .morphological_lexer import Token, ERROR_TOKEN
+from .token_buffer import TokenBuffer
+
+if TYPE_CHECKING:
+    from .morphological_lexer import MorphologicalLexer
+
+
+@dataclass
+class TextEdit:
+    """Replacement of ``deleted`` characters at ``offset`` by ``inserted``"""
+    offset: int
+    deleted: int = 0
+    inserted: str = ''
+
+    @property
+    def delta(self) -> int:
+        """Change in text length caused by the edit"""
+        return len(self.inserted) - self.deleted
+
+    def apply(self, text: str) -> str:
+        """Return text with the edit applied"""
+        if self.offset < 0 or self.deleted < 0 or self.offset + self.deleted > len(text):
+            raise ValueError(f"edit {self} out of range for text of length {len(text)}")
+        return text[:self.offset] + self.inserted + text[self.offset + self.deleted:]
+
+
+@dataclass
+class _RescanPlan:
+    """Result of rescanning the region around an edit"""
+    restart: int                 # first old token replaced
+    resume: int                  # first old token kept (shifted)
+    tokens: List[Tuple]          # raw scan results for the replaced region
+    position: int = 0            # offset the rescan started at
+    delta: int = 0
+    line_delta: int = 0
+    column_delta: int = 0
+    sync_line: int = 0
+
+
+def _first_at_or_after(get: Callable[[int], int], count: int, value: int) -> int:
+    """Binary search for the first index whose key is >= value"""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if get(middle) < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class GapIndex:
+    """
+    Sorted stretches of a text between tokens that are not only whitespace,
+    i.e. that hold unrecognized characters (error tokens included).
+
+    Kept by the lexer for the most recently edited text and updated from
+    the rescanned region after each edit, so finding the gaps before an
+    edit is a bisection rather than a walk over all earlier tokens.
+    """
+
+    def __init__(self, text: str, starts: array, ends: array):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def build(cls, text: str, count: int, get_type: Callable,
+              get_start: Callable, get_end: Callable) -> 'GapIndex':
+        """Walk all tokens of text once"""
+        gaps = cls(text, array('q'), array('q'))
+        previous = 0
+        for index in range(count):
+            if get_type(index) != ERROR_TOKEN:
+                gaps._add(previous, get_start(index))
+                previous = get_end(index)
+        gaps._add(previous, len(text))
+        return gaps
+
+    def _add(self, start: int, end: int) -> None:
+        if start < end and not self.text[start:end].isspace():
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def before(self, offset: int) -> range:
+        """Indexes of the gaps ending at or before offset"""
+        return range(bisect_right(self.ends, offset))
+
+    def updated(self, new_text: str, plan: '_RescanPlan', count: int,
+                get_type: Callable, get_start: Callable, get_end: Callable) -> 'GapIndex':
+        """
+        Gaps of new_text: those before the rescan are kept, those of the
+        rescanned tokens recomputed and those after the resumed tokens
+        shifted by the edit's delta.
+        """
+        keep = bisect_right(self.ends, plan.position)
+        gaps = GapIndex(new_text, self.starts[:keep], self.ends[:keep])
+
+        # A rescan restarting at an error token is inside a gap
+        previous = plan.position
+        if keep < len(self.starts) and self.starts[keep] < previous:
+            previous = self.starts[keep]
+        for token_type, value, start, _, _ in plan.tokens:
+            if token_type != ERROR_TOKEN:
+                gaps._add(previous, start)
+                previous = start + len(value)
+
+        # Up to the first kept token that is not itself part of a gap
+        resume = plan.resume
+        while resume < count and get_type(resume) == ERROR_TOKEN:
+            resume += 1
+        if resume == count:
+            gaps._add(previous, len(new_text))
+            return gaps
+        gaps._add(previous, get_start(resume) + plan.delta)
+
+        tail = bisect_left(self.starts, get_end(resume))
+        delta = plan.delta
+        gaps.starts.extend(array('q', [start + delta for start in self.starts[tail:]]))
+        gaps.ends.extend(array('q', [end + delta for end in self.ends[tail:]]))
+        return gaps
+
+
+def _gap_index(lexer: 'MorphologicalLexer', text: str, count: int,
+               get_type: Callable, get_start: Callable, get_end: Callable) -> GapIndex:
+    """The lexer's GapIndex if it belongs to text, else a new one"""
+    gaps = lexer._gap_index
+    if gaps is None or (gaps.text is not text and gaps.text != text):
+        gaps = GapIndex.build(text, count, get_type, get_start, get_end)
+    return gaps
+
+
+def _earliest_reopened_gap(lexer: 'MorphologicalLexer', gaps: GapIndex,
+                           new_text: str, offset: int) -> int:
+    """
+    Find the earliest unrecognized character before ``offset`` that
+    starts a match in new_text (e.g. a stray quote closed by the edit).
+
+    Returns:
+        int: Offset of that character, or -1 if the prefix is unaffected
+    """
+    match = lexer.scanner.match
+    text = gaps.text
+    for index in gaps.before(offset):
+        for position in range(gaps.starts[index], gaps.ends[index]):
+            if not text[position].isspace() and match(new_text, position):
+                return position
+    return -1
+
+
+def _plan_rescan(lexer: 'MorphologicalLexer', count: int,
+                 get_type: Callable, get_start: Callable, get_end: Callable,
+                 get_line: Callable, get_column: Callable,
+                 old_text: str, new_text: str, edit: TextEdit) -> _RescanPlan:
+    """
+    Rescan new_text from the last safe boundary before the edit until the
+    scan lines up with an old token past the edit, and update the lexer's
+    GapIndex for new_text.
+    """
+    gaps = _gap_index(lexer, old_text, count, get_type, get_start, get_end)
+    plan = _rescan(lexer, gaps, count, get_type, get_start, get_end,
+                   get_line, get_column, new_text, edit)
+    lexer._gap_index = gaps.updated(new_text, plan, count, get_type, get_start, get_end)
+    return plan
+
+
+def _rescan(lexer: 'MorphologicalLexer', gaps: GapIndex, count: int,
+            get_type: Callable, get_start: Callable, get_end: Callable,
+            get_line: Callable, get_column: Callable,
+            new_text: str, edit: TextEdit) -> _RescanPlan:
+    # First old token touching the edit; back up one more token because a
+    # match may depend on the character following it (e.g. "3" + ".5")
+    touched = _first_at_or_after(get_end, count, edit.offset)
+    restart = max(touched - 1, 0)
+
+    # Unrecognized characters earlier on may now open a token spanning the
+    # edit, such as an unterminated string literal that the edit closes
+    reopened = _earliest_reopened_gap(
+        lexer, gaps, new_text, get_start(restart) if restart < count else len(gaps.text))
+    if reopened >= 0:
+        restart = max(_first_at_or_after(get_start, count, reopened) - 1, 0)
+
+    if restart == 0:
+        position, line, column = 0, 1, 0
+    else:
+        position = get_start(restart)
+        line, column = get_line(restart), get_column(restart)
+
+    delta = edit.delta
+    tail_start = edit.offset + len(edit.inserted)
+    rescanned = []
+
+    scanner = lexer._scan(new_text, position, line, column)
+    for raw in scanner:
+        token_type, value, start, line, column = raw
+        if start >= tail_start:
+            old_start = start - delta
+            candidate = _first_at_or_after(get_start, count, old_start)
+            if (candidate < count and get_start(candidate) == old_start
+                    and get_end(candidate) == old_start + len(value)
+                    and get_type(candidate) == token_type):
+                scanner.close()
+                return _RescanPlan(
+                    restart=restart,
+                    resume=candidate,
+                    tokens=rescanned,
+                    position=position,
+                    delta=delta,
+                    line_delta=line - get_line(candidate),
+                    column_delta=column - get_column(candidate),
+                    sync_line=get_line(candidate)
+                )
+        rescanned.append(raw)
+
+    # Never lined up again: everything after restart was rescanned
+    return _RescanPlan(restart=restart, resume=count, tokens=rescanned,
+                       position=position)
+
+
+def _retokenize_list(lexer: 'MorphologicalLexer', tokens: List[Token],
+                     old_text: str, new_text: str, edit: TextEdit) -> List[Token]:
+    plan = _plan_rescan(
+        lexer, len(tokens),
+        lambda i: tokens[i].type, lambda i: tokens[i].start,
+        lambda i: tokens[i].end, lambda i: tokens[i].line_number,
+        lambda i: tokens[i].column, old_text, new_text, edit)
+
+    if plan.delta or plan.line_delta or plan.column_delta:
+        for index in range(plan.resume, len(tokens)):
+            token = tokens[index]
+            token.start += plan.delta
+            token.end += plan.delta
+            if token.line_number == plan.sync_line:
+                token.column += plan.column_delta
+            token.line_number += plan.line_delta
+
+    rescanned = [lexer._make_token(*raw) for raw in plan.tokens]
+    lexer.token_count += len(rescanned)
+    tokens[plan.restart:plan.resume] = rescanned
+    return tokens
+
+
+def _retokenize_buffer(lexer: 'MorphologicalLexer', buffer: TokenBuffer,
+                       old_text: str, new_text: str, edit: TextEdit) -> TokenBuffer:
+    plan = _plan_rescan(
+        lexer, len(buffer),
+        buffer.type_of, buffer.starts.__getitem__, buffer.ends.__getitem__,
+        buffer.lines.__getitem__, buffer.columns.__getitem__, old_text,
+        new_text, edit)
+
+    result = buffer.derive(new_text, plan.restart)
+
+    for token_type, value, start, line, column in plan.tokens:
+        if token_type == 'identifier':
+            morphemes, convention, _ = lexer._analyze_identifier(value)
+            result.append(token_type, start, start + len(value), line, column,
+                          morphemes, convention)
+        else:
+            result.append(token_type, start, start + len(value), line, column)
+    lexer.token_count += len(plan.tokens)
+
+    resume = plan.resume
+    result.types.extend(buffer.types[resume:])
+    result.morpheme_ids.extend(buffer.morpheme_ids[resume:])
+    result.convention_ids.extend(buffer.convention_ids[resume:])
+
+    delta, line_delta = plan.delta, plan.line_delta
+    if delta:
+        result.starts.extend(array('q', [s + delta for s in buffer.starts[resume:]]))
+        result.ends.extend(array('q', [e + delta for e in buffer.ends[resume:]]))
+    else:
+        result.starts.extend(buffer.starts[resume:])
+        result.ends.extend(buffer.ends[resume:])
+
+    # Only tokens still on the synchronization line change column
+    lines = buffer.lines
+    same_line = resume
+    while same_line < len(lines) and lines[same_line] == plan.sync_line:
+        same_line += 1
+    result.columns.extend(array('i', [c + plan.column_delta
+                                      for c in buffer.columns[resume:same_line]]))
+    result.columns.extend(buffer.columns[same_line:])
+    if line_delta:
+        result.lines.extend(array('i', [l + line_delta for l in lines[resume:]]))
+    else:
+        result.lines.extend(lines[resume:])
+
+    return result
+
+
+def retokenize(lexer: 'MorphologicalLexer',
+               tokens: Union[List[Token], TokenBuffer],
+               old_text: str, edit: TextEdit) -> Union[List[Token], TokenBuffer]:
+    """
+    Re-tokenize old_text after an edit, rescanning only the affected region.
+
+    See MorphologicalLexer.retokenize.
+    """
+    new_text = edit.apply(old_text)
+    lexer._check_morpheme_patterns()
+    start_time = lexer._start_metrics()
+
+    try:
+        if isinstance(tokens, TokenBuffer):
+            return _retokenize_buffer(lexer, tokens, old_text, new_text, edit)
+        return _retokenize_list(lexer, tokens, old_text, new_text, edit)
+    finally:
+        lexer._update_metrics(start_time)
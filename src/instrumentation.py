@@ -0,0 +1,227 @@
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Sequence, Tuple
+import os
+import re
+import time
+
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01,
+                   0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Prefix of every exported metric name
+METRIC_PREFIX = 'morphological_lexer'
+
+# A series is identified by its name and sorted (label, value) pairs
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with count and sum"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add the observations of a histogram with the same buckets"""
+        if other.buckets != self.buckets:
+            raise ValueError("cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs ending with +Inf"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+
+class _Span:
+    """Context manager timing one span"""
+    __slots__ = ('instrumentation', 'name', 'labels', 'start')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str,
+                 labels: Dict[str, str]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.instrumentation.observe(
+            self.name, time.perf_counter() - self.start, **self.labels)
+
+
+class Instrumentation:
+    """
+    Span latency histograms, counters and hooks for the lexing pipeline.
+
+    MorphologicalLexer, ResultAnalyzer and ValidationFramework accept an
+    instance through their ``instrumentation`` argument and then record
+    spans per phase (pattern matching, morpheme analysis, convention
+    detection, analysis, each validation rule) and counters (tokens by
+    type, identifier cache hits and misses, unrecognized characters,
+    violations by rule). Without one they skip all of it, so the disabled
+    cost is a single None check per call or per identifier cache miss.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (Sequence[float]): Histogram bucket bounds in seconds
+        """
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[SeriesKey, Histogram] = {}
+        self.counters: Counter = Counter()
+        self.hooks: List[Callable[[str, float, Dict[str, str]], None]] = []
+
+    def span(self, name: str, **labels: str) -> _Span:
+        """Time a block: ``with instrumentation.span('analyzer.update'):``"""
+        return _Span(self, name, labels)
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Record a span duration and call the hooks"""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+        for hook in self.hooks:
+            hook(name, seconds, labels)
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add to a counter"""
+        if amount:
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def add_hook(self, hook: Callable[[str, float, Dict[str, str]], None]) -> None:
+        """Register ``hook(name, seconds, labels)``, called after every span"""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[str, float, Dict[str, str]], None]) -> None:
+        """Unregister a hook"""
+        self.hooks.remove(hook)
+
+    def merge(self, other: 'Instrumentation') -> None:
+        """Fold in the values recorded by another instance (e.g. a worker)"""
+        for key, histogram in other.histograms.items():
+            mine = self.histograms.get(key)
+            if mine is None:
+                mine = self.histograms[key] = Histogram(histogram.buckets)
+            mine.merge(histogram)
+        self.counters.update(other.counters)
+
+    def __getstate__(self) -> Dict:
+        # Hooks are process-local callbacks and are not pickled
+        state = dict(self.__dict__)
+        state['hooks'] = []
+        return state
+
+    def snapshot(self) -> Dict:
+        """
+        Plain-data view of everything recorded.
+
+        Returns:
+            Dict: 'spans' mapping names to count, total seconds and mean (per
+            label set, as 'name{label=value}'), and 'counters' likewise
+        """
+        return {
+            'spans': {
+                _series_name(name, labels): {
+                    'count': histogram.count,
+                    'total': histogram.total,
+                    'mean': histogram.total / histogram.count if histogram.count else None
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            },
+            'counters': {
+                _series_name(name, labels): value
+                for (name, labels), value in sorted(self.counters.items())
+            }
+        }
+
+    def to_prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format"""
+        lines = []
+
+        span_metric = f'{METRIC_PREFIX}_span_seconds'
+        if self.histograms:
+            lines.append(f'# HELP {span_metric} Duration of instrumented spans')
+            lines.append(f'# TYPE {span_metric} histogram')
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            labels = (('span', name),) + labels
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{span_metric}_bucket{_labels(labels + (("le", le),))} {count}')
+            lines.append(f'{span_metric}_sum{_labels(labels)} {histogram.total!r}')
+            lines.append(f'{span_metric}_count{_labels(labels)} {histogram.count}')
+
+        described = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f'{METRIC_PREFIX}_{_metric_name(name)}_total'
+            if metric not in described:
+                described.add(metric)
+                lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{_labels(labels)} {value}')
+
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Write a Prometheus text snapshot to path, replacing it atomically so
+        a node-exporter textfile collector never reads a partial file.
+        """
+        import tempfile
+
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as output:
+                output.write(self.to_prometheus())
+            # mkstemp creates the file 0600; the collector may run as another user
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def reset(self) -> None:
+        """Drop all recorded values; hooks are kept"""
+        self.histograms.clear()
+        self.counters.clear()
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in labels)
+    return '{' + ','.join(f'{_metric_name(key)}="{value}"'
+                          for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def _series_name(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}={value}' for key, value in labels) + '}'
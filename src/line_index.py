@@ -0,0 +1,63 @@
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Tuple, Union
+import re
+
+
+_NEWLINE = re.compile(b'\n')
+
+
+class LineIndex:
+    """
+    Table of line-start offsets for one source.
+
+    Built once with a single newline scan; any offset is then mapped to a
+    (line, column) position by binary search in O(log lines). Lines are
+    1-based and columns 0-based, as in Token; every newline character ends
+    a line.
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        """
+        Args:
+            source (Union[str, bytes]): Text, or UTF-8 bytes (including an
+                mmap), whose offsets are mapped
+        """
+        self.length = len(source)
+        if isinstance(source, str):
+            # str.split runs in C; the cumulative line lengths are the starts
+            lengths = (len(line) + 1 for line in source.split('\n')[:-1])
+            self.starts = array('q', accumulate(lengths, initial=0))
+        else:
+            self.starts = array('q', [0])
+            self.starts.extend(match.end() for match in _NEWLINE.finditer(source))
+
+    def line_of(self, offset: int) -> int:
+        """Line number (1-based) containing offset"""
+        return bisect_right(self.starts, offset)
+
+    def position(self, offset: int) -> Tuple[int, int]:
+        """
+        Map an offset to its position.
+
+        Args:
+            offset (int): Offset into the source, 0 <= offset <= length
+
+        Returns:
+            Tuple[int, int]: Line number (1-based) and column (0-based)
+        """
+        if not 0 <= offset <= self.length:
+            raise IndexError(f"offset {offset} outside source of length {self.length}")
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1]
+
+    def offset(self, line: int, column: int = 0) -> int:
+        """Offset of a (line, column) position"""
+        if not 1 <= line <= len(self.starts):
+            raise IndexError(f"line {line} outside 1..{len(self.starts)}")
+        return self.starts[line - 1] + column
+
+    def __len__(self) -> int:
+        """Number of lines"""
+        return len(self.starts)
@@ -0,0 +1,131 @@
+from typing import List, Optional, Tuple, Union
+import mmap
+import os
+
+from .token_buffer import TokenBuffer
+
+
+class MappedSource:
+    """
+    Read-only memory mapping of a UTF-8 source file.
+
+    Tokens produced from a mapping hold byte offsets into it; text is only
+    decoded when a value is accessed. Pages the scanner has moved past can
+    be released so the resident set stays small on very large files; they
+    are read back from the file if touched again.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): File to map
+        """
+        self.path = path
+        self._released = 0
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size:
+                self.data: Union[mmap.mmap, bytes] = mmap.mmap(
+                    handle.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    self.data.madvise(mmap.MADV_SEQUENTIAL)
+            else:
+                # Empty files cannot be mapped
+                self.data = b''
+
+    def decode(self, start: int, end: int) -> str:
+        """Decode the bytes in [start, end)"""
+        return self.data[start:end].decode('utf-8', 'replace')
+
+    def release(self, end: int) -> None:
+        """
+        Drop resident pages before ``end`` from this process.
+
+        A no-op where madvise(MADV_DONTNEED) is unavailable.
+        """
+        if not isinstance(self.data, mmap.mmap) or not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        end -= end % mmap.PAGESIZE
+        if end > self._released:
+            self.data.madvise(mmap.MADV_DONTNEED, self._released,
+                              end - self._released)
+            self._released = end
+
+    def close(self) -> None:
+        """Unmap the file; tokens can no longer decode their values"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __enter__(self) -> 'MappedSource':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MappedToken:
+    """
+    Token over a MappedSource, holding offsets only.
+
+    Has the same attributes as Token; ``value`` is decoded from the mapping
+    on access. Offsets and columns count bytes, not characters.
+    """
+    __slots__ = ('type', 'start', 'end', 'line_number', 'column',
+                 'morphemes', 'convention', 'morpheme_ids', 'source')
+
+    def __init__(self, token_type: str, start: int, end: int, line: int,
+                 column: int, source: MappedSource,
+                 morphemes: Optional[Tuple[str, ...]] = None,
+                 convention: Optional[str] = None,
+                 morpheme_ids: Optional[Tuple[int, ...]] = None):
+        self.type = token_type
+        self.start = start
+        self.end = end
+        self.line_number = line
+        self.column = column
+        self.source = source
+        self.morphemes: List[str] = list(morphemes or ())
+        self.convention = convention
+        self.morpheme_ids: Tuple[int, ...] = morpheme_ids or ()
+
+    @property
+    def value(self) -> str:
+        """Token text, decoded from the mapping"""
+        return self.source.decode(self.start, self.end)
+
+    def __str__(self) -> str:
+        return f"Token(type='{self.type}', value='{self.value}', morphemes={self.morphemes}, convention='{self.convention}')"
+
+    def __repr__(self) -> str:
+        return f"MappedToken(type={self.type!r}, start={self.start}, end={self.end})"
+
+
+class MappedTokenBuffer(TokenBuffer):
+    """
+    TokenBuffer over a MappedSource.
+
+    Offsets and columns count bytes; values are decoded from the mapping
+    when accessed. Closing the buffer unmaps the file.
+    """
+
+    def __init__(self, source: MappedSource):
+        super().__init__(source)
+
+    def value(self, index: int) -> str:
+        """Token value at index, decoded from the mapping"""
+        return self.source.decode(self.starts[index], self.ends[index])
+
+    def close(self) -> None:
+        """Unmap the underlying file"""
+        self.source.close()
+
+    def __enter__(self) -> 'MappedTokenBuffer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"MappedTokenBuffer({len(self)} tokens, {self.source.path!r})"
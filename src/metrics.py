@@ -0,0 +1,109 @@
+from typing import List, Optional, Dict
+import math
+
+
+# Metrics collection levels supported by MorphologicalLexer
+METRICS_OFF = 'off'
+METRICS_TIMING = 'timing'
+METRICS_MEMORY = 'memory'
+METRICS_LEVELS = (METRICS_OFF, METRICS_TIMING, METRICS_MEMORY)
+
+
+class MetricSeries:
+    """
+    Constant-size record of a stream of samples.
+
+    Keeps exact streaming aggregates (count, total, mean, min, max) over all
+    samples seen, plus a fixed-size ring buffer of the most recent samples
+    from which percentiles are estimated. Memory use does not grow with the
+    number of samples.
+    """
+
+    def __init__(self, window: int = 1024):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self._samples: List[float] = []
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """Record a single sample"""
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        # Ring buffer of recent samples
+        if len(self._samples) < self.window:
+            self._samples.append(value)
+        else:
+            self._samples[self._next] = value
+            self._next = (self._next + 1) % self.window
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean over all recorded samples"""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Estimate a percentile from the recent-sample window.
+
+        Args:
+            q (float): Percentile in the range [0, 100]
+
+        Returns:
+            Optional[float]: Estimated percentile, None if empty
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = (len(ordered) - 1) * q / 100
+        lower = math.floor(rank)
+        upper = math.ceil(rank)
+        if lower == upper:
+            return ordered[lower]
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+    def percentiles(self, qs=(50, 95, 99)) -> Dict[str, Optional[float]]:
+        """Return several percentiles keyed as 'p50', 'p95', ..."""
+        return {f'p{q}': self.percentile(q) for q in qs}
+
+    def merge(self, other: 'MetricSeries') -> None:
+        """Fold another series into this one"""
+        if other.count == 0:
+            return
+        for value in other.recent():
+            if len(self._samples) < self.window:
+                self._samples.append(value)
+            else:
+                self._samples[self._next] = value
+                self._next = (self._next + 1) % self.window
+        self.count += other.count
+        self.total += other.total
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+
+    def recent(self) -> List[float]:
+        """Recent samples in insertion order"""
+        return self._samples[self._next:] + self._samples[:self._next]
+
+    def clear(self) -> None:
+        """Drop all samples and aggregates"""
+        self._samples = []
+        self._next = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,226 @@
+from typing import List, Dict, Iterable, Optional, Tuple
+
+
+# Marks the end of a stored word inside a trie node; never a character key
+_END = ''
+
+
+class AffixTrie:
+    """Character trie over lowercase affixes with longest-match lookup"""
+
+    def __init__(self, words: Iterable[str] = (), reverse: bool = False):
+        """
+        Args:
+            words (Iterable[str]): Initial affixes
+            reverse (bool): Store words reversed, so lookups match suffixes
+        """
+        self.reverse = reverse
+        self._root: Dict[str, dict] = {}
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        """Insert a word (stored lowercase)"""
+        word = word.lower()
+        if not word:
+            return
+        node = self._root
+        for char in (reversed(word) if self.reverse else word):
+            node = node.setdefault(char, {})
+        if _END not in node:
+            node[_END] = word
+            self._size += 1
+
+    def matches(self, text: str, start: int = 0,
+                end: Optional[int] = None) -> List[str]:
+        """
+        Return every stored word that is a prefix of text[start:end] (or a
+        suffix of it for reversed tries), shortest first.
+
+        Args:
+            text (str): Lowercase text to match against
+            start (int): Start of the region to match
+            end (Optional[int]): End of the region to match
+
+        Returns:
+            List[str]: Matching words
+        """
+        end = len(text) if end is None else end
+        found = []
+        node = self._root
+        if self.reverse:
+            positions = range(end - 1, start - 1, -1)
+        else:
+            positions = range(start, end)
+        for position in positions:
+            node = node.get(text[position])
+            if node is None:
+                break
+            word = node.get(_END)
+            if word is not None:
+                found.append(word)
+        return found
+
+    def __contains__(self, word: str) -> bool:
+        node = self._root
+        for char in (reversed(word.lower()) if self.reverse else word.lower()):
+            node = node.get(char)
+            if node is None:
+                return False
+        return _END in node
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key == _END:
+                    yield child
+                else:
+                    stack.append(child)
+
+
+class MorphemeDictionary:
+    """
+    Affix and root lexicon backed by a prefix trie and a reversed-suffix trie.
+
+    Decomposes each identifier part by repeatedly stripping the longest
+    known prefix and then the longest known suffix, so lookups cost time
+    proportional to the part length rather than the lexicon size. Affixes
+    are not stripped where they would cut into a known root word.
+    """
+
+    def __init__(self, prefixes: Iterable[str] = (), suffixes: Iterable[str] = (),
+                 roots: Iterable[str] = (), min_stem_length: int = 2,
+                 max_affixes: int = 4):
+        """
+        Args:
+            prefixes (Iterable[str]): Prefix lexicon
+            suffixes (Iterable[str]): Suffix lexicon
+            roots (Iterable[str]): Root words kept whole
+            min_stem_length (int): Shortest stem left after stripping affixes
+            max_affixes (int): Maximum prefixes, and suffixes, stripped per part
+        """
+        self.prefixes = AffixTrie(prefixes)
+        self.suffixes = AffixTrie(suffixes, reverse=True)
+        self.roots = AffixTrie(roots)
+        self._reversed_roots = AffixTrie(roots, reverse=True)
+        self.min_stem_length = max(1, min_stem_length)
+        self.max_affixes = max_affixes
+
+        # Bumped on every change so lexer caches can detect edits
+        self.version = 0
+
+    @classmethod
+    def from_patterns(cls, morpheme_patterns: Dict[str, List[str]],
+                      **kwargs) -> 'MorphemeDictionary':
+        """Build a dictionary from a lexer's morpheme_patterns mapping"""
+        return cls(prefixes=morpheme_patterns.get('prefix', ()),
+                   suffixes=morpheme_patterns.get('suffix', ()),
+                   roots=morpheme_patterns.get('root', ()), **kwargs)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'MorphemeDictionary':
+        """
+        Load a lexicon file.
+
+        ``.json`` files hold a mapping like morpheme_patterns, with 'prefix',
+        'suffix' and 'root' lists. Other files are plain text with one
+        ``<kind> <morpheme>`` entry per line, kind being prefix, suffix or
+        root; blank lines and lines starting with '#' are ignored.
+
+        Args:
+            path (str): Lexicon file
+
+        Returns:
+            MorphemeDictionary: Loaded dictionary
+        """
+        with open(path, encoding='utf-8') as handle:
+            if path.endswith('.json'):
+                import json
+
+                return cls.from_patterns(json.load(handle), **kwargs)
+
+            entries = {'prefix': [], 'suffix': [], 'root': []}
+            for number, line in enumerate(handle, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = line.split()
+                if len(fields) != 2 or fields[0] not in entries:
+                    raise ValueError(
+                        f"{path}:{number}: expected '<prefix|suffix|root> <morpheme>'")
+                entries[fields[0]].append(fields[1])
+        return cls.from_patterns(entries, **kwargs)
+
+    def add_prefix(self, prefix: str) -> None:
+        """Add a prefix to the lexicon"""
+        self.prefixes.add(prefix)
+        self.version += 1
+
+    def add_suffix(self, suffix: str) -> None:
+        """Add a suffix to the lexicon"""
+        self.suffixes.add(suffix)
+        self.version += 1
+
+    def add_root(self, root: str) -> None:
+        """Add a root word that is never split"""
+        self.roots.add(root)
+        self._reversed_roots.add(root)
+        self.version += 1
+
+    def decompose(self, part: str) -> List[str]:
+        """
+        Split one identifier part (no separators) into morphemes.
+
+        Args:
+            part (str): Identifier part, e.g. 'unprocessable'
+
+        Returns:
+            List[str]: Prefixes, stem and suffixes in order; affixes are
+            returned in their lexicon (lowercase) form, the stem as written
+        """
+        lower = part.lower()
+        start, end = 0, len(part)
+        head: List[str] = []
+        tail: List[str] = []
+
+        # Longest prefixes first, stopping where a known root begins
+        while (len(head) < self.max_affixes
+               and not self.roots.matches(lower, start, end)):
+            prefix = self._longest(self.prefixes, lower, start, end)
+            if prefix is None:
+                break
+            head.append(prefix)
+            start += len(prefix)
+
+        # Then longest suffixes, stopping where a known root ends
+        while (len(tail) < self.max_affixes
+               and not self._reversed_roots.matches(lower, start, end)):
+            suffix = self._longest(self.suffixes, lower, start, end)
+            if suffix is None:
+                break
+            tail.append(suffix)
+            end -= len(suffix)
+
+        tail.reverse()
+        return head + [part[start:end]] + tail
+
+    def _longest(self, trie: AffixTrie, lower: str, start: int,
+                 end: int) -> Optional[str]:
+        """Longest affix leaving at least min_stem_length characters"""
+        for affix in reversed(trie.matches(lower, start, end)):
+            if end - start - len(affix) >= self.min_stem_length:
+                return affix
+        return None
+
+    def fingerprint(self) -> Tuple[int, int]:
+        """Identity and version, used by lexer caches"""
+        return id(self), self.version
+
+    def __len__(self) -> int:
+        return len(self.prefixes) + len(self.suffixes) + len(self.roots)
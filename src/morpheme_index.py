@@ -0,0 +1,435 @@
+from dataclasses import dataclass
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+from .corpus import DEFAULT_EXTENSIONS, collect_files
+from .morphological_lexer import MorphologicalLexer
+from .result_cache import lexer_config
+
+# Files indexed between commits during update
+COMMIT_EVERY = 256
+
+# Sorts after every morpheme sharing a prefix, as the upper bound of a range
+_MAX_CHARACTER = '\U0010ffff'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS identifiers (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    convention TEXT
+);
+CREATE INDEX IF NOT EXISTS identifiers_convention ON identifiers (convention);
+CREATE TABLE IF NOT EXISTS morphemes (
+    id INTEGER PRIMARY KEY,
+    text TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    morpheme_id INTEGER NOT NULL,
+    identifier_id INTEGER NOT NULL,
+    PRIMARY KEY (morpheme_id, identifier_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS occurrences (
+    identifier_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    col INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS occurrences_identifier ON occurrences (identifier_id, file_id);
+CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences (file_id);
+'''
+
+
+@dataclass
+class Occurrence:
+    """One place an identifier appears"""
+    file: str
+    line: int
+    column: int
+    identifier: str
+
+
+class MorphemeIndex:
+    """
+    Persistent SQLite inverted index from morphemes to identifier locations.
+
+    Every identifier is stored once with its naming convention, and each of
+    its morphemes (lowercased) is posted to it, so a query intersects a few
+    short posting lists before touching any occurrences. Occurrences record
+    file, line and column.
+
+    ``update`` reindexes only files whose size, modification time and
+    content hash changed since the last run. Changing the lexer's patterns
+    or morpheme configuration empties the index, so the next update
+    rebuilds it.
+    """
+
+    def __init__(self, path: str, lexer: Optional[MorphologicalLexer] = None):
+        """
+        Args:
+            path (str): SQLite database file, created if missing
+            lexer (Optional[MorphologicalLexer]): Lexer producing identifiers
+                and morphemes; a default lexer when None
+        """
+        self.path = path
+        self.lexer = lexer if lexer is not None else MorphologicalLexer()
+        self._identifier_ids: Dict[str, int] = {}
+        self._morpheme_ids: Dict[str, int] = {}
+
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._check_config()
+
+    def _check_config(self) -> None:
+        """Empty the index if it was built with a different lexer configuration"""
+        digest = hashlib.sha256(json.dumps(
+            lexer_config(self.lexer), sort_keys=True).encode('utf-8')).hexdigest()
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        if row is not None and row[0] == digest:
+            return
+        with self._db:
+            for table in ('files', 'identifiers', 'morphemes', 'postings', 'occurrences'):
+                self._db.execute(f'DELETE FROM {table}')
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('config', ?)", (digest,))
+
+    def update(self, paths: Iterable[str],
+               extensions: Sequence[str] = DEFAULT_EXTENSIONS) -> Dict[str, int]:
+        """
+        Index new and changed files under paths.
+
+        Files are stored under their canonical path (os.path.realpath), so
+        the same file reached as 'src', './src' or through a symlink is
+        indexed once.
+
+        Args:
+            paths (Iterable[str]): Files, directories and/or glob patterns,
+                as for CorpusAnalyzer
+            extensions (Sequence[str]): Extensions collected from directories
+
+        Returns:
+            Dict[str, int]: Number of files 'indexed', 'unchanged' and
+            'unreadable'
+        """
+        counts = {'indexed': 0, 'unchanged': 0, 'unreadable': 0}
+        try:
+            for path in collect_files(paths, extensions):
+                path = os.path.realpath(path)
+                try:
+                    stat = os.stat(path)
+                    row = self._db.execute(
+                        'SELECT mtime_ns, size, digest FROM files WHERE path = ?',
+                        (path,)).fetchone()
+                    if row is not None and row[:2] == (stat.st_mtime_ns, stat.st_size):
+                        counts['unchanged'] += 1
+                        continue
+                    with open(path, 'rb') as source:
+                        data = source.read()
+                except OSError:
+                    counts['unreadable'] += 1
+                    continue
+
+                digest = hashlib.sha256(data).hexdigest()
+                if row is not None and row[2] == digest:
+                    # Touched but identical: only remember the new stat
+                    self._db.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?',
+                                     (stat.st_mtime_ns, stat.st_size, path))
+                    counts['unchanged'] += 1
+                else:
+                    self._index(path, data.decode('utf-8', 'replace'),
+                                stat.st_mtime_ns, stat.st_size, digest)
+                    counts['indexed'] += 1
+                    if counts['indexed'] % COMMIT_EVERY == 0:
+                        self._db.commit()
+        except BaseException:
+            self._rollback()
+            raise
+        self._db.commit()
+        return counts
+
+    def add_source(self, path: str, code: str) -> None:
+        """
+        Index source text under path, replacing what was indexed for it.
+
+        Args:
+            path (str): Name the occurrences are reported under
+            code (str): Source text
+        """
+        digest = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+        try:
+            self._index(path, code, 0, -1, digest)
+        except BaseException:
+            self._rollback()
+            raise
+        self._db.commit()
+
+    def _rollback(self) -> None:
+        """Undo uncommitted changes, forgetting ids that may not exist any more"""
+        self._db.rollback()
+        self._identifier_ids.clear()
+        self._morpheme_ids.clear()
+
+    def _index(self, path: str, code: str, mtime_ns: int, size: int, digest: str) -> None:
+        """Replace the occurrences of one file"""
+        db = self._db
+        row = db.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            file_id = db.execute(
+                'INSERT INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)',
+                (path, mtime_ns, size, digest)).lastrowid
+        else:
+            file_id = row[0]
+            db.execute('UPDATE files SET mtime_ns = ?, size = ?, digest = ? WHERE id = ?',
+                       (mtime_ns, size, digest, file_id))
+            db.execute('DELETE FROM occurrences WHERE file_id = ?', (file_id,))
+
+        rows = []
+        for token in self.lexer.tokenize(code):
+            if token.type == 'identifier':
+                identifier_id = self._identifier_id(token.value, token.convention,
+                                                    token.morphemes)
+                rows.append((identifier_id, file_id, token.line_number, token.column))
+        db.executemany('INSERT INTO occurrences VALUES (?, ?, ?, ?)', rows)
+
+    def _identifier_id(self, name: str, convention: Optional[str],
+                       morphemes: Sequence[str]) -> int:
+        """Id of an identifier, storing it and its postings on first sight"""
+        identifier_id = self._identifier_ids.get(name)
+        if identifier_id is not None:
+            return identifier_id
+
+        db = self._db
+        row = db.execute('SELECT id FROM identifiers WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            identifier_id = row[0]
+        else:
+            identifier_id = db.execute(
+                'INSERT INTO identifiers (name, convention) VALUES (?, ?)',
+                (name, convention)).lastrowid
+            db.executemany('INSERT OR IGNORE INTO postings VALUES (?, ?)', [
+                (self._morpheme_id(morpheme.lower()), identifier_id)
+                for morpheme in morphemes])
+        self._identifier_ids[name] = identifier_id
+        return identifier_id
+
+    def _morpheme_id(self, text: str) -> int:
+        morpheme_id = self._morpheme_ids.get(text)
+        if morpheme_id is None:
+            self._db.execute('INSERT OR IGNORE INTO morphemes (text) VALUES (?)', (text,))
+            morpheme_id = self._db.execute(
+                'SELECT id FROM morphemes WHERE text = ?', (text,)).fetchone()[0]
+            self._morpheme_ids[text] = morpheme_id
+        return morpheme_id
+
+    def remove(self, path: str) -> bool:
+        """
+        Drop a file from the index.
+
+        Args:
+            path (str): Name given to add_source, or any spelling of a path
+                indexed by update
+
+        Returns:
+            bool: Whether the file was indexed
+        """
+        row = None
+        for name in (path, os.path.realpath(path)):
+            row = self._db.execute('SELECT id FROM files WHERE path = ?', (name,)).fetchone()
+            if row is not None:
+                break
+        if row is None:
+            return False
+        with self._db:
+            self._db.execute('DELETE FROM occurrences WHERE file_id = ?', row)
+            self._db.execute('DELETE FROM files WHERE id = ?', row)
+        return True
+
+    def remove_missing(self) -> int:
+        """
+        Drop indexed files that no longer exist on disk.
+
+        Returns:
+            int: Number of files dropped
+        """
+        missing = [path for (path,) in self._db.execute(
+                       'SELECT path FROM files WHERE size >= 0')
+                   if not os.path.exists(path)]
+        for path in missing:
+            self.remove(path)
+        return len(missing)
+
+    def prune(self) -> int:
+        """
+        Delete identifiers, postings and morphemes that no file uses any more.
+
+        Returns:
+            int: Number of identifiers deleted
+        """
+        with self._db:
+            deleted = self._db.execute('''
+                DELETE FROM identifiers WHERE NOT EXISTS (
+                    SELECT 1 FROM occurrences WHERE identifier_id = identifiers.id)
+                ''').rowcount
+            self._db.execute('''
+                DELETE FROM postings WHERE identifier_id NOT IN (SELECT id FROM identifiers)''')
+            self._db.execute('''
+                DELETE FROM morphemes WHERE id NOT IN (SELECT morpheme_id FROM postings)''')
+        self._identifier_ids.clear()
+        self._morpheme_ids.clear()
+        return deleted
+
+    def find(self, *morphemes: str, convention: Optional[str] = None,
+             limit: Optional[int] = None) -> List[Occurrence]:
+        """
+        Occurrences of identifiers containing every given morpheme.
+
+        Morphemes match case-insensitively; one ending in '*' matches any
+        morpheme with that prefix (``find('valid*', 'tion')``).
+
+        Args:
+            *morphemes (str): Morphemes all of which an identifier contains
+            convention (Optional[str]): Only identifiers with this convention
+            limit (Optional[int]): Maximum number of occurrences
+
+        Returns:
+            List[Occurrence]: Matches ordered by file, line and column
+        """
+        condition, params = self._identifier_condition(morphemes, convention)
+        sql = f'''
+            SELECT f.path, o.line, o.col, i.name
+            FROM identifiers i
+            JOIN occurrences o ON o.identifier_id = i.id
+            JOIN files f ON f.id = o.file_id
+            WHERE {condition}
+            ORDER BY f.path, o.line, o.col'''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [Occurrence(*row) for row in self._db.execute(sql, params)]
+
+    def identifiers(self, *morphemes: str, convention: Optional[str] = None,
+                    limit: Optional[int] = None) -> List[str]:
+        """
+        Distinct identifiers containing every given morpheme (see find),
+        or every identifier with ``convention`` when no morphemes are given.
+
+        Returns:
+            List[str]: Identifier names in sorted order
+        """
+        condition, params = self._identifier_condition(morphemes, convention)
+        sql = f'''
+            SELECT i.name FROM identifiers i
+            WHERE {condition} AND EXISTS (
+                SELECT 1 FROM occurrences o WHERE o.identifier_id = i.id)
+            ORDER BY i.name'''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [name for (name,) in self._db.execute(sql, params)]
+
+    def _identifier_condition(self, morphemes: Sequence[str],
+                              convention: Optional[str]) -> Tuple[str, list]:
+        """SQL condition on identifiers ``i`` for a query, with its parameters"""
+        terms, params = [], []
+        for morpheme in morphemes:
+            morpheme = morpheme.lower()
+            if morpheme.endswith('*'):
+                morpheme = morpheme[:-1]
+                match = 'm.text >= ? AND m.text < ?'
+                params += [morpheme, morpheme + _MAX_CHARACTER]
+            else:
+                match = 'm.text = ?'
+                params.append(morpheme)
+            terms.append('SELECT p.identifier_id FROM morphemes m '
+                         f'JOIN postings p ON p.morpheme_id = m.id WHERE {match}')
+
+        conditions = []
+        if terms:
+            conditions.append(f"i.id IN ({' INTERSECT '.join(terms)})")
+        if convention is not None:
+            conditions.append('i.convention = ?')
+            params.append(convention)
+        return ' AND '.join(conditions) or '1', params
+
+    def conventions(self) -> Dict[str, int]:
+        """Number of distinct identifiers in use per naming convention"""
+        return dict(self._db.execute('''
+            SELECT i.convention, COUNT(*) FROM identifiers i
+            WHERE EXISTS (SELECT 1 FROM occurrences o WHERE o.identifier_id = i.id)
+            GROUP BY i.convention'''))
+
+    def stats(self) -> Dict[str, int]:
+        """Row counts of the index tables"""
+        return {table: self._db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('files', 'identifiers', 'morphemes', 'occurrences')}
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> 'MorphemeIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Morpheme index of identifiers")
+    parser.add_argument('--index', default='morphemes.db', help="index database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help='index new and changed files')
+    update.add_argument('paths', nargs='+', help="files, directories or glob patterns")
+    update.add_argument('--extensions', default=','.join(DEFAULT_EXTENSIONS))
+    update.add_argument('--remove-missing', action='store_true',
+                        help="drop indexed files that no longer exist")
+
+    query = commands.add_parser('query', help='find identifiers by morphemes')
+    query.add_argument('morphemes', nargs='*', help="morphemes, 'prefix*' for prefixes")
+    query.add_argument('--convention')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--identifiers', action='store_true',
+                       help="list distinct identifiers instead of occurrences")
+    args = parser.parse_args(argv)
+
+    with MorphemeIndex(args.index) as index:
+        if args.command == 'update':
+            try:
+                counts = index.update(args.paths, [ext.strip() for ext in
+                                                   args.extensions.split(',')])
+            except FileNotFoundError as exc:
+                print(f"error: no such file, directory or match: {exc}", file=sys.stderr)
+                return 2
+            if args.remove_missing:
+                counts['removed'] = index.remove_missing()
+                index.prune()
+            print(json.dumps(counts))
+        elif args.identifiers:
+            for name in index.identifiers(*args.morphemes, convention=args.convention,
+                                          limit=args.limit):
+                print(name)
+        else:
+            for found in index.find(*args.morphemes, convention=args.convention,
+                                    limit=args.limit):
+                print(f"{found.file}:{found.line}:{found.column}: {found.identifier}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,61 @@
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
-from collections import defaultdict
+from typing import (List, Dict, Optional, Iterator, Iterable, Tuple, Pattern,
+                    Hashable, Any, Union, IO)
+from collections import Counter, OrderedDict, deque
+import codecs
 import re
 import time
-import statistics
-import tracemalloc
-from datetime import datetime
+
+from .metrics import MetricSeries, METRICS_LEVELS, METRICS_TIMING, METRICS_MEMORY
+from .symbols import shared_symbols
+
+# Modules only some features need (tracemalloc, the DFA compiler, line
+# indexes) are imported where they are used, to keep startup short
+
+# Position tracking modes supported by MorphologicalLexer
+POSITIONS_EAGER = 'eager'
+POSITIONS_LAZY = 'lazy'
+POSITION_MODES = (POSITIONS_EAGER, POSITIONS_LAZY)
+
+# Scanner engines supported by MorphologicalLexer
+ENGINE_REGEX = 'regex'
+ENGINE_DFA = 'dfa'
+ENGINES = (ENGINE_REGEX, ENGINE_DFA)
+
+# Handling of characters no pattern matches: counted and dropped, or
+# emitted as one 'error' token per maximal run
+ERRORS_SKIP = 'skip'
+ERRORS_TOKEN = 'token'
+ERROR_MODES = (ERRORS_SKIP, ERRORS_TOKEN)
+ERROR_TOKEN = 'error'
+
+# Number of recent error spans reported by get_metrics
+RECENT_ERROR_SPANS = 32
+
+# Characters that may open a string literal; a streamed gap holding one
+# could still become a token once more input arrives
+_STRING_QUOTES = '"\''
+
+# UTF-8 continuation bytes, deleted to count the characters of a byte run
+_CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+# Boundaries identifiers are split into morphemes at (snake_case and camelCase)
+COMPOUND_BOUNDARY = re.compile('_|(?=[A-Z])')
+
+# Compiled patterns shared by every lexer in the process, keyed by the
+# pattern set, so constructing a lexer does not recompile them
+_compiled_pattern_sets: Dict[Tuple, Dict[str, Pattern]] = {}
+_master_patterns: Dict[Tuple, Pattern] = {}
+
+# Default morpheme configuration, shared by every lexer until it reads
+# morpheme_patterns and gets its own mutable copy
+_DEFAULT_MORPHEME_PATTERNS = {
+    'prefix': ('un', 'pre', 'post', 'sub', 'super', 'inter'),
+    'suffix': ('able', 'ible', 'er', 'or', 'tion', 'sion', 'ment'),
+    'compound_separator': ('_', r'(?=[A-Z])')
+}
+_DEFAULT_MORPHEME_FINGERPRINT = tuple(_DEFAULT_MORPHEME_PATTERNS.items())
 
 
 @dataclass
@@ -20,6 +69,9 @@ class Token:
     convention: str = None
     line_number: int = 1
     column: int = 0
+    # Ids of the morphemes in the process-wide SymbolTable (symbols.py);
+    # empty unless the lexer was created with intern_morphemes
+    morpheme_ids: Tuple[int, ...] = field(default=(), compare=False, repr=False)
 
     def __str__(self) -> str:
         return f"Token(type='{self.type}', value='{self.value}', morphemes={self.morphemes}, convention='{self.convention}')"
@@ -28,12 +80,208 @@ class Token:
         return self.__str__()
 
 
+class LazyToken(Token):
+    """
+    Token whose line_number and column are resolved on first access.
+
+    Positions are looked up in a shared LineIndex from the offset the token
+    was scanned at, so shifting ``start`` later (as retokenize does) does
+    not change them. Assigning either field stores it like a plain Token.
+    Compares equal to a Token with the same field values.
+    """
+
+    def __init__(self, type: str, value: str, start: int, end: int,
+                 line_index: 'LineIndex', morphemes: Optional[List[str]] = None,
+                 convention: Optional[str] = None,
+                 morpheme_ids: Tuple[int, ...] = ()):
+        self.type = type
+        self.value = value
+        self.start = start
+        self.end = end
+        self.morphemes = morphemes if morphemes is not None else []
+        self.convention = convention
+        self.morpheme_ids = morpheme_ids
+        self.line_index = line_index
+        self._offset = start
+        self._position: Optional[List[int]] = None
+
+    def _resolve(self) -> List[int]:
+        if self._position is None:
+            self._position = list(self.line_index.position(self._offset))
+        return self._position
+
+    @property
+    def line_number(self) -> int:
+        return self._resolve()[0]
+
+    @line_number.setter
+    def line_number(self, value: int) -> None:
+        self._resolve()[0] = value
+
+    @property
+    def column(self) -> int:
+        return self._resolve()[1]
+
+    @column.setter
+    def column(self, value: int) -> None:
+        self._resolve()[1] = value
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return ((self.type, self.value, self.start, self.end, self.morphemes,
+                 self.convention, self.line_number, self.column)
+                == (other.type, other.value, other.start, other.end, other.morphemes,
+                    other.convention, other.line_number, other.column))
+
+    __hash__ = None
+
+
+class LexerError(ValueError):
+    """Raised when an input has more unrecognized characters than max_errors allows"""
+
+    def __init__(self, message: str, position: int, line: int, column: int):
+        super().__init__(message)
+        self.position = position
+        self.line = line
+        self.column = column
+
+
+class LRUCache:
+    """Bounded least-recently-used mapping with hit/miss/eviction counters"""
+
+    def __init__(self, maxsize: int):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value, evicting the least recently used entry if full"""
+        if self.maxsize == 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries; counters are kept"""
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters"""
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
 class MorphologicalLexer:
     """Lexical analyzer with morphological analysis capabilities"""
 
-    def __init__(self):
+    def __init__(self, metrics_level: str = METRICS_TIMING,
+                 metrics_window: int = 1024,
+                 identifier_cache_size: int = 8192,
+                 morpheme_dictionary: Optional['MorphemeDictionary'] = None,
+                 positions: str = POSITIONS_EAGER,
+                 instrumentation: Optional['Instrumentation'] = None,
+                 patterns: Optional[Dict[str, str]] = None,
+                 engine: str = ENGINE_REGEX,
+                 dfa_cache_dir: Optional[str] = None,
+                 errors: str = ERRORS_SKIP,
+                 max_errors: Optional[int] = None,
+                 intern_morphemes: bool = False):
+        """
+        Args:
+            metrics_level (str): 'off', 'timing' (perf_counter only) or
+                'memory' (timing plus tracemalloc memory tracing)
+            metrics_window (int): Number of recent samples kept per metric
+                for percentile estimates
+            identifier_cache_size (int): Maximum number of identifiers whose
+                morphemes and convention are memoized (0 disables caching)
+            morpheme_dictionary (Optional[MorphemeDictionary]): Trie-backed
+                affix lexicon with longest-match, multi-affix decomposition;
+                when None the prefix/suffix lists in morpheme_patterns are used
+            positions (str): 'eager' tracks line and column while scanning;
+                'lazy' makes tokenize skip that and return LazyTokens whose
+                positions are resolved through a LineIndex on access; this
+                only saves time when most positions are never read
+            instrumentation (Optional[Instrumentation]): Receives per-phase
+                spans and counters; nothing is recorded when None
+            patterns (Optional[Dict[str, str]]): Token type to regex
+                mapping replacing the built-in Python-like token set
+            engine (str): 'regex' scans with one alternation regex (first
+                matching pattern wins); 'dfa' with a state-transition table
+                compiled from the patterns (longest match, ties going to the
+                pattern declared first) in linear time
+            dfa_cache_dir (Optional[str]): Where compiled DFA tables are
+                stored between processes (see dfa.load_dfa)
+            errors (str): 'skip' drops unrecognized characters; 'token'
+                emits each maximal run of them as one 'error' token. Either
+                way each run is recorded as an error span
+            max_errors (Optional[int]): Number of unrecognized characters
+                one input may contain before LexerError is raised; None
+                never aborts
+            intern_morphemes (bool): Intern morphemes in the process-wide
+                SymbolTable and attach their ids to tokens (morpheme_ids),
+                which ResultAnalyzer counts directly. The table is never
+                cleared, so it grows with every distinct morpheme seen;
+                off by default for long-running processes
+        """
+        if metrics_level not in METRICS_LEVELS:
+            raise ValueError(
+                f"metrics_level must be one of {METRICS_LEVELS}, "
+                f"got {metrics_level!r}")
+        if positions not in POSITION_MODES:
+            raise ValueError(
+                f"positions must be one of {POSITION_MODES}, got {positions!r}")
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+        if errors not in ERROR_MODES:
+            raise ValueError(f"errors must be one of {ERROR_MODES}, got {errors!r}")
+        if max_errors is not None and max_errors < 0:
+            raise ValueError("max_errors must be non-negative")
+        self.errors = errors
+        self.max_errors = max_errors
+        self.intern_morphemes = intern_morphemes
+        self.positions = positions
+        self.engine = engine
+        self.dfa_cache_dir = dfa_cache_dir
+        self.instrumentation = instrumentation
+        self._identifier_seconds = 0.0
+        self._line_index: Optional[Tuple[str, 'LineIndex']] = None
+        self._gap_index: Optional['GapIndex'] = None
+
+        # Identifier -> (morphemes, convention) memo, cleared whenever the
+        # morpheme configuration changes
+        self.identifier_cache = LRUCache(identifier_cache_size)
+        self._morpheme_fingerprint = None
+        self.morpheme_dictionary = morpheme_dictionary
+
         # Token patterns
-        self.patterns = {
+        default_patterns = {
             'keyword': r'\b(def|class|return|if|while|for|import|from|as)\b',
             'identifier': r'[a-zA-Z_][a-zA-Z0-9_]*',
             'operator': r'[+\-*/=<>!&|^%]+',
@@ -43,24 +291,99 @@ class MorphologicalLexer:
             'whitespace': r'\s+'
         }
 
-        # Compile patterns for performance
-        self.compiled_patterns = {
-            name: re.compile(pattern)
-            for name, pattern in self.patterns.items()
-        }
+        self.set_patterns(patterns if patterns is not None else default_patterns)
 
-        # Morpheme analysis configuration
-        self.morpheme_patterns = {
-            'prefix': ['un', 'pre', 'post', 'sub', 'super', 'inter'],
-            'suffix': ['able', 'ible', 'er', 'or', 'tion', 'sion', 'ment'],
-            'compound_separator': ['_', r'(?=[A-Z])']
-        }
+        # Morpheme analysis configuration, copied on first access
+        self._morpheme_patterns = _DEFAULT_MORPHEME_PATTERNS
+        self._morpheme_patterns_shared = True
+        self._morpheme_fingerprint = self._fingerprint_morphemes()
 
-        # Performance metrics
-        self.metrics = defaultdict(list)
+        # Performance metrics (constant-size series, see metrics.py)
+        self.metrics_level = metrics_level
+        self._owns_tracemalloc = False
+        self.metrics = {
+            name: MetricSeries(metrics_window)
+            for name in ('processing_time', 'memory_usage', 'peak_memory',
+                         'error_span_length')
+        }
         self.token_count = 0
         self.error_count = 0
 
+        # Most recent runs of unrecognized characters as (start, end, line,
+        # column), and the characters seen in the current call
+        self.error_spans = deque(maxlen=RECENT_ERROR_SPANS)
+        self._call_errors = 0
+
+    def set_patterns(self, patterns: Dict[str, str]) -> None:
+        """
+        Replace the token patterns and recompile the scanner.
+
+        Args:
+            patterns (Dict[str, str]): Token type to regex mapping; a
+                'whitespace' pattern is skipped rather than emitted
+
+        Raises:
+            ValueError: With the 'dfa' engine, if a pattern uses syntax the
+                DFA compiler does not support
+        """
+        self.patterns = dict(patterns)
+        key = tuple(self.patterns.items())
+
+        # Compile patterns for performance, once per process
+        compiled = _compiled_pattern_sets.get(key)
+        if compiled is None:
+            compiled = _compiled_pattern_sets[key] = {
+                name: re.compile(pattern)
+                for name, pattern in self.patterns.items()
+            }
+        self.compiled_patterns = dict(compiled)
+
+        # Single master pattern used by the scanner: one match per token
+        self.master_pattern = self._shared_master_pattern()
+        self._binary_master_pattern: Optional[Pattern] = None
+
+        # Matcher with finditer/match used by the str scanners
+        self.dfa: Optional['CompiledDFA'] = None
+        self.scanner = self.master_pattern
+        if self.engine == ENGINE_DFA:
+            from .dfa import load_dfa
+
+            self.dfa = load_dfa(dict(self._scan_order(self.patterns)), self.dfa_cache_dir)
+            self.scanner = self.dfa
+
+    @property
+    def morpheme_patterns(self) -> Dict[str, List[str]]:
+        """Morpheme analysis configuration (prefixes, suffixes, separators)"""
+        if self._morpheme_patterns_shared:
+            # Lists of our own, so in-place edits stay local to this lexer
+            self._morpheme_patterns = {key: list(values)
+                                       for key, values in self._morpheme_patterns.items()}
+            self._morpheme_patterns_shared = False
+        return self._morpheme_patterns
+
+    @morpheme_patterns.setter
+    def morpheme_patterns(self, value: Dict[str, List[str]]) -> None:
+        self._morpheme_patterns = value
+        self._morpheme_patterns_shared = False
+        self._morpheme_fingerprint = self._fingerprint_morphemes()
+        self.identifier_cache.clear()
+
+    def _fingerprint_morphemes(self) -> Tuple:
+        """Hashable snapshot of the morpheme configuration, used to detect edits"""
+        dictionary = (self.morpheme_dictionary.fingerprint()
+                      if self.morpheme_dictionary is not None else None)
+        if self._morpheme_patterns_shared:
+            return dictionary, _DEFAULT_MORPHEME_FINGERPRINT
+        return dictionary, tuple((key, tuple(values))
+                                 for key, values in self._morpheme_patterns.items())
+
+    def _check_morpheme_patterns(self) -> None:
+        """Clear the identifier cache if morpheme_patterns was edited in place"""
+        fingerprint = self._fingerprint_morphemes()
+        if fingerprint != self._morpheme_fingerprint:
+            self._morpheme_fingerprint = fingerprint
+            self.identifier_cache.clear()
+
     def tokenize(self, code: str) -> List[Token]:
         """
         Tokenize input code and perform morphological analysis.
@@ -71,71 +394,681 @@ class MorphologicalLexer:
         Returns:
             List[Token]: List of analyzed tokens
         """
+        if self.positions == POSITIONS_LAZY:
+            return self._tokenize_lazy(code)
+
         tokens = []
-        position = 0
-        line = 1
-        column = 0
+        self._check_morpheme_patterns()
 
         # Initialize performance monitoring
-        start_time = time.time()
-        tracemalloc.start()
-
-        while position < len(code):
-            # Handle newlines
-            if code[position] == '\n':
-                line += 1
-                column = 0
-                position += 1
-                continue
+        start_time = self._start_metrics()
+        instrumented = self._begin_instrumented_call()
 
-            # Skip whitespace
-            if code[position].isspace():
-                position += 1
-                column += 1
-                continue
+        try:
+            for token_type, value, start, line, column in self._scan(code):
+                token = Token(
+                    type=token_type,
+                    value=value,
+                    start=start,
+                    end=start + len(value),
+                    line_number=line,
+                    column=column
+                )
+
+                # Perform morphological analysis for identifiers
+                if token_type == 'identifier':
+                    morphemes, token.convention, token.morpheme_ids = \
+                        self._analyze_identifier(value)
+                    token.morphemes = list(morphemes)
+
+                tokens.append(token)
+        finally:
+            # Also when max_errors aborts the scan, so tracing stops
+            self._update_metrics(start_time)
+        if instrumented is not None:
+            self._end_instrumented_call('tokenize', instrumented,
+                                        Counter(token.type for token in tokens))
+        self.token_count += len(tokens)
+
+        return tokens
+
+    def _tokenize_lazy(self, code: str) -> List[Token]:
+        """
+        Tokenize without tracking positions, returning LazyTokens.
+
+        Positions come from the source's LineIndex, where every newline
+        starts a line; the eager scanner only counts newlines between
+        tokens, so the two differ after string literals spanning lines.
+        """
+        tokens = []
+        self._check_morpheme_patterns()
+
+        # Initialize performance monitoring
+        start_time = self._start_metrics()
+        instrumented = self._begin_instrumented_call()
+
+        line_index = self.line_index(code)
+        emit_errors = self.errors == ERRORS_TOKEN
+        position = 0
+        try:
+            for match in self.scanner.finditer(code):
+                start = match.start()
+
+                # Handle unrecognized characters, the whole run at once
+                if start != position:
+                    self._record_gap(code, position, start, line_index, tokens, emit_errors)
+                position = match.end()
 
-            # Try matching patterns
-            token = None
-            for token_type, pattern in self.compiled_patterns.items():
+                token_type = match.lastgroup
                 if token_type == 'whitespace':
                     continue
 
-                match = pattern.match(code, position)
-                if match:
-                    value = match.group(0)
-                    token = Token(
-                        type=token_type,
-                        value=value,
-                        start=position,
-                        end=position + len(value),
-                        line_number=line,
-                        column=column
-                    )
-
-                    # Perform morphological analysis for identifiers
-                    if token_type == 'identifier':
-                        token.morphemes = self._analyze_morphemes(value)
-                        token.convention = self._detect_naming_convention(
-                            value)
-
-                    tokens.append(token)
-                    position = match.end()
-                    column += len(value)
-                    break
-
-            # Handle unrecognized characters
-            if not token:
-                position += 1
-                column += 1
-                self.error_count += 1
+                value = match.group()
+                token = LazyToken(token_type, value, start, position, line_index)
+                if token_type == 'identifier':
+                    morphemes, token.convention, token.morpheme_ids = \
+                        self._analyze_identifier(value)
+                    token.morphemes = list(morphemes)
+                tokens.append(token)
 
-        # Update performance metrics
-        self._update_metrics(start_time)
-        tracemalloc.stop()
+            # Trailing unrecognized characters
+            if position < len(code):
+                self._record_gap(code, position, len(code), line_index, tokens, emit_errors)
+        finally:
+            self._update_metrics(start_time)
+        if instrumented is not None:
+            self._end_instrumented_call('tokenize', instrumented,
+                                        Counter(token.type for token in tokens))
         self.token_count += len(tokens)
 
         return tokens
 
+    def line_index(self, code: str) -> 'LineIndex':
+        """
+        LineIndex of code, mapping any offset to a (line, column) position.
+
+        The index of the most recent source is kept, so repeated calls with
+        the same string (such as the one just tokenized) reuse it.
+
+        Args:
+            code (str): Source text
+
+        Returns:
+            LineIndex: Line-start table of code
+        """
+        if self._line_index is None or self._line_index[0] is not code:
+            from .line_index import LineIndex
+
+            self._line_index = (code, LineIndex(code))
+        return self._line_index[1]
+
+    def tokenize_buffer(self, code: str) -> 'TokenBuffer':
+        """
+        Tokenize input code into a compact columnar TokenBuffer.
+
+        Produces the same tokens as tokenize, but stores them in array
+        columns with values sliced lazily from ``code`` and morpheme lists
+        interned, instead of one Token object per token.
+
+        Args:
+            code (str): Source code to analyze
+
+        Returns:
+            TokenBuffer: Columnar token storage over ``code``
+        """
+        from .token_buffer import TokenBuffer
+
+        buffer = TokenBuffer(code)
+        append = buffer.append
+        self._check_morpheme_patterns()
+
+        # Initialize performance monitoring
+        start_time = self._start_metrics()
+        instrumented = self._begin_instrumented_call()
+
+        try:
+            for token_type, value, start, line, column in self._scan(code):
+                if token_type == 'identifier':
+                    morphemes, convention, _ = self._analyze_identifier(value)
+                    append(token_type, start, start + len(value), line, column,
+                           morphemes, convention)
+                else:
+                    append(token_type, start, start + len(value), line, column)
+        finally:
+            self._update_metrics(start_time)
+        if instrumented is not None:
+            self._end_instrumented_call('tokenize_buffer', instrumented, Counter(
+                buffer.type_names[type_id] for type_id in buffer.types))
+        self.token_count += len(buffer)
+
+        return buffer
+
+    def iter_tokens(self, stream: Union[IO, Iterable[str], str],
+                    chunk_size: int = 1 << 16,
+                    max_token_size: int = 1 << 20) -> Iterator[Token]:
+        """
+        Lazily tokenize a text stream, reading it in chunks.
+
+        Offsets, line numbers and columns are carried across chunk
+        boundaries, and tokens (including string literals) that straddle a
+        boundary are only emitted once they are complete, so the result
+        matches tokenize on the concatenated input. Memory stays bounded by
+        ``chunk_size`` plus the longest pending token.
+
+        Args:
+            stream (Union[IO, Iterable[str], str]): File object (text or
+                UTF-8 binary), iterable of text chunks, or a string
+            chunk_size (int): Number of characters read per step
+            max_token_size (int): Longest string literal that may straddle
+                chunks; an unterminated quote is rejected as an error
+                character once this much input follows it
+
+        Yields:
+            Token: Analyzed tokens in source order
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        self._check_morpheme_patterns()
+        start_time = self._start_metrics()
+        emitted = 0
+
+        # Spans would include the consumer's time, so only counters are kept
+        instrumented = self._begin_instrumented_call()
+        token_types = Counter() if instrumented is not None else None
+
+        buffer = ''
+        base = 0
+        state = [0, 1, 0, False]
+        chunks = self._read_chunks(stream, chunk_size)
+
+        try:
+            final = False
+            while not final:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    final = True
+                else:
+                    buffer += chunk
+                    # Held at a possible string opening: only a closing
+                    # quote or reaching max_token_size changes the outcome
+                    if (state[3] and len(buffer) - state[0] < max_token_size
+                            and not any(quote in chunk for quote in _STRING_QUOTES)):
+                        continue
+
+                scanner = self._scan(buffer, state[0], state[1], state[2], final,
+                                     max_token_size, state)
+                for token_type, value, start, line, column in scanner:
+                    emitted += 1
+                    if token_types is not None:
+                        token_types[token_type] += 1
+                    yield self._make_token(token_type, value, base + start,
+                                           line, column)
+
+                # Keep the unconsumed tail plus one consumed character, the
+                # left context \b and lookbehinds at the resume point need
+                consumed = max(0, state[0] - 1)
+                base += consumed
+                buffer = buffer[consumed:]
+                state[0] -= consumed
+        finally:
+            self._update_metrics(start_time)
+            self.token_count += emitted
+            if instrumented is not None:
+                self._end_instrumented_call(None, instrumented, token_types)
+
+    @staticmethod
+    def _read_chunks(stream: Union[IO, Iterable[str], str],
+                     chunk_size: int) -> Iterator[str]:
+        """
+        Yield text chunks from a file object, iterable of chunks or string.
+
+        Args:
+            stream (Union[IO, Iterable[str], str]): Input to read
+            chunk_size (int): Chunk size for file objects and strings
+
+        Yields:
+            str: Non-empty text chunks
+        """
+        if isinstance(stream, str):
+            for offset in range(0, len(stream), chunk_size):
+                yield stream[offset:offset + chunk_size]
+            return
+
+        if hasattr(stream, 'read'):
+            source = iter(lambda: stream.read(chunk_size), stream.read(0))
+        else:
+            source = iter(stream)
+
+        decoder = None
+        for chunk in source:
+            if isinstance(chunk, (bytes, bytearray)):
+                if decoder is None:
+                    decoder = codecs.getincrementaldecoder('utf-8')()
+                chunk = decoder.decode(chunk)
+            if chunk:
+                yield chunk
+        if decoder is not None:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+
+    def tokenize_mmap(self, path: str,
+                      release_every: int = 1 << 26) -> 'MappedTokenBuffer':
+        """
+        Tokenize a file through a read-only memory mapping.
+
+        The mapping is scanned with bytes regexes and tokens are stored as
+        byte offsets in a columnar buffer; the file is never read into a
+        ``str`` and values are decoded only when accessed. Identifiers are
+        analyzed as in tokenize. Offsets and columns count bytes, and
+        non-ASCII characters outside string literals are unrecognized, as
+        with any non-matching character.
+
+        Args:
+            path (str): UTF-8 file to tokenize
+            release_every (int): Bytes scanned between releases of the
+                pages already passed
+
+        Returns:
+            MappedTokenBuffer: Tokens over the mapping; close it (or use it
+            as a context manager) to unmap the file
+        """
+        from .mapped_source import MappedSource, MappedTokenBuffer
+
+        buffer = MappedTokenBuffer(MappedSource(path))
+        append = buffer.append
+        self._check_morpheme_patterns()
+
+        # Initialize performance monitoring
+        start_time = self._start_metrics()
+        instrumented = self._begin_instrumented_call()
+
+        try:
+            for token_type, start, end, line, column, morphemes, convention, _ in \
+                    self._scan_mapped(buffer.source, release_every):
+                append(token_type, start, end, line, column, morphemes, convention)
+        except BaseException:
+            buffer.close()
+            raise
+        finally:
+            self._update_metrics(start_time)
+        if instrumented is not None:
+            self._end_instrumented_call('tokenize_mmap', instrumented, Counter(
+                buffer.type_names[type_id] for type_id in buffer.types))
+        self.token_count += len(buffer)
+
+        return buffer
+
+    def iter_mmap_tokens(self, path: str,
+                         release_every: int = 1 << 26) -> Iterator['MappedToken']:
+        """
+        Lazily tokenize a file through a read-only memory mapping.
+
+        Like tokenize_mmap, but yields offset-only tokens one at a time and
+        keeps nothing per token, so resident memory stays bounded by
+        ``release_every`` regardless of file size.
+
+        Args:
+            path (str): UTF-8 file to tokenize
+            release_every (int): Bytes scanned between releases of the
+                pages already passed
+
+        Yields:
+            MappedToken: Analyzed tokens in source order
+        """
+        from .mapped_source import MappedSource, MappedToken
+
+        source = MappedSource(path)
+        self._check_morpheme_patterns()
+        start_time = self._start_metrics()
+        emitted = 0
+
+        # Spans would include the consumer's time, so only counters are kept
+        instrumented = self._begin_instrumented_call()
+        token_types = Counter() if instrumented is not None else None
+
+        try:
+            for token_type, start, end, line, column, morphemes, convention, ids in \
+                    self._scan_mapped(source, release_every):
+                emitted += 1
+                if token_types is not None:
+                    token_types[token_type] += 1
+                yield MappedToken(token_type, start, end, line, column, source,
+                                  morphemes, convention, ids)
+        finally:
+            self._update_metrics(start_time)
+            self.token_count += emitted
+            if instrumented is not None:
+                self._end_instrumented_call(None, instrumented, token_types)
+
+    def _scan_mapped(self, source: 'MappedSource', release_every: int) -> Iterator[Tuple]:
+        """
+        Scan a MappedSource, analyzing identifiers and periodically
+        releasing the pages already scanned.
+
+        Yields:
+            Tuple: Token type, start, end, line, column, morphemes,
+            convention and morpheme ids (None for non-identifiers)
+        """
+        data = source.data
+        release_at = release_every
+        for token_type, start, end, line, column in self._scan_offsets(data):
+            if start >= release_at:
+                source.release(start)
+                release_at = start + release_every
+
+            if token_type == 'identifier':
+                morphemes, convention, ids = self._analyze_identifier(
+                    data[start:end].decode('utf-8', 'replace'))
+                yield token_type, start, end, line, column, morphemes, convention, ids
+            else:
+                yield token_type, start, end, line, column, None, None, None
+
+    def retokenize(self, tokens: Union[List[Token], 'TokenBuffer'],
+                   old_text: str, edit: 'TextEdit') -> Union[List[Token], 'TokenBuffer']:
+        """
+        Update tokens of old_text for a single edit without a full rescan.
+
+        Only the region from the last safe token boundary before the edit up
+        to the point where the new tokens line up with the old ones again is
+        scanned; tokens after that point are shifted. A list is updated and
+        returned in place, its Token objects reused and shifted.
+
+        Args:
+            tokens (Union[List[Token], TokenBuffer]): Tokens of old_text
+            old_text (str): Text the tokens were produced from
+            edit (TextEdit): Edit to apply
+
+        Returns:
+            Union[List[Token], TokenBuffer]: Tokens of edit.apply(old_text),
+            of the same kind as ``tokens``
+        """
+        from .incremental import retokenize
+
+        return retokenize(self, tokens, old_text, edit)
+
+    @staticmethod
+    def _compile_master_pattern(patterns: Dict[str, str],
+                                binary: bool = False) -> Pattern:
+        """
+        Combine all token patterns into one regex with a named group per type.
+
+        Whitespace is tried first, mirroring the original scanner which
+        skipped whitespace before trying any pattern. The remaining groups
+        keep their declaration order, so the first alternative that matches
+        wins exactly as in a per-pattern loop (keywords before identifiers).
+
+        Args:
+            patterns (Dict[str, str]): Token type to regex mapping
+            binary (bool): Compile a UTF-8 encoded bytes pattern, whose
+                character classes match ASCII only
+
+        Returns:
+            Pattern: Compiled master pattern
+        """
+        ordered = MorphologicalLexer._scan_order(patterns)
+        pattern = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in ordered)
+        return re.compile(pattern.encode('utf-8') if binary else pattern)
+
+    def _shared_master_pattern(self, binary: bool = False) -> Pattern:
+        """Master pattern of the current patterns, compiled once per process"""
+        key = (tuple(self.patterns.items()), binary)
+        pattern = _master_patterns.get(key)
+        if pattern is None:
+            pattern = _master_patterns[key] = self._compile_master_pattern(
+                self.patterns, binary=binary)
+        return pattern
+
+    @staticmethod
+    def _scan_order(patterns: Dict[str, str]) -> List[Tuple[str, str]]:
+        """Patterns in scanner priority order: whitespace, then as declared"""
+        return sorted(patterns.items(), key=lambda item: item[0] != 'whitespace')
+
+    def _scan(self, code: str, position: int = 0, line: int = 1,
+              column: int = 0, final: bool = True,
+              max_token_size: int = 0,
+              state: Optional[list] = None) -> Iterator[Tuple[str, str, int, int, int]]:
+        """
+        Scan code with the scanner (master pattern or DFA), one match per token.
+
+        Whitespace runs are consumed in a single step and only update the
+        line/column counters. Characters no pattern matches show up as gaps
+        between consecutive matches; each gap is one error span, counted in
+        ``error_count`` per character and, with errors='token', yielded as
+        an 'error' token.
+
+        When ``final`` is False, ``code`` is only a prefix of the input and
+        scanning stops before any decision more input could change: a match
+        reaching the last character, a run of unrecognized characters
+        reaching it, or a run containing a quote with fewer than
+        ``max_token_size`` characters after it (it may open a string
+        literal that closes later). Other runs are final as soon as the
+        next match is found.
+
+        Args:
+            code (str): Source code to scan
+            position (int): Offset to start scanning from
+            line (int): Line number at ``position``
+            column (int): Column at ``position``
+            final (bool): Whether ``code`` extends to the end of the input
+            max_token_size (int): Lookahead needed to reject a character
+                when not final
+            state (Optional[list]): If given, receives the final
+                ``[position, line, column, held]`` of the scan, where held
+                tells whether it stopped at a run containing a quote
+
+        Yields:
+            Tuple[str, str, int, int, int]: Token type, value, start offset,
+            line number and column
+        """
+        length = len(code)
+        emit_errors = self.errors == ERRORS_TOKEN
+        held = False
+        if final:
+            match_limit = gap_limit = length + 1
+        else:
+            match_limit = length - 1
+            gap_limit = length - max_token_size
+
+        for match in self.scanner.finditer(code, position):
+            start, end = match.span()
+
+            # Handle unrecognized characters, the whole run at once
+            if start != position:
+                if position > gap_limit and any(
+                        code.find(quote, position, start) >= 0 for quote in _STRING_QUOTES):
+                    held = True
+                    break
+                self._record_error(position, start, line, column, start - position)
+                if emit_errors:
+                    yield ERROR_TOKEN, code[position:start], position, line, column
+                column += start - position
+
+            # More input could extend or change this match
+            if end >= match_limit:
+                position = start
+                break
+
+            token_type = match.lastgroup
+            if token_type == 'whitespace':
+                newlines = code.count('\n', start, end)
+                if newlines:
+                    line += newlines
+                    column = end - code.rfind('\n', start, end) - 1
+                else:
+                    column += end - start
+            else:
+                yield token_type, match.group(), start, line, column
+                column += end - start
+
+            position = end
+        else:
+            # Trailing unrecognized characters
+            if position < length and position <= gap_limit:
+                self._record_error(position, length, line, column, length - position)
+                if emit_errors:
+                    yield ERROR_TOKEN, code[position:], position, line, column
+                column += length - position
+                position = length
+
+        if state is not None:
+            state[:] = (position, line, column, held)
+
+    def _scan_offsets(self, data: Union[bytes, 'mmap.mmap']) -> Iterator[Tuple[str, int, int, int, int]]:
+        """
+        Scan UTF-8 bytes with the bytes master pattern, yielding offsets only.
+
+        Mirrors _scan with final semantics. Columns count bytes; each
+        unrecognized character (not byte) counts once in ``error_count``,
+        and error spans and tokens have byte offsets.
+
+        Args:
+            data (Union[bytes, mmap.mmap]): UTF-8 encoded source
+
+        Yields:
+            Tuple[str, int, int, int, int]: Token type, start and end byte
+            offsets, line number and column
+        """
+        if self._binary_master_pattern is None:
+            self._binary_master_pattern = self._shared_master_pattern(binary=True)
+
+        emit_errors = self.errors == ERRORS_TOKEN
+        position, line, column = 0, 1, 0
+        for match in self._binary_master_pattern.finditer(data):
+            start, end = match.span()
+
+            # Handle unrecognized characters, skipping UTF-8 continuation bytes
+            if start != position:
+                self._record_error(position, start, line, column, len(
+                    data[position:start].translate(None, _CONTINUATION_BYTES)))
+                if emit_errors:
+                    yield ERROR_TOKEN, position, start, line, column
+                column += start - position
+
+            token_type = match.lastgroup
+            if token_type == 'whitespace':
+                run = data[start:end]
+                newline = run.rfind(b'\n')
+                if newline >= 0:
+                    line += run.count(b'\n')
+                    column = end - start - newline - 1
+                else:
+                    column += end - start
+            else:
+                yield token_type, start, end, line, column
+                column += end - start
+
+            position = end
+
+        # Trailing unrecognized characters
+        if position < len(data):
+            self._record_error(position, len(data), line, column, len(
+                data[position:].translate(None, _CONTINUATION_BYTES)))
+            if emit_errors:
+                yield ERROR_TOKEN, position, len(data), line, column
+
+    def _record_error(self, start: int, end: int, line: int, column: int,
+                      characters: int) -> None:
+        """
+        Account for one maximal run of unrecognized characters.
+
+        Args:
+            start (int): Offset of the run
+            end (int): Offset just past the run
+            line (int): Line number at start
+            column (int): Column at start
+            characters (int): Characters in the run (fewer than
+                end - start for UTF-8 byte offsets)
+
+        Raises:
+            LexerError: If the current input now has more than max_errors
+                unrecognized characters
+        """
+        self.error_count += characters
+        self.metrics['error_span_length'].add(characters)
+        self.error_spans.append((start, end, line, column))
+        self._call_errors += characters
+        if self.max_errors is not None and self._call_errors > self.max_errors:
+            raise LexerError(
+                f"{self._call_errors} unrecognized characters exceed max_errors="
+                f"{self.max_errors} (line {line}, column {column})",
+                start, line, column)
+
+    def _record_gap(self, code: str, start: int, end: int, line_index: 'LineIndex',
+                    tokens: List[Token], emit_errors: bool) -> None:
+        """Record code[start:end] as an error span for _tokenize_lazy,
+        appending an error token if emit_errors"""
+        line, column = line_index.position(start)
+        self._record_error(start, end, line, column, end - start)
+        if emit_errors:
+            tokens.append(LazyToken(ERROR_TOKEN, code[start:end], start, end, line_index))
+
+    def _make_token(self, token_type: str, value: str, start: int,
+                    line: int, column: int) -> Token:
+        """Build a Token from a scan result, analyzing identifiers"""
+        token = Token(
+            type=token_type,
+            value=value,
+            start=start,
+            end=start + len(value),
+            line_number=line,
+            column=column
+        )
+
+        # Perform morphological analysis for identifiers
+        if token_type == 'identifier':
+            morphemes, token.convention, token.morpheme_ids = \
+                self._analyze_identifier(value)
+            token.morphemes = list(morphemes)
+
+        return token
+
+    def _analyze_identifier(self, identifier: str) -> Tuple[Tuple[str, ...], str, Tuple[int, ...]]:
+        """
+        Return morphemes, naming convention and morpheme ids of an
+        identifier, memoized.
+
+        With intern_morphemes, morphemes are interned in the process-wide
+        SymbolTable, so equal morphemes of different identifiers share one
+        string and one id; otherwise the ids are empty.
+
+        Args:
+            identifier (str): Identifier to analyze
+
+        Returns:
+            Tuple[Tuple[str, ...], str, Tuple[int, ...]]: Morphemes, detected
+            convention and the morphemes' symbol ids
+        """
+        analysis = self.identifier_cache.get(identifier)
+        if analysis is None:
+            if self.instrumentation is None:
+                morphemes = self._analyze_morphemes(identifier)
+                convention = self._detect_naming_convention(identifier)
+            else:
+                morphemes, convention = self._analyze_identifier_instrumented(identifier)
+            if self.intern_morphemes:
+                symbols = shared_symbols()
+                ids = symbols.intern_all(morphemes)
+                analysis = (tuple(symbols.resolve(ids)), convention, ids)
+            else:
+                analysis = (tuple(morphemes), convention, ())
+            self.identifier_cache.put(identifier, analysis)
+        return analysis
+
+    def _analyze_identifier_instrumented(self, identifier: str) -> Tuple[List[str], str]:
+        """Uncached identifier analysis with a span per phase"""
+        started = time.perf_counter()
+        morphemes = self._analyze_morphemes(identifier)
+        analyzed = time.perf_counter()
+        convention = self._detect_naming_convention(identifier)
+        detected = time.perf_counter()
+
+        self.instrumentation.observe('lexer.analyze_morphemes', analyzed - started)
+        self.instrumentation.observe('lexer.detect_naming_convention', detected - analyzed)
+        self._identifier_seconds += detected - started
+        return morphemes, convention
+
     def _analyze_morphemes(self, identifier: str) -> List[str]:
         """
         Analyze identifier into morphological components.
@@ -150,12 +1083,19 @@ class MorphologicalLexer:
             return []
 
         # Split on boundaries (camelCase and snake_case)
-        parts = re.split('_|(?=[A-Z])', identifier)
+        parts = COMPOUND_BOUNDARY.split(identifier)
         parts = [p for p in parts if p]
 
         if not parts:
             return [identifier]
 
+        # Trie-backed lexicon: longest-match, multi-affix decomposition
+        if self.morpheme_dictionary is not None:
+            morphemes = []
+            for part in parts:
+                morphemes.extend(self.morpheme_dictionary.decompose(part))
+            return morphemes
+
         morphemes = []
         for part in parts:
             if not part:
@@ -165,7 +1105,7 @@ class MorphologicalLexer:
 
             # Check for prefixes
             prefix_found = False
-            for prefix in self.morpheme_patterns['prefix']:
+            for prefix in self._morpheme_patterns['prefix']:
                 if part_lower.startswith(prefix) and len(part) > len(prefix):
                     morphemes.append(prefix)
                     part = part[len(prefix):]
@@ -175,7 +1115,7 @@ class MorphologicalLexer:
 
             # Check for suffixes
             suffix_found = False
-            for suffix in self.morpheme_patterns['suffix']:
+            for suffix in self._morpheme_patterns['suffix']:
                 if part_lower.endswith(suffix) and len(part) > len(suffix):
                     remaining = part[:-len(suffix)]
                     if remaining:
@@ -217,36 +1157,130 @@ class MorphologicalLexer:
             return 'camelCase'
         return 'lowercase'
 
-    def _update_metrics(self, start_time: float) -> None:
+    def _begin_instrumented_call(self) -> Optional[Tuple[float, int, int, int, float]]:
+        """
+        Snapshot the state needed to instrument one call.
+
+        Returns:
+            Optional[Tuple[float, int, int, int, float]]: Start time, cache
+            hits and misses, error count and identifier analysis time so
+            far; None when instrumentation is disabled
+        """
+        if self.instrumentation is None:
+            return None
+        cache = self.identifier_cache
+        return (time.perf_counter(), cache.hits, cache.misses, self.error_count,
+                self._identifier_seconds)
+
+    def _end_instrumented_call(self, phase: Optional[str],
+                               begin: Tuple[float, int, int, int, float],
+                               token_types: Counter) -> None:
+        """
+        Record spans and counters for one call.
+
+        The call's duration is recorded as ``lexer.<phase>``, and the part
+        not spent analyzing identifiers as ``lexer.pattern_matching``
+        (scanning plus token construction).
+
+        Args:
+            phase (Optional[str]): Call name; None records counters only
+            begin (Tuple[float, int, int, int, float]): From
+                _begin_instrumented_call
+            token_types (Counter): Tokens produced, by type
+        """
+        started, hits, misses, errors, identifier_seconds = begin
+        instrumentation = self.instrumentation
+        if phase is not None:
+            elapsed = time.perf_counter() - started
+            instrumentation.observe(f'lexer.{phase}', elapsed)
+            instrumentation.observe(
+                'lexer.pattern_matching',
+                max(elapsed - (self._identifier_seconds - identifier_seconds), 0.0))
+
+        for token_type, count in token_types.items():
+            instrumentation.increment('tokens', count, type=token_type)
+        instrumentation.increment('identifier_cache_hits',
+                                  self.identifier_cache.hits - hits)
+        instrumentation.increment('identifier_cache_misses',
+                                  self.identifier_cache.misses - misses)
+        instrumentation.increment('unrecognized_characters',
+                                  self.error_count - errors)
+
+    def _start_metrics(self) -> Optional[float]:
+        """
+        Start performance monitoring for one call according to metrics_level,
+        and the call's count of unrecognized characters for max_errors.
+
+        Returns:
+            Optional[float]: perf_counter start time, None when metrics are off
+        """
+        self._call_errors = 0
+        if self.metrics_level == METRICS_TIMING:
+            return time.perf_counter()
+        if self.metrics_level == METRICS_MEMORY:
+            import tracemalloc
+
+            # Leave tracing alone if someone else already started it
+            self._owns_tracemalloc = not tracemalloc.is_tracing()
+            if self._owns_tracemalloc:
+                tracemalloc.start()
+            return time.perf_counter()
+        return None
+
+    def _update_metrics(self, start_time: Optional[float]) -> None:
         """
         Update performance metrics.
 
         Args:
-            start_time (float): Processing start time
+            start_time (Optional[float]): Processing start time from
+                _start_metrics
         """
-        end_time = time.time()
-        current, peak = tracemalloc.get_traced_memory()
+        if start_time is None:
+            return
 
-        self.metrics['processing_time'].append(end_time - start_time)
-        self.metrics['memory_usage'].append(
-            current / 1024 / 1024)  # Convert to MB
-        self.metrics['peak_memory'].append(peak / 1024 / 1024)  # Convert to MB
+        self.metrics['processing_time'].add(time.perf_counter() - start_time)
+
+        if self.metrics_level == METRICS_MEMORY:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+            self.metrics['memory_usage'].add(
+                current / 1024 / 1024)  # Convert to MB
+            self.metrics['peak_memory'].add(peak / 1024 / 1024)  # Convert to MB
 
     def get_metrics(self) -> Dict:
         """
         Get performance metrics.
 
+        Measurements that the current metrics_level does not collect are
+        reported as None.
+
         Returns:
             Dict: Dictionary of performance metrics
         """
-        if not self.metrics['processing_time']:
+        processing_time = self.metrics['processing_time']
+        error_spans = self.metrics['error_span_length']
+        if not processing_time.count and not self.token_count:
             return {}
 
         return {
-            'average_processing_time': statistics.mean(self.metrics['processing_time']),
+            'average_processing_time': processing_time.mean,
             'total_tokens': self.token_count,
             'error_rate': self.error_count / max(1, self.token_count),
-            'average_memory_usage': statistics.mean(self.metrics['memory_usage']),
-            'peak_memory_usage': max(self.metrics['peak_memory']),
-            'tokens_per_second': self.token_count / sum(self.metrics['processing_time'])
+            'average_memory_usage': self.metrics['memory_usage'].mean,
+            'peak_memory_usage': self.metrics['peak_memory'].maximum,
+            'tokens_per_second': (self.token_count / processing_time.total
+                                  if processing_time.total else None),
+            'processing_time_percentiles': processing_time.percentiles(),
+            'error_spans': {
+                'count': error_spans.count,
+                'characters': self.error_count,
+                'mean_length': error_spans.mean,
+                'longest': error_spans.maximum,
+                'recent': [dict(zip(('start', 'end', 'line', 'column'), span))
+                           for span in self.error_spans]
+            },
+            'identifier_cache': self.identifier_cache.stats()
         }
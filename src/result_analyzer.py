@@ -1,8 +1,14 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
-from collections import defaultdict, Counter
-from datetime import datetime
+from typing import List, Dict, Optional, Union, Iterable, Callable, Tuple
+from collections import Counter
 from .morphological_lexer import Token
+from .symbols import SymbolTable, shared_symbols
+from .token_buffer import TokenBuffer
+
+# Analysis backends supported by ResultAnalyzer
+BACKEND_PYTHON = 'python'
+BACKEND_NUMPY = 'numpy'
+BACKENDS = (BACKEND_PYTHON, BACKEND_NUMPY)
 
 
 @dataclass
@@ -16,63 +22,270 @@ class AnalysisMetrics:
 
 
 class ResultAnalyzer:
-    def __init__(self):
-        self.token_stats = defaultdict(int)
-        self.convention_stats = defaultdict(int)
-        self.morpheme_stats = defaultdict(int)
-        self.pattern_stats = defaultdict(list)
+    """
+    Token statistics built on constant-size, mergeable accumulators.
+
+    Counters are kept per token type, convention, morpheme and identifier
+    flag, plus a histogram of identifier lengths, so memory does not grow
+    with the number of tokens. Use ``update`` to feed tokens incrementally,
+    ``merge`` to combine analyzers from different shards and ``snapshot``
+    to produce the report; ``analyze_tokens`` does all three for a single
+    token list.
+
+    Morphemes are counted by their id in a SymbolTable and resolved to
+    strings only in the report. By default each analyzer has a table of its
+    own, dropped with it; given the process-wide table (shared_symbols())
+    the ids lexers attach with intern_morphemes are counted directly.
+    Pickled analyzers carry only the symbols they count, and merging
+    translates the other analyzer's ids into this one's table. Subtracting
+    compacts an owned table once most of its symbols are no longer counted,
+    so a long-lived analyzer only holds the morphemes it still counts.
+
+    The 'numpy' backend encodes each batch into arrays of type ids, lengths
+    and identifier flag bits and counts them with vectorized operations;
+    TokenBuffers are read column-wise without materializing tokens. Its
+    reports add identifier length percentiles and histograms, per-convention
+    length percentiles and the most frequent morpheme pairs.
+
+    With ``approximate`` (True, or an AnalysisSketches with chosen error
+    bounds) morphemes are not counted exactly: fixed-size sketches estimate
+    the number of distinct morphemes and identifiers, the most frequent
+    morphemes and the frequency of any morpheme or identifier from the
+    token's morpheme strings, without interning them, so memory stays
+    bounded on corpora of any size as long as the lexer does not intern
+    either (see intern_morphemes). The report's 'morpheme_frequency'
+    then holds only the top morphemes, and 'approximation' the error bounds.
+    Approximate analyzers merge with each other but cannot subtract.
+    """
+
+    def __init__(self, instrumentation: Optional['Instrumentation'] = None,
+                 backend: str = BACKEND_PYTHON, top_pairs: int = 20,
+                 symbols: Optional[SymbolTable] = None,
+                 approximate: Union[bool, 'AnalysisSketches'] = False):
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+        if approximate and backend != BACKEND_PYTHON:
+            raise ValueError("approximate analysis requires the 'python' backend")
+        if backend == BACKEND_NUMPY:
+            try:
+                from . import vectorized  # noqa: F401
+            except ImportError as exc:
+                raise ImportError("the 'numpy' backend requires NumPy") from exc
+        self.backend = backend
+        self.top_pairs = top_pairs
+        self.instrumentation = instrumentation
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self._owns_symbols = symbols is None
+        self._token_ids_valid = True
+        self.token_stats = Counter()
+        self.convention_stats = Counter()
+        self.morpheme_stats = Counter()
+        self.pattern_stats = Counter()
+        self.length_histogram = Counter()
+        self.total_length = 0
+        self.identifier_count = 0
         self.analysis_timestamp = None
 
-    def analyze_tokens(self, tokens: List[Token]) -> Dict:
-        """Analyze token distribution and patterns with enhanced metrics"""
+        # Identifier length histogram per convention and counts of morpheme
+        # id pairs (lower id first), filled by the numpy backend
+        self.convention_lengths: Dict[Optional[str], Counter] = {}
+        self.morpheme_pairs = Counter()
+
+        # Sketches replacing the exact morpheme counts
+        if approximate is True:
+            from .sketches import AnalysisSketches
+
+            approximate = AnalysisSketches()
+        self.sketches: Optional['AnalysisSketches'] = approximate or None
+
+    def __getstate__(self) -> Dict:
+        # Instrumentation belongs to the process that recorded it
+        state = dict(self.__dict__)
+        state['instrumentation'] = None
+
+        # Only the symbols counted here, renumbered densely
+        used = SymbolTable()
+        symbol = self.symbols.symbol
+        state['morpheme_stats'], state['morpheme_pairs'] = _remap_counts(
+            self.morpheme_stats, self.morpheme_pairs,
+            lambda symbol_id: used.intern(symbol(symbol_id)))
+        state['symbols'] = used
+        state['_owns_symbols'] = True
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.sketches = None
+        self.__dict__.update(state)
+        self._owns_symbols = True
+        if 'symbols' not in state:
+            # Pickled before morphemes were interned: keyed by string
+            self.symbols = SymbolTable()
+            self.morpheme_stats, self.morpheme_pairs = _remap_counts(
+                self.morpheme_stats, self.morpheme_pairs, self.symbols.intern)
+
+    def analyze_tokens(self, tokens: Union[List[Token], TokenBuffer]) -> Dict:
+        """Analyze token distribution and patterns with enhanced metrics.
+
+        Accepts a list of tokens or a TokenBuffer, whose tokens are
+        materialized one at a time while iterating.
+        """
         self._reset_stats()
-        self.analysis_timestamp = datetime.now()
+        self.update(tokens)
+        return self.snapshot()
+
+    def update(self, tokens: Iterable[Token]) -> 'ResultAnalyzer':
+        """Add tokens to the running statistics without resetting them"""
+        if self.instrumentation is not None:
+            with self.instrumentation.span('analyzer.update'):
+                return self._update(tokens)
+        return self._update(tokens)
+
+    def _update(self, tokens: Iterable[Token]) -> 'ResultAnalyzer':
+        if self.analysis_timestamp is None:
+            from datetime import datetime
 
+            self.analysis_timestamp = datetime.now()
+
+        if self.backend == BACKEND_NUMPY:
+            from . import vectorized
+
+            if isinstance(tokens, TokenBuffer) and isinstance(tokens.source, str):
+                vectorized.update_from_buffer(self, tokens)
+            else:
+                vectorized.update_from_tokens(self, tokens)
+            return self
+
+        token_stats = self.token_stats
         total_length = 0
-        identifier_count = 0
+        self._token_ids_valid = self.symbols is shared_symbols()
 
         for token in tokens:
             # Basic token statistics
-            self.token_stats[token.type] += 1
+            token_stats[token.type] += 1
             total_length += len(token.value)
 
             if token.type == 'identifier':
-                identifier_count += 1
                 self._analyze_identifier(token)
 
-        # Calculate advanced metrics
-        metrics = self._calculate_metrics(
-            total_length, len(tokens), identifier_count)
+        self.total_length += total_length
+        return self
 
+    def merge(self, other: 'ResultAnalyzer') -> 'ResultAnalyzer':
+        """Fold the statistics of another analyzer (e.g. a shard) into this one"""
+        if (self.sketches is None) != (other.sketches is None):
+            raise ValueError("cannot merge exact and approximate analyzers")
+        if self.sketches is not None:
+            self.sketches.merge(other.sketches)
+        morpheme_stats, morpheme_pairs = other.morpheme_stats, other.morpheme_pairs
+        if other.symbols is not self.symbols:
+            morpheme_stats, morpheme_pairs = _remap_counts(
+                morpheme_stats, morpheme_pairs,
+                self.symbols.remap(other.symbols).__getitem__)
+
+        self.token_stats.update(other.token_stats)
+        self.convention_stats.update(other.convention_stats)
+        self.morpheme_stats.update(morpheme_stats)
+        self.pattern_stats.update(other.pattern_stats)
+        self.length_histogram.update(other.length_histogram)
+        self.total_length += other.total_length
+        self.identifier_count += other.identifier_count
+        for convention, lengths in other.convention_lengths.items():
+            self.convention_lengths.setdefault(convention, Counter()).update(lengths)
+        self.morpheme_pairs.update(morpheme_pairs)
+        if other.analysis_timestamp is not None and (
+                self.analysis_timestamp is None
+                or other.analysis_timestamp < self.analysis_timestamp):
+            self.analysis_timestamp = other.analysis_timestamp
+        return self
+
+    def subtract(self, other: 'ResultAnalyzer') -> 'ResultAnalyzer':
+        """Remove the statistics of an analyzer previously merged into this one
+
+        Counts that drop to zero are removed, so subtracting a file's
+        analyzer leaves the same state as never having merged it. The
+        timestamp of the earliest update is kept.
+        """
+        if self.sketches is not None or other.sketches is not None:
+            raise ValueError("approximate analyzers cannot be subtracted")
+        morpheme_stats, morpheme_pairs = other.morpheme_stats, other.morpheme_pairs
+        if other.symbols is not self.symbols:
+            morpheme_stats, morpheme_pairs = _remap_counts(
+                morpheme_stats, morpheme_pairs,
+                self.symbols.remap(other.symbols).__getitem__)
+
+        self.token_stats -= other.token_stats
+        self.convention_stats -= other.convention_stats
+        self.morpheme_stats -= morpheme_stats
+        self.pattern_stats -= other.pattern_stats
+        self.length_histogram -= other.length_histogram
+        self.total_length -= other.total_length
+        self.identifier_count -= other.identifier_count
+        for convention, lengths in other.convention_lengths.items():
+            remaining = self.convention_lengths.get(convention, Counter()) - lengths
+            if remaining:
+                self.convention_lengths[convention] = remaining
+            else:
+                self.convention_lengths.pop(convention, None)
+        self.morpheme_pairs -= morpheme_pairs
+        if self._owns_symbols and len(self.symbols) > 2 * len(self.morpheme_stats) + 1024:
+            self._compact_symbols()
+        return self
+
+    def _compact_symbols(self) -> None:
+        """Renumber the owned table down to the symbols still counted"""
+        used = SymbolTable()
+        symbol = self.symbols.symbol
+        self.morpheme_stats, self.morpheme_pairs = _remap_counts(
+            self.morpheme_stats, self.morpheme_pairs,
+            lambda symbol_id: used.intern(symbol(symbol_id)))
+        self.symbols = used
+
+    def snapshot(self) -> Dict:
+        """Compile the report for everything seen so far, keeping the state"""
+        if self.instrumentation is not None:
+            with self.instrumentation.span('analyzer.snapshot'):
+                return self._snapshot()
+        return self._snapshot()
+
+    def _snapshot(self) -> Dict:
+        metrics = self._calculate_metrics(
+            self.total_length, sum(self.token_stats.values()),
+            self.identifier_count)
         return self._compile_results(metrics)
 
     def _analyze_identifier(self, token: Token) -> None:
         """Analyze individual identifier patterns and conventions"""
+        self.identifier_count += 1
+
         # Convention analysis
         self.convention_stats[token.convention] += 1
 
-        # Morpheme analysis
-        for morpheme in token.morphemes:
-            self.morpheme_stats[morpheme] += 1
+        # Morpheme analysis, by symbol id; ids on tokens refer to the
+        # process-wide table and are missing unless the lexer interns
+        if self.sketches is not None:
+            self.sketches.add_identifier(token.value, token.morphemes)
+        elif token.morpheme_ids and self._token_ids_valid:
+            self.morpheme_stats.update(token.morpheme_ids)
+        elif token.morphemes:
+            self.morpheme_stats.update(self.symbols.intern_all(token.morphemes))
 
         # Pattern analysis
         self._analyze_patterns(token)
 
     def _analyze_patterns(self, token: Token) -> None:
         """Analyze identifier patterns in detail"""
+        value = token.value
+
         # Length pattern
-        self.pattern_stats['length'].append(len(token.value))
+        self.length_histogram[len(value)] += 1
 
         # Complexity patterns
-        has_number = any(c.isdigit() for c in token.value)
-        has_underscore = '_' in token.value
-        has_camel_case = any(c.isupper() for c in token.value[1:])
-
-        self.pattern_stats['complexity'].append({
-            'has_number': has_number,
-            'has_underscore': has_underscore,
-            'has_camel_case': has_camel_case
-        })
+        if any(c.isdigit() for c in value):
+            self.pattern_stats['has_number'] += 1
+        if '_' in value:
+            self.pattern_stats['has_underscore'] += 1
+        if any(c.isupper() for c in value[1:]):
+            self.pattern_stats['has_camel_case'] += 1
 
     def _calculate_metrics(self, total_length: int, token_count: int,
                            identifier_count: int) -> AnalysisMetrics:
@@ -96,7 +309,8 @@ class ResultAnalyzer:
 
         return AnalysisMetrics(
             total_tokens=token_count,
-            unique_morphemes=len(self.morpheme_stats),
+            unique_morphemes=(len(self.morpheme_stats) if self.sketches is None
+                              else self.sketches.unique_morphemes.estimate()),
             avg_token_length=avg_token_length,
             convention_distribution=convention_dist,
             pattern_accuracy=pattern_accuracy
@@ -104,17 +318,14 @@ class ResultAnalyzer:
 
     def _calculate_pattern_accuracy(self) -> Dict[str, float]:
         """Calculate pattern recognition accuracy"""
-        if not self.pattern_stats['complexity']:
+        if not self.identifier_count:
             return {}
 
-        total_patterns = len(self.pattern_stats['complexity'])
+        total_patterns = self.identifier_count
         accuracies = {
-            'number_usage': sum(1 for p in self.pattern_stats['complexity']
-                                if p['has_number']) / total_patterns * 100,
-            'underscore_usage': sum(1 for p in self.pattern_stats['complexity']
-                                    if p['has_underscore']) / total_patterns * 100,
-            'camel_case_usage': sum(1 for p in self.pattern_stats['complexity']
-                                    if p['has_camel_case']) / total_patterns * 100
+            'number_usage': self.pattern_stats['has_number'] / total_patterns * 100,
+            'underscore_usage': self.pattern_stats['has_underscore'] / total_patterns * 100,
+            'camel_case_usage': self.pattern_stats['has_camel_case'] / total_patterns * 100
         }
         return accuracies
 
@@ -123,16 +334,26 @@ class ResultAnalyzer:
         self.token_stats.clear()
         self.convention_stats.clear()
         self.morpheme_stats.clear()
-        self.pattern_stats = defaultdict(list)
+        self.pattern_stats.clear()
+        self.length_histogram.clear()
+        self.total_length = 0
+        self.identifier_count = 0
         self.analysis_timestamp = None
+        self.convention_lengths.clear()
+        self.morpheme_pairs.clear()
+        if self._owns_symbols:
+            self.symbols = SymbolTable()
+        if self.sketches is not None:
+            self.sketches.clear()
 
     def _compile_results(self, metrics: AnalysisMetrics) -> Dict:
         """Compile and return comprehensive analysis results"""
-        return {
+        results = {
             'timestamp': self.analysis_timestamp,
             'token_distribution': dict(self.token_stats),
             'naming_conventions': dict(self.convention_stats),
-            'morpheme_frequency': dict(self.morpheme_stats),
+            'morpheme_frequency': {self.symbols.symbol(symbol_id): count
+                                   for symbol_id, count in self.morpheme_stats.items()},
             'total_tokens': metrics.total_tokens,
             'unique_morphemes': metrics.unique_morphemes,
             'average_token_length': round(metrics.avg_token_length, 2),
@@ -144,3 +365,37 @@ class ResultAnalyzer:
                 'convention_counts': dict(self.convention_stats)
             }
         }
+        if self.sketches is not None:
+            results['morpheme_frequency'] = dict(self.sketches.top_morphemes.top())
+            results['approximation'] = self.sketches.report()
+        if self.backend == BACKEND_NUMPY:
+            results.update(self._distribution_results())
+        return results
+
+    def _distribution_results(self) -> Dict:
+        """Length percentiles, histograms and morpheme co-occurrence"""
+        from .vectorized import histogram_percentiles, top_pairs
+
+        return {
+            'identifier_length_percentiles': histogram_percentiles(self.length_histogram),
+            'identifier_length_histogram': dict(sorted(self.length_histogram.items())),
+            'convention_length_percentiles': {
+                convention: histogram_percentiles(lengths)
+                for convention, lengths in self.convention_lengths.items()
+            },
+            'morpheme_cooccurrence': top_pairs(self.morpheme_pairs, self.top_pairs,
+                                               self.symbols)
+        }
+
+
+def _remap_counts(morpheme_stats: Counter, morpheme_pairs: Counter,
+                  translate: Callable[[int], int]) -> Tuple[Counter, Counter]:
+    """Morpheme and pair counters with every key passed through translate"""
+    stats = Counter()
+    for key, count in morpheme_stats.items():
+        stats[translate(key)] += count
+    pairs = Counter()
+    for (first, second), count in morpheme_pairs.items():
+        first, second = translate(first), translate(second)
+        pairs[(first, second) if first < second else (second, first)] += count
+    return stats, pairs
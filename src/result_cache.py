@@ -0,0 +1,303 @@
+from typing import Dict, Optional, Sequence, Tuple, TYPE_CHECKING
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+import zlib
+
+from . import __version__
+from .token_buffer import TokenBuffer
+
+if TYPE_CHECKING:
+    from .morphological_lexer import MorphologicalLexer
+    from .validation_framework import ValidationFramework
+
+
+# Default on-disk budget for cached entries
+DEFAULT_MAX_BYTES = 256 << 20
+
+# Token buffer columns persisted with each entry
+_COLUMNS = ('types', 'starts', 'ends', 'lines', 'columns', 'morpheme_ids',
+            'convention_ids')
+
+
+def lexer_config(lexer: 'MorphologicalLexer') -> Dict:
+    """
+    JSON-ready description of everything in a lexer's configuration that
+    shapes its tokens and morphemes, plus the library version.
+
+    Args:
+        lexer (MorphologicalLexer): Lexer to describe
+
+    Returns:
+        Dict: Version, patterns, engine, error handling, morpheme
+        patterns and dictionary
+    """
+    dictionary = lexer.morpheme_dictionary
+    if dictionary is not None:
+        dictionary = {
+            'prefix': sorted(dictionary.prefixes),
+            'suffix': sorted(dictionary.suffixes),
+            'root': sorted(dictionary.roots),
+            'min_stem_length': dictionary.min_stem_length,
+            'max_affixes': dictionary.max_affixes
+        }
+    return {
+        'version': __version__,
+        'patterns': lexer.patterns,
+        'engine': lexer.engine,
+        'errors': lexer.errors,
+        'max_errors': lexer.max_errors,
+        'morpheme_patterns': lexer.morpheme_patterns,
+        'morpheme_dictionary': dictionary
+    }
+
+
+class ResultCache:
+    """
+    Persistent SQLite cache of per-file tokens and analysis results.
+
+    Entries are keyed by a hash of the source text together with everything
+    that affects the output: lexer patterns and engine, morpheme configuration
+    (including a MorphemeDictionary's contents), validation rules, the
+    stages run and the library version. Changing any of these simply misses
+    the old entries, which age out through least-recently-used eviction
+    once the cache grows past ``max_bytes``. Rules enter the key by the
+    module and qualified name of their check, plus any version given to
+    ``register_rule``; results of rules that cannot be identified that
+    way, such as lambdas registered without a version, are not cached.
+
+    Entries are pickled; only open cache files you trust. Several processes
+    may share one cache file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 check_every: int = 64):
+        """
+        Args:
+            path (str): SQLite database file, created if missing
+            max_bytes (int): Size budget for stored entries
+            check_every (int): Insertions between size checks
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.check_every = max(1, check_every)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts = 0
+        self._touched: Dict[str, float] = {}
+        self._config_digests: Dict[Tuple, str] = {}
+
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                result BLOB NOT NULL,
+                tokens BLOB,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )''')
+        self._db.execute(
+            'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self._db.commit()
+
+    def key(self, code: str, lexer: 'MorphologicalLexer',
+            stages: Sequence[str] = (),
+            validator: Optional['ValidationFramework'] = None) -> Optional[str]:
+        """
+        Cache key for running ``stages`` over code with lexer and validator.
+
+        Args:
+            code (str): Source text
+            lexer (MorphologicalLexer): Lexer whose configuration applies
+            stages (Sequence[str]): Stages run
+            validator (Optional[ValidationFramework]): Validator whose rules
+                apply
+
+        Returns:
+            Optional[str]: Hex digest, None when a validation rule cannot be
+            identified and the result must not be cached
+        """
+        digest = self._config_digest(lexer, stages, validator)
+        if digest is None:
+            return None
+        content = hashlib.sha256(code.encode('utf-8', 'surrogatepass')).hexdigest()
+        return f"{content}:{digest}"
+
+    def _config_digest(self, lexer: 'MorphologicalLexer', stages: Sequence[str],
+                       validator: Optional['ValidationFramework']) -> Optional[str]:
+        """Digest of everything besides the source that shapes an entry"""
+        # Rules enter by the identity of their logic, not just their names;
+        # subclasses may override the built-in checks
+        validator_class, rules = None, ()
+        if validator is not None:
+            cls = type(validator)
+            validator_class = f"{cls.__module__}.{cls.__qualname__}"
+            rules = tuple(sorted(validator.rule_identities().items()))
+            if any(identity is None for _, identity in rules):
+                return None
+        memo_key = (id(lexer), lexer._fingerprint_morphemes(), lexer.engine,
+                    lexer.errors, lexer.max_errors, tuple(lexer.patterns.items()),
+                    tuple(stages), validator_class, rules)
+
+        digest = self._config_digests.get(memo_key)
+        if digest is None:
+            config = dict(lexer_config(lexer), stages=list(stages),
+                          validator=validator_class, rules=dict(rules))
+            digest = hashlib.sha256(
+                json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+            self._config_digests[memo_key] = digest
+        return digest
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up the analysis result stored under key.
+
+        Returns:
+            Optional[Dict]: The stored result, None on a miss
+        """
+        row = self._db.execute(
+            'SELECT result FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key)
+        return pickle.loads(zlib.decompress(row[0]))
+
+    def get_tokens(self, key: str, source: str) -> Optional[TokenBuffer]:
+        """
+        Look up the tokens stored under key.
+
+        Args:
+            key (str): Cache key
+            source (str): Source text the key was computed from, attached
+                to the returned buffer
+
+        Returns:
+            Optional[TokenBuffer]: Stored tokens over source, None if absent
+        """
+        row = self._db.execute(
+            'SELECT tokens FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        self._touch(key)
+
+        state = pickle.loads(zlib.decompress(row[0]))
+        buffer = TokenBuffer(source)
+        for name in _COLUMNS:
+            setattr(buffer, name, state[name])
+        buffer.type_names = state['type_names']
+        buffer.morpheme_table = state['morpheme_table']
+        buffer.convention_names = state['convention_names']
+        buffer._type_index = {name: i for i, name in enumerate(buffer.type_names)}
+        buffer._morpheme_index = {m: i for i, m in enumerate(buffer.morpheme_table)}
+        buffer._convention_index = {name: i for i, name in
+                                    enumerate(buffer.convention_names)}
+        return buffer
+
+    def put(self, key: str, result: Dict,
+            tokens: Optional[TokenBuffer] = None) -> None:
+        """
+        Store a result, and optionally its tokens, under key.
+
+        Args:
+            key (str): Cache key
+            result (Dict): Picklable analysis result
+            tokens (Optional[TokenBuffer]): Tokens to store (without source)
+        """
+        result_blob = zlib.compress(pickle.dumps(result, pickle.HIGHEST_PROTOCOL), 1)
+        tokens_blob = None
+        if tokens is not None:
+            state = {name: getattr(tokens, name) for name in _COLUMNS}
+            state['type_names'] = tokens.type_names
+            state['morpheme_table'] = tokens.morpheme_table
+            state['convention_names'] = tokens.convention_names
+            tokens_blob = zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL), 1)
+
+        size = len(result_blob) + (len(tokens_blob) if tokens_blob else 0)
+        self._db.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+            (key, result_blob, tokens_blob, size, time.time()))
+        self._db.commit()
+
+        self._puts += 1
+        if self._puts % self.check_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until the cache fits max_bytes,
+        leaving 10% headroom.
+
+        Returns:
+            int: Number of entries removed
+        """
+        self._flush_access_times()
+        total = self.size()
+        if total <= self.max_bytes:
+            return 0
+
+        target = total - int(self.max_bytes * 0.9)
+        removed, freed = 0, 0
+        rows = self._db.execute(
+            'SELECT key, size FROM entries ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if freed >= target:
+                break
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            freed += size
+            removed += 1
+        self._db.commit()
+
+        self.evictions += removed
+        return removed
+
+    def _touch(self, key: str) -> None:
+        """Record an access; access times are written in batches"""
+        self._touched[key] = time.time()
+        if len(self._touched) >= self.check_every:
+            self._flush_access_times()
+
+    def _flush_access_times(self) -> None:
+        if self._touched:
+            self._db.executemany('UPDATE entries SET accessed = ? WHERE key = ?',
+                                 [(accessed, key) for key, accessed in self._touched.items()])
+            self._db.commit()
+            self._touched.clear()
+
+    def size(self) -> int:
+        """Total bytes of stored entries"""
+        return self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and eviction counts for this connection"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        self._db.execute('DELETE FROM entries')
+        self._db.commit()
+
+    def close(self) -> None:
+        """Apply eviction and close the database"""
+        self.evict()
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
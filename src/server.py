@@ -0,0 +1,445 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+
+from .metrics import MetricSeries
+from .morphological_lexer import MorphologicalLexer
+from .result_analyzer import ResultAnalyzer
+from .validation_framework import ValidationFramework
+
+
+# Operations accepted in the 'op' field of a request
+OPERATIONS = ('tokenize', 'analyze', 'validate')
+
+# Warm instances of a worker process, created by _init_worker
+_worker_state: Dict[str, Any] = {}
+
+# Warm instances of each batch thread, created by _init_thread
+_thread_state = threading.local()
+
+
+def process_request(op: str, code: str, lexer: MorphologicalLexer,
+                    validator: ValidationFramework) -> Any:
+    """
+    Run one operation and return a JSON-ready result.
+
+    Args:
+        op (str): 'tokenize', 'analyze' or 'validate'
+        code (str): Source text
+        lexer (MorphologicalLexer): Warm lexer
+        validator (ValidationFramework): Warm validator
+
+    Returns:
+        Any: Token dicts, the analysis report or the validation results
+    """
+    tokens = lexer.tokenize(code)
+    if op == 'tokenize':
+        return [{
+            'type': token.type,
+            'value': token.value,
+            'start': token.start,
+            'end': token.end,
+            'line_number': token.line_number,
+            'column': token.column,
+            'morphemes': token.morphemes,
+            'convention': token.convention
+        } for token in tokens]
+    if op == 'analyze':
+        analysis = ResultAnalyzer().analyze_tokens(tokens)
+        analysis['timestamp'] = analysis['timestamp'].isoformat()
+        return analysis
+    return validator.validate_tokens(tokens)
+
+
+def _init_worker() -> None:
+    _worker_state['lexer'] = MorphologicalLexer(metrics_level='off')
+    _worker_state['validator'] = ValidationFramework()
+
+
+def _process_in_worker(op: str, code: str) -> Any:
+    return process_request(op, code, _worker_state['lexer'],
+                           _worker_state['validator'])
+
+
+def _init_thread() -> None:
+    _thread_state.lexer = MorphologicalLexer(metrics_level='off')
+    _thread_state.validator = ValidationFramework()
+
+
+def _process_batch(batch: Sequence[Tuple[str, str]]) -> List[Tuple[Any, Optional[str]]]:
+    """Run (op, code) requests in a batch thread; (result, error) for each"""
+    outcomes = []
+    for op, code in batch:
+        try:
+            result = process_request(op, code, _thread_state.lexer,
+                                     _thread_state.validator)
+        except Exception as exc:
+            outcomes.append((None, LexerServer._describe(exc)))
+        else:
+            outcomes.append((result, None))
+    return outcomes
+
+
+class LexerServer:
+    """
+    JSON-lines lexing service over localhost TCP or a Unix socket.
+
+    Each request line is an object with an 'op' ('tokenize', 'analyze',
+    'validate' or 'stats'), the source in 'code' and an optional 'id'
+    echoed in the response; responses carry 'ok' plus 'result' or 'error'
+    and may arrive out of order. Small requests queue and are drained in
+    batches, each run by one of ``threads`` threads with a warm lexer of
+    its own, so the event loop keeps reading and writing meanwhile;
+    requests larger than ``large_request`` characters go to a process pool.
+    Both paths are bounded, so a full server stops reading from clients
+    instead of buffering without limit.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 path: Optional[str] = None, workers: Optional[int] = None,
+                 queue_size: int = 1024, batch_size: int = 64,
+                 large_request: int = 1 << 12,
+                 max_request_size: int = 1 << 26,
+                 metrics_window: int = 4096, threads: int = 2):
+        """
+        Args:
+            host (str): TCP host, ignored when path is given
+            port (int): TCP port (0 picks a free one)
+            path (Optional[str]): Unix socket path to listen on instead
+            workers (Optional[int]): Pool processes for large requests
+                (defaults to the CPU count; 0 handles everything in-process)
+            queue_size (int): Small requests waiting before clients block
+            batch_size (int): Small requests handled per batch
+            large_request (int): Size from which requests go to the pool;
+                tokenizing takes about 1ms per 1K characters, all of it
+                blocking the event loop when done in-process
+            max_request_size (int): Longest accepted request line in bytes
+            metrics_window (int): Recent latencies kept for percentiles
+            threads (int): Threads running batches; with more than one, a
+                slow batch does not hold up the next
+        """
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads)
+        self.large_request = large_request
+        self.max_request_size = max_request_size
+
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._pool_slots: Optional[asyncio.Semaphore] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._batch_threads: Optional[ThreadPoolExecutor] = None
+        self._thread_slots: Optional[asyncio.Semaphore] = None
+
+        # Service statistics
+        self.latency = MetricSeries(metrics_window)
+        self.batch_sizes = MetricSeries(metrics_window)
+        self.requests = 0
+        self.errors = 0
+        self.offloaded = 0
+        self.pool_pending = 0
+        self.max_queue_depth = 0
+        self.connections = 0
+
+    async def start(self) -> None:
+        """Start listening; see address for where"""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._batch_threads = ThreadPoolExecutor(self.threads, initializer=_init_thread)
+        self._thread_slots = asyncio.Semaphore(self.threads)
+        if self.workers:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+            self._pool_slots = asyncio.Semaphore(self.workers * 2)
+        self._batcher = asyncio.ensure_future(self._run_batches())
+
+        if self.path:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, self.path, limit=self.max_request_size)
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, self.host, self.port,
+                limit=self.max_request_size)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    @property
+    def address(self) -> str:
+        """Listening address, 'host:port' or the socket path"""
+        return self.path or f"{self.host}:{self.port}"
+
+    async def serve_forever(self) -> None:
+        """Start (if needed) and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Stop accepting requests and shut the worker pool down"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            self._batcher = None
+        if self._batch_threads is not None:
+            self._batch_threads.shutdown(wait=False)
+            self._batch_threads = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        connection = _Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    self._write(connection, None, error='request too large')
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                received = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    request_id = request.get('id')
+                    op = request['op']
+                except (ValueError, KeyError, AttributeError, TypeError):
+                    self._write(connection, None, error='malformed request')
+                    continue
+
+                if op == 'stats':
+                    self._write(connection, request_id, result=self.stats())
+                    continue
+                code = request.get('code')
+                if op not in OPERATIONS or not isinstance(code, str):
+                    self._write(connection, request_id,
+                                error=f"expected op in {OPERATIONS} and a 'code' string")
+                    continue
+
+                # Waiting here for queue space or a pool slot is the
+                # backpressure: this client is not read from meanwhile
+                connection.outstanding += 1
+                if self._pool is not None and len(code) >= self.large_request:
+                    await self._pool_slots.acquire()
+                    self._offload(connection, request_id, op, code, received)
+                else:
+                    await self._queue.put((connection, request_id, op, code, received))
+                    self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+                await connection.drain()
+        finally:
+            # Answer everything already accepted before closing
+            await connection.finished()
+            writer.close()
+            self.connections -= 1
+
+    def _offload(self, connection: '_Connection', request_id: Any, op: str,
+                 code: str, received: float) -> None:
+        """Run a large request in the process pool"""
+        self.offloaded += 1
+        self.pool_pending += 1
+        work = asyncio.get_running_loop().run_in_executor(
+            self._pool, _process_in_worker, op, code)
+
+        def done(work: asyncio.Future) -> None:
+            self.pool_pending -= 1
+            self._pool_slots.release()
+            if work.exception() is not None:
+                self._complete(connection, request_id, received,
+                               error=self._describe(work.exception()))
+            else:
+                self._complete(connection, request_id, received, result=work.result())
+        work.add_done_callback(done)
+
+    async def _run_batches(self) -> None:
+        """Drain the small-request queue a batch at a time into the threads"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Requests keep queueing while every thread is busy
+            await self._thread_slots.acquire()
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self.batch_sizes.add(len(batch))
+
+            work = loop.run_in_executor(self._batch_threads, _process_batch,
+                                        [(op, code) for _, _, op, code, _ in batch])
+            work.add_done_callback(partial(self._finish_batch, batch))
+
+    def _finish_batch(self, batch: List[Tuple], work: asyncio.Future) -> None:
+        """Answer the requests of a batch a thread has run"""
+        self._thread_slots.release()
+        if work.exception() is not None:
+            outcomes = [(None, self._describe(work.exception()))] * len(batch)
+        else:
+            outcomes = work.result()
+        for (connection, request_id, _, _, received), (result, error) in zip(batch, outcomes):
+            self._complete(connection, request_id, received, result=result, error=error)
+
+    @staticmethod
+    def _describe(exc: BaseException) -> str:
+        return f"{type(exc).__name__}: {exc}"
+
+    def _complete(self, connection: '_Connection', request_id: Any,
+                  received: float, result: Any = None,
+                  error: Optional[str] = None) -> None:
+        """Answer an accepted request and record its latency"""
+        self._write(connection, request_id, result, error)
+        self.latency.add(time.perf_counter() - received)
+        connection.outstanding -= 1
+        if connection.outstanding == 0:
+            connection.idle.set()
+
+    def _write(self, connection: '_Connection', request_id: Any,
+               result: Any = None, error: Optional[str] = None) -> None:
+        self.requests += 1
+        if error is None:
+            response = {'id': request_id, 'ok': True, 'result': result}
+        else:
+            self.errors += 1
+            response = {'id': request_id, 'ok': False, 'error': error}
+        connection.write(json.dumps(response).encode('utf-8') + b'\n')
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and latency percentiles (seconds)"""
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'connections': self.connections,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_size': self.queue_size,
+            'offloaded': self.offloaded,
+            'pool_pending': self.pool_pending,
+            'latency': dict(self.latency.percentiles(), mean=self.latency.mean,
+                            max=self.latency.maximum),
+            'mean_batch_size': self.batch_sizes.mean
+        }
+
+
+class _Connection:
+    """Writer side of a client connection and its unanswered requests"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.outstanding = 0
+        self.idle = asyncio.Event()
+
+    def write(self, data: bytes) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    async def drain(self) -> None:
+        """Wait while the client is slow to read its responses"""
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    async def finished(self) -> None:
+        """Wait until every accepted request has been answered"""
+        while self.outstanding:
+            self.idle.clear()
+            await self.idle.wait()
+        await self.drain()
+
+
+class LexerClient:
+    """Blocking client for a LexerServer, one request at a time"""
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        """
+        Args:
+            address (str): 'host:port' or a Unix socket path
+            timeout (Optional[float]): Socket timeout in seconds
+        """
+        host, _, port = address.rpartition(':')
+        if port.isdigit():
+            self._socket = socket.create_connection((host, int(port)), timeout)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(address)
+        self._file = self._socket.makefile('rwb')
+        self._next_id = 0
+
+    def call(self, op: str, code: str = '') -> Any:
+        """
+        Send one request and wait for its result.
+
+        Raises:
+            RuntimeError: If the server reports an error
+        """
+        self._next_id += 1
+        request = {'id': self._next_id, 'op': op, 'code': code}
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        response = json.loads(self._file.readline())
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self) -> 'LexerClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="JSON-lines lexing service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="pool processes for large requests")
+    parser.add_argument('--queue-size', type=int, default=1024)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=2,
+                        help="threads running batches of small requests")
+    parser.add_argument('--large-request', type=int, default=1 << 12,
+                        help="request size in characters sent to the pool")
+    args = parser.parse_args(argv)
+
+    server = LexerServer(args.host, args.port, args.unix, args.workers,
+                         args.queue_size, args.batch_size, args.large_request,
+                         threads=args.threads)
+
+    async def run() -> None:
+        await server.start()
+        print(f"Listening on {server.address}", flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+from array import array
+from functools import lru_cache
+from hashlib import blake2b
+from typing import List, Dict, Iterable, Optional, Tuple
+import heapq
+import math
+
+# Bounds of HyperLogLog precision (log2 of the register count)
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+_HASH_BITS = 64
+
+
+@lru_cache(maxsize=1 << 12)
+def stable_hash(value: str) -> int:
+    """
+    64-bit hash of a string that is the same in every process.
+
+    ``hash(str)`` is salted per process, so sketches built by different
+    workers could not be merged with it. Recently hashed strings are cached
+    since morphemes repeat heavily.
+    """
+    return int.from_bytes(blake2b(value.encode('utf-8', 'surrogatepass'),
+                                  digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """
+    Distinct-count estimate in 2**precision one-byte registers.
+
+    The relative standard error is about 1.04 / sqrt(2**precision); merging
+    takes the register-wise maximum, so the union of shards is estimated
+    exactly as if one sketch had seen everything.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and "
+                             f"{MAX_PRECISION}, got {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def for_error(cls, relative_error: float) -> 'HyperLogLog':
+        """Smallest sketch whose standard error is at most relative_error"""
+        if not 0 < relative_error < 1:
+            raise ValueError(f"relative_error must be in (0, 1), got {relative_error}")
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        return cls(min(MAX_PRECISION, max(MIN_PRECISION, precision)))
+
+    @property
+    def standard_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add_hash(self, hashed: int) -> None:
+        """Record an item by its stable_hash"""
+        bits = _HASH_BITS - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add(self, value: str) -> None:
+        self.add_hash(stable_hash(value))
+
+    def estimate(self) -> int:
+        """Estimated number of distinct items added"""
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -rank for rank in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def clear(self) -> None:
+        self.registers = bytearray(len(self.registers))
+
+
+class CountMinSketch:
+    """
+    Frequency estimates in a fixed depth x width table of counters.
+
+    Estimates never undercount; with width ceil(e / epsilon) and depth
+    ceil(ln(1 / delta)) they overcount by more than epsilon times the total
+    count with probability at most delta. Sketches of the same shape merge
+    by adding their tables.
+    """
+
+    def __init__(self, width: int = 2719, depth: int = 5):
+        if width < 1 or depth < 1:
+            raise ValueError(f"width and depth must be positive, got {width}x{depth}")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.table = array('q', bytes(8 * width * depth))
+
+    @classmethod
+    def for_error(cls, epsilon: float, delta: float) -> 'CountMinSketch':
+        """
+        Args:
+            epsilon (float): Overcount bound as a fraction of the total count
+            delta (float): Probability of exceeding the bound
+
+        Returns:
+            CountMinSketch: Sketch sized for the bounds
+        """
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError(f"epsilon and delta must be in (0, 1), got {epsilon}, {delta}")
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _cells(self, hashed: int) -> List[int]:
+        # Double hashing: row i uses (h1 + i * h2) mod width
+        first, second = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        width = self.width
+        return [row * width + (first + row * second) % width for row in range(self.depth)]
+
+    def add_hash(self, hashed: int, count: int = 1) -> int:
+        """Count an item by its stable_hash, returning its new estimate"""
+        table = self.table
+        width = self.width
+        position, step = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        estimate = None
+        for offset in range(0, len(table), width):
+            cell = offset + position % width
+            value = table[cell] = table[cell] + count
+            if estimate is None or value < estimate:
+                estimate = value
+            position += step
+        self.total += count
+        return estimate
+
+    def add(self, value: str, count: int = 1) -> int:
+        return self.add_hash(stable_hash(value), count)
+
+    def estimate_hash(self, hashed: int) -> int:
+        table = self.table
+        return min(table[cell] for cell in self._cells(hashed))
+
+    def estimate(self, value: str) -> int:
+        """Estimated count of value, never below the true count"""
+        return self.estimate_hash(stable_hash(value))
+
+    def merge(self, other: 'CountMinSketch') -> 'CountMinSketch':
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches of different shape")
+        self.table = array('q', map(int.__add__, self.table, other.table))
+        self.total += other.total
+        return self
+
+    def clear(self) -> None:
+        self.table = array('q', bytes(8 * len(self.table)))
+        self.total = 0
+
+
+class HeavyHitters:
+    """
+    The items with the highest Count-Min estimates seen so far.
+
+    Keeps at most capacity items with their latest estimate. An item
+    enters when its estimate exceeds the smallest kept one, which it then
+    replaces, so the most frequent items are found in one pass without
+    storing the others.
+    """
+
+    def __init__(self, capacity: int = 100):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self._floor = 0
+
+    def offer(self, item: str, estimate: int) -> None:
+        counts = self.counts
+        if item in counts or len(counts) < self.capacity:
+            counts[item] = estimate
+        elif estimate > self._floor:
+            # The floor only lags behind the true minimum, so recheck it
+            smallest = min(counts, key=counts.__getitem__)
+            if estimate > counts[smallest]:
+                del counts[smallest]
+                counts[item] = estimate
+            self._floor = min(counts.values())
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Kept items by decreasing estimate"""
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+    def merge(self, other: 'HeavyHitters', sketch: CountMinSketch) -> 'HeavyHitters':
+        """Keep the top items of both, re-estimated from the merged sketch"""
+        candidates = set(self.counts).union(other.counts)
+        ranked = sorted(((sketch.estimate(item), item) for item in candidates),
+                        reverse=True)[:self.capacity]
+        self.counts = {item: estimate for estimate, item in ranked}
+        self._floor = min(self.counts.values(), default=0)
+        return self
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self._floor = 0
+
+
+class Reservoir:
+    """
+    Uniform sample of up to size distinct items.
+
+    A bottom-k reservoir: every item gets the priority stable_hash(item) and
+    the size smallest priorities are kept. Repeats of an item share its
+    priority, so the sample is uniform over distinct items rather than
+    dominated by the most frequent ones, and merging two reservoirs keeps
+    the smallest priorities of their union.
+    """
+
+    def __init__(self, size: int = 20):
+        if size < 1:
+            raise ValueError(f"size must be positive, got {size}")
+        self.size = size
+        self._heap: List[Tuple[int, str]] = []
+        self._items = set()
+
+    def add_hash(self, item: str, hashed: int) -> None:
+        heap = self._heap
+        if item in self._items:
+            return
+        if len(heap) < self.size:
+            heapq.heappush(heap, (-hashed, item))
+            self._items.add(item)
+        elif -hashed > heap[0][0]:
+            _, dropped = heapq.heapreplace(heap, (-hashed, item))
+            self._items.discard(dropped)
+            self._items.add(item)
+
+    def add(self, item: str) -> None:
+        self.add_hash(item, stable_hash(item))
+
+    def sample(self) -> List[str]:
+        return sorted(self._items)
+
+    def merge(self, other: 'Reservoir') -> 'Reservoir':
+        for negated, item in other._heap:
+            self.add_hash(item, -negated)
+        return self
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._items.clear()
+
+
+class AnalysisSketches:
+    """
+    Fixed-size approximate morpheme and identifier statistics for ResultAnalyzer.
+
+    HyperLogLog sketches count distinct morphemes and identifiers, Count-Min
+    sketches estimate how often any morpheme or identifier occurred, a
+    HeavyHitters list tracks the most frequent morphemes and a Reservoir
+    keeps example identifiers. Their memory depends only on the error
+    bounds: about 2.3 MB with the defaults. Morphemes are taken as strings,
+    so nothing is interned.
+    """
+
+    def __init__(self, cardinality_error: float = 0.01, frequency_error: float = 0.0001,
+                 confidence: float = 0.99, top_k: int = 100, samples: int = 20):
+        """
+        Args:
+            cardinality_error (float): Relative standard error of the
+                distinct counts
+            frequency_error (float): Bound on how much frequency estimates
+                overcount, as a fraction of all counted morphemes (or
+                identifiers)
+            confidence (float): Probability that an estimate is within the
+                frequency bound
+            top_k (int): Most frequent morphemes kept for the report
+            samples (int): Example identifiers kept
+        """
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+        self.unique_morphemes = HyperLogLog.for_error(cardinality_error)
+        self.unique_identifiers = HyperLogLog.for_error(cardinality_error)
+        self.morphemes = CountMinSketch.for_error(frequency_error, 1 - confidence)
+        self.identifiers = CountMinSketch.for_error(frequency_error, 1 - confidence)
+        self.top_morphemes = HeavyHitters(top_k)
+        self.examples = Reservoir(samples)
+
+    def add_identifier(self, name: str, morphemes: Iterable[str]) -> None:
+        """Count one identifier occurrence and its morphemes"""
+        hashed = stable_hash(name)
+        self.unique_identifiers.add_hash(hashed)
+        self.identifiers.add_hash(hashed)
+        self.examples.add_hash(name, hashed)
+
+        unique, sketch, top = self.unique_morphemes, self.morphemes, self.top_morphemes
+        for morpheme in morphemes:
+            hashed = stable_hash(morpheme)
+            unique.add_hash(hashed)
+            top.offer(morpheme, sketch.add_hash(hashed))
+
+    def morpheme_frequency(self, morpheme: str) -> int:
+        """Estimated occurrences of a morpheme, never below the true count"""
+        return self.morphemes.estimate(morpheme)
+
+    def identifier_frequency(self, name: str) -> int:
+        """Estimated occurrences of an identifier, never below the true count"""
+        return self.identifiers.estimate(name)
+
+    def merge(self, other: 'AnalysisSketches') -> 'AnalysisSketches':
+        """Fold in the sketches of another shard; bounds must be the same"""
+        self.unique_morphemes.merge(other.unique_morphemes)
+        self.unique_identifiers.merge(other.unique_identifiers)
+        self.morphemes.merge(other.morphemes)
+        self.identifiers.merge(other.identifiers)
+        self.top_morphemes.merge(other.top_morphemes, self.morphemes)
+        self.examples.merge(other.examples)
+        return self
+
+    def clear(self) -> None:
+        for sketch in (self.unique_morphemes, self.unique_identifiers, self.morphemes,
+                       self.identifiers, self.top_morphemes, self.examples):
+            sketch.clear()
+
+    def report(self) -> Dict:
+        """Estimates and their error bounds"""
+        return {
+            'unique_identifiers': self.unique_identifiers.estimate(),
+            'example_identifiers': self.examples.sample(),
+            'cardinality_standard_error': self.unique_morphemes.standard_error,
+            'frequency_overcount_bound': math.ceil(self.morphemes.epsilon
+                                                   * self.morphemes.total),
+            'confidence': 1 - self.morphemes.delta
+        }
@@ -0,0 +1,124 @@
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import sys
+
+# The lock primitive threading.Lock wraps; importing threading itself
+# would add to lexer startup
+from _thread import allocate_lock
+
+
+class SymbolTable:
+    """
+    Interns strings (identifiers, morphemes) to dense integer ids.
+
+    Each distinct string is stored once and numbered in the order it was
+    first interned, so ids are small list indexes and counters keyed by
+    them hash and compare as ints. Interned strings are also passed through
+    ``sys.intern``, so equal morphemes sliced out of different identifiers
+    share one object.
+
+    A table pickles as its list of symbols and can be saved as JSON; use
+    ``remap`` to translate ids of a table built elsewhere (another process,
+    an earlier run) into this one.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self._symbols: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = allocate_lock()
+        for symbol in symbols:
+            self.intern(symbol)
+
+    def intern(self, symbol: str) -> int:
+        """Id of symbol, assigning the next free id on first sight"""
+        symbol_id = self._ids.get(symbol)
+        if symbol_id is None:
+            with self._lock:
+                symbol_id = self._ids.get(symbol)
+                if symbol_id is None:
+                    symbol_id = len(self._symbols)
+                    self._symbols.append(sys.intern(symbol))
+                    self._ids[self._symbols[-1]] = symbol_id
+        return symbol_id
+
+    def intern_all(self, symbols: Iterable[str]) -> Tuple[int, ...]:
+        """Ids of several symbols, in order"""
+        intern = self.intern
+        return tuple(intern(symbol) for symbol in symbols)
+
+    def get(self, symbol: str) -> Optional[int]:
+        """Id of symbol, or None if it was never interned"""
+        return self._ids.get(symbol)
+
+    def symbol(self, symbol_id: int) -> str:
+        """String with the given id"""
+        return self._symbols[symbol_id]
+
+    def resolve(self, symbol_ids: Iterable[int]) -> List[str]:
+        """Strings of several ids, in order"""
+        symbols = self._symbols
+        return [symbols[symbol_id] for symbol_id in symbol_ids]
+
+    def remap(self, other: 'SymbolTable') -> List[int]:
+        """
+        Intern every symbol of another table into this one.
+
+        Args:
+            other (SymbolTable): Table whose ids are to be translated
+
+        Returns:
+            List[int]: Id in this table, indexed by id in ``other``
+        """
+        if other is self:
+            return list(range(len(self)))
+        intern = self.intern
+        return [intern(symbol) for symbol in other._symbols]
+
+    def to_json(self) -> str:
+        """Serialized table, loadable with SymbolTable.from_json"""
+        import json
+
+        return json.dumps(self._symbols, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text: str) -> 'SymbolTable':
+        import json
+
+        return cls(json.loads(text))
+
+    def save(self, path: str) -> None:
+        """Write the table to a JSON file"""
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str) -> 'SymbolTable':
+        """Read a table written by save; ids are preserved"""
+        with open(path, encoding='utf-8') as handle:
+            return cls.from_json(handle.read())
+
+    def __getstate__(self) -> Dict:
+        return {'symbols': self._symbols}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(state['symbols'])
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._symbols)
+
+    def __repr__(self) -> str:
+        return f"SymbolTable({len(self)} symbols)"
+
+
+# Table shared by every lexer and analyzer in the process
+_shared_table = SymbolTable()
+
+
+def shared_symbols() -> SymbolTable:
+    """The process-wide SymbolTable lexers with intern_morphemes use"""
+    return _shared_table
@@ -0,0 +1,213 @@
+from array import array
+from typing import List, Dict, Optional, Iterator, Iterable, Tuple, Union
+from .morphological_lexer import Token
+
+
+class TokenBuffer:
+    """
+    Columnar, array-backed sequence of tokens over a single source.
+
+    Instead of one Token object per token, each field lives in a compact
+    ``array`` column: type id, start/end offsets, line, column, and ids into
+    interned tables of morpheme tuples and conventions. Token values are not
+    stored; they are sliced out of the source when accessed. Indexing and
+    iteration materialize Token objects on demand, so a TokenBuffer can be
+    passed wherever a list of tokens is read.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+
+        # Columns
+        self.types = array('B')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.lines = array('i')
+        self.columns = array('i')
+        self.morpheme_ids = array('i')
+        self.convention_ids = array('b')
+
+        # Interned tables
+        self.type_names: List[str] = []
+        self.morpheme_table: List[Tuple[str, ...]] = []
+        self.convention_names: List[str] = []
+        self._type_index: Dict[str, int] = {}
+        self._morpheme_index: Dict[Tuple[str, ...], int] = {}
+        self._convention_index: Dict[str, int] = {}
+
+    def append(self, token_type: str, start: int, end: int, line: int,
+               column: int, morphemes: Optional[Tuple[str, ...]] = None,
+               convention: Optional[str] = None) -> None:
+        """
+        Append one token.
+
+        Args:
+            token_type (str): Token type name
+            start (int): Start offset into the source
+            end (int): End offset into the source
+            line (int): Line number
+            column (int): Column
+            morphemes (Optional[Tuple[str, ...]]): Morphemes, interned
+            convention (Optional[str]): Naming convention, interned
+        """
+        type_id = self._type_index.get(token_type)
+        if type_id is None:
+            type_id = self._type_index[token_type] = len(self.type_names)
+            self.type_names.append(token_type)
+
+        morpheme_id = -1
+        if morphemes:
+            morpheme_id = self._morpheme_index.get(morphemes)
+            if morpheme_id is None:
+                morpheme_id = len(self.morpheme_table)
+                self._morpheme_index[morphemes] = morpheme_id
+                self.morpheme_table.append(morphemes)
+
+        convention_id = -1
+        if convention is not None:
+            convention_id = self._convention_index.get(convention)
+            if convention_id is None:
+                convention_id = len(self.convention_names)
+                self._convention_index[convention] = convention_id
+                self.convention_names.append(convention)
+
+        self.types.append(type_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+        self.columns.append(column)
+        self.morpheme_ids.append(morpheme_id)
+        self.convention_ids.append(convention_id)
+
+    @classmethod
+    def from_tokens(cls, tokens: Iterable[Token], source: str) -> 'TokenBuffer':
+        """
+        Build a buffer from existing Token objects.
+
+        Args:
+            tokens (Iterable[Token]): Tokens produced from source
+            source (str): Source the token offsets refer to
+
+        Returns:
+            TokenBuffer: Compact copy of the tokens
+        """
+        tokens = tokens if isinstance(tokens, list) else list(tokens)
+        buffer = cls(source)
+
+        # Fill whole columns at once rather than appending row by row
+        type_index = buffer._type_index
+        morpheme_index = buffer._morpheme_index
+        convention_index = buffer._convention_index
+        for token in tokens:
+            if token.type not in type_index:
+                type_index[token.type] = len(type_index)
+            if token.morphemes:
+                morphemes = tuple(token.morphemes)
+                if morphemes not in morpheme_index:
+                    morpheme_index[morphemes] = len(morpheme_index)
+            if token.convention is not None and token.convention not in convention_index:
+                convention_index[token.convention] = len(convention_index)
+        buffer.type_names = list(type_index)
+        buffer.morpheme_table = list(morpheme_index)
+        buffer.convention_names = list(convention_index)
+
+        buffer.types = array('B', [type_index[t.type] for t in tokens])
+        buffer.starts = array('q', [t.start for t in tokens])
+        buffer.ends = array('q', [t.end for t in tokens])
+        buffer.lines = array('i', [t.line_number for t in tokens])
+        buffer.columns = array('i', [t.column for t in tokens])
+        buffer.morpheme_ids = array('i', [
+            morpheme_index[tuple(t.morphemes)] if t.morphemes else -1
+            for t in tokens])
+        buffer.convention_ids = array('b', [
+            convention_index[t.convention] if t.convention is not None else -1
+            for t in tokens])
+        return buffer
+
+    def derive(self, source: str, count: int) -> 'TokenBuffer':
+        """
+        Start a new buffer over source holding the first count tokens.
+
+        The interned tables are copied, so ids in the copied rows (and in
+        rows appended later from this buffer) stay valid.
+
+        Args:
+            source (str): Source of the new buffer
+            count (int): Number of leading tokens to keep
+
+        Returns:
+            TokenBuffer: New buffer sharing this buffer's id space
+        """
+        buffer = TokenBuffer(source)
+        buffer.type_names = list(self.type_names)
+        buffer.morpheme_table = list(self.morpheme_table)
+        buffer.convention_names = list(self.convention_names)
+        buffer._type_index = dict(self._type_index)
+        buffer._morpheme_index = dict(self._morpheme_index)
+        buffer._convention_index = dict(self._convention_index)
+
+        for name in ('types', 'starts', 'ends', 'lines', 'columns',
+                     'morpheme_ids', 'convention_ids'):
+            setattr(buffer, name, getattr(self, name)[:count])
+        return buffer
+
+    def type_of(self, index: int) -> str:
+        """Token type name at index"""
+        return self.type_names[self.types[index]]
+
+    def value(self, index: int) -> str:
+        """Token value at index, sliced from the source"""
+        return self.source[self.starts[index]:self.ends[index]]
+
+    def morphemes(self, index: int) -> Tuple[str, ...]:
+        """Interned morpheme tuple at index"""
+        morpheme_id = self.morpheme_ids[index]
+        return self.morpheme_table[morpheme_id] if morpheme_id >= 0 else ()
+
+    def convention(self, index: int) -> Optional[str]:
+        """Naming convention at index"""
+        convention_id = self.convention_ids[index]
+        return (self.convention_names[convention_id]
+                if convention_id >= 0 else None)
+
+    def token(self, index: int) -> Token:
+        """Materialize the Token at index"""
+        return Token(
+            type=self.type_of(index),
+            value=self.value(index),
+            start=self.starts[index],
+            end=self.ends[index],
+            morphemes=list(self.morphemes(index)),
+            convention=self.convention(index),
+            line_number=self.lines[index],
+            column=self.columns[index]
+        )
+
+    def to_tokens(self) -> List[Token]:
+        """Materialize every token"""
+        return [self.token(i) for i in range(len(self))]
+
+    def nbytes(self) -> int:
+        """Approximate size of the column arrays in bytes"""
+        return sum(column.itemsize * len(column) for column in (
+            self.types, self.starts, self.ends, self.lines, self.columns,
+            self.morpheme_ids, self.convention_ids))
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, List[Token]]:
+        if isinstance(index, slice):
+            return [self.token(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        return self.token(index)
+
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self)):
+            yield self.token(index)
+
+    def __repr__(self) -> str:
+        return f"TokenBuffer({len(self)} tokens)"
@@ -1,22 +1,270 @@
-from typing import List, Dict
+from typing import List, Dict, Union, Callable, Optional, Sequence, Tuple
 from .morphological_lexer import Token
+from .token_buffer import TokenBuffer
+
+
+class Violation:
+    """
+    Lazily formatted violation record.
+
+    Holds the rule, the issue and the index of the offending token (the
+    first of the pair for sequence rules); the token text is only built when
+    the record is formatted, via ``to_dict``, ``str`` or item access with
+    the same keys as the eager violation dicts.
+    """
+    __slots__ = ('rule', 'issue', 'index', 'pairwise', '_tokens')
+
+    def __init__(self, rule: str, issue: str, index: int,
+                 tokens: Sequence[Token], pairwise: bool = False):
+        self.rule = rule
+        self.issue = issue
+        self.index = index
+        self.pairwise = pairwise
+        self._tokens = tokens
+
+    @property
+    def token(self) -> Token:
+        """Offending token (first of the pair for sequence rules)"""
+        return self._tokens[self.index]
+
+    @property
+    def offset(self) -> int:
+        """Start offset of the offending token"""
+        return self.token.start
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """Line number and column of the offending token"""
+        token = self.token
+        return token.line_number, token.column
+
+    def to_dict(self) -> Dict[str, str]:
+        """Format the violation like the eager validators do"""
+        if self.pairwise:
+            return {
+                'tokens': f"{self._tokens[self.index]} -> {self._tokens[self.index + 1]}",
+                'issue': self.issue
+            }
+        return {'token': str(self.token), 'issue': self.issue}
+
+    def __getitem__(self, key: str) -> str:
+        return self.to_dict()[key]
+
+    def __str__(self) -> str:
+        return str(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"Violation(rule={self.rule!r}, index={self.index}, issue={self.issue!r})"
+
+
+def _callable_identity(func: Callable) -> Optional[str]:
+    """Module and qualified name of a function, None for lambdas and locals"""
+    func = getattr(func, '__func__', func)
+    module = getattr(func, '__module__', None)
+    qualname = getattr(func, '__qualname__', None)
+    if not module or not qualname or '<' in qualname:
+        return None
+    return f"{module}.{qualname}"
 
 
 class ValidationFramework:
-    def __init__(self):
+    def __init__(self, instrumentation: Optional['Instrumentation'] = None):
+        self.instrumentation = instrumentation
         self.validation_rules = {
             'naming_convention': self._validate_naming_convention,
             'morpheme_structure': self._validate_morpheme_structure,
             'token_sequence': self._validate_token_sequence
         }
 
-    def validate_tokens(self, tokens: List[Token]) -> Dict:
-        """Validate tokens against all rules"""
+        # Per-token and per-pair checks used by the fused single-pass mode
+        self.token_checks = {
+            'naming_convention': (self._check_naming_convention,
+                                  'Invalid naming convention'),
+            'morpheme_structure': (self._check_morpheme_structure,
+                                   'Invalid morpheme structure')
+        }
+        self.sequence_checks = {
+            'token_sequence': (self._is_valid_sequence, 'Invalid token sequence')
+        }
+
+        # Registered rule name -> (validator, identity of its check)
+        self._registered: Dict[str, Tuple[Callable, Optional[str]]] = {}
+
+    def register_rule(self, name: str, check: Callable[..., bool], issue: str,
+                      pairwise: bool = False, version: Optional[str] = None) -> None:
+        """
+        Register a custom rule usable in both validation modes.
+
+        Args:
+            name (str): Rule name used as result key
+            check (Callable[..., bool]): Returns True when a token (or an
+                adjacent pair of tokens if pairwise) is valid
+            issue (str): Issue text recorded for violations
+            pairwise (bool): Whether check takes two adjacent tokens
+            version (Optional[str]): Identifies the rule's logic for result
+                caches; defaults to the check's module and qualified name,
+                and is needed to cache results of lambdas and nested
+                functions
+        """
+        identity = _callable_identity(check)
+        if version is not None:
+            identity = f"{identity or name}@{version}"
+        if pairwise:
+            self.sequence_checks[name] = (check, issue)
+        else:
+            self.token_checks[name] = (check, issue)
+        validator = lambda tokens: self._validate_with(tokens, check, issue, pairwise)
+        self.validation_rules[name] = validator
+        self._registered[name] = (validator, identity)
+
+    def rule_identities(self) -> Dict[str, Optional[str]]:
+        """
+        Identify the logic behind each rule, for keying cached results.
+
+        Returns:
+            Dict[str, Optional[str]]: Per rule name the module and qualified
+            name of its check (with the registered version, if any), or
+            None when the check is a lambda or nested function registered
+            without a version
+        """
+        identities = {}
+        for name, validator in self.validation_rules.items():
+            registered, identity = self._registered.get(name, (None, None))
+            identities[name] = (identity if validator is registered
+                                else _callable_identity(validator))
+        return identities
+
+    def validate_tokens(self, tokens: Union[List[Token], TokenBuffer],
+                        fused: bool = False,
+                        max_violations: Union[int, Dict[str, int], None] = None) -> Dict:
+        """Validate tokens against all rules.
+
+        Accepts a list of tokens or a TokenBuffer; rules only iterate, so a
+        buffer's tokens are materialized on demand. With ``fused`` (implied
+        by ``max_violations``) all rules run in a single pass and violations
+        are returned as lazily formatted Violation records.
+        """
+        if fused or max_violations is not None:
+            return self.validate_fused(tokens, max_violations)
+
+        instrumentation = self.instrumentation
         results = {}
         for rule_name, validator in self.validation_rules.items():
-            results[rule_name] = validator(tokens)
+            if instrumentation is None:
+                results[rule_name] = validator(tokens)
+                continue
+            with instrumentation.span('validation.rule', rule=rule_name):
+                results[rule_name] = validator(tokens)
+            instrumentation.increment('violations', len(results[rule_name]['violations']),
+                                      rule=rule_name)
+        return results
+
+    def validate_fused(self, tokens: Union[List[Token], TokenBuffer],
+                       max_violations: Union[int, Dict[str, int], None] = None) -> Dict:
+        """
+        Run every registered rule in one pass over the tokens.
+
+        Rules added directly to validation_rules, without a check in
+        token_checks or sequence_checks, cannot be fused; they run
+        afterwards with their own pass and keep their dict violations,
+        truncated to the cap.
+
+        Args:
+            tokens (Union[List[Token], TokenBuffer]): Tokens to validate
+            max_violations (Union[int, Dict[str, int], None]): Cap on recorded
+                violations, for all rules or per rule name; the pass stops
+                early once every rule has found one violation past its cap
+
+        Returns:
+            Dict: Per rule 'valid' (whether there was no violation at all,
+            recorded or not), 'violations' (Violation records) and
+            'truncated' (whether violations past the cap were dropped)
+        """
+        if self.instrumentation is not None:
+            with self.instrumentation.span('validation.fused'):
+                results = self._validate_fused(tokens, max_violations)
+            for rule, result in results.items():
+                self.instrumentation.increment('violations', len(result['violations']),
+                                               rule=rule)
+            return results
+        return self._validate_fused(tokens, max_violations)
+
+    def _validate_fused(self, tokens: Union[List[Token], TokenBuffer],
+                        max_violations: Union[int, Dict[str, int], None]) -> Dict:
+        def cap_of(rule):
+            return (max_violations.get(rule) if isinstance(max_violations, dict)
+                    else max_violations)
+
+        # Each rule looks for one violation past its cap, which tells a
+        # truncated result from one that has exactly cap violations
+        rules = list(self.token_checks) + list(self.sequence_checks)
+        limits = {rule: (None if cap_of(rule) is None else cap_of(rule) + 1)
+                  for rule in rules}
+        found = {rule: [] for rule in rules}
+
+        def active(checks):
+            return [(rule, check, issue) for rule, (check, issue) in checks.items()
+                    if limits[rule] is None or len(found[rule]) < limits[rule]]
+
+        token_checks = active(self.token_checks)
+        sequence_checks = active(self.sequence_checks)
+
+        previous = None
+        for index, token in enumerate(tokens if token_checks or sequence_checks else ()):
+            capped = False
+            for rule, check, issue in token_checks:
+                if not check(token):
+                    found[rule].append(Violation(rule, issue, index, tokens))
+                    capped = capped or len(found[rule]) == limits[rule]
+
+            if previous is not None:
+                for rule, check, issue in sequence_checks:
+                    if not check(previous, token):
+                        found[rule].append(
+                            Violation(rule, issue, index - 1, tokens, pairwise=True))
+                        capped = capped or len(found[rule]) == limits[rule]
+
+            # Drop rules that went past their cap; stop once none are left
+            if capped:
+                token_checks = active(self.token_checks)
+                sequence_checks = active(self.sequence_checks)
+                if not token_checks and not sequence_checks:
+                    break
+            previous = token
+
+        results = {}
+        for rule, validator in self.validation_rules.items():
+            # Unfused rules run their own pass, capped afterwards
+            violations = (found[rule] if rule in found
+                          else validator(tokens)['violations'])
+            cap = cap_of(rule)
+            truncated = cap is not None and len(violations) > cap
+            results[rule] = {
+                'valid': not violations,
+                'violations': violations[:cap] if truncated else violations,
+                'truncated': truncated
+            }
         return results
 
+    def _validate_with(self, tokens: List[Token], check: Callable[..., bool],
+                       issue: str, pairwise: bool) -> Dict:
+        """Eager validation for a registered custom rule"""
+        violations = []
+        previous = None
+        for token in tokens:
+            if not pairwise:
+                if not check(token):
+                    violations.append({'token': str(token), 'issue': issue})
+            elif previous is not None and not check(previous, token):
+                violations.append({'tokens': f"{previous} -> {token}",
+                                   'issue': issue})
+            previous = token
+
+        return {
+            'valid': len(violations) == 0,
+            'violations': violations
+        }
+
     def _validate_naming_convention(self, tokens: List[Token]) -> Dict:
         """Validate naming conventions"""
         violations = []
@@ -52,18 +300,29 @@ class ValidationFramework:
     def _validate_token_sequence(self, tokens: List[Token]) -> Dict:
         """Validate token sequence"""
         violations = []
-        for i in range(len(tokens) - 1):
-            if not self._is_valid_sequence(tokens[i], tokens[i + 1]):
+        previous = None
+        for token in tokens:
+            if previous is not None and not self._is_valid_sequence(previous, token):
                 violations.append({
-                    'tokens': f"{tokens[i]} -> {tokens[i + 1]}",
+                    'tokens': f"{previous} -> {token}",
                     'issue': 'Invalid token sequence'
                 })
+            previous = token
 
         return {
             'valid': len(violations) == 0,
             'violations': violations
         }
 
+    def _check_naming_convention(self, token: Token) -> bool:
+        """Per-token form of the naming convention rule"""
+        return token.type != 'identifier' or self._is_valid_convention(token)
+
+    def _check_morpheme_structure(self, token: Token) -> bool:
+        """Per-token form of the morpheme structure rule"""
+        return (token.type != 'identifier' or not token.morphemes
+                or self._is_valid_morpheme_structure(token))
+
     def _is_valid_convention(self, token: Token) -> bool:
         """Check if token follows valid naming conventions"""
         if token.convention == 'snake_case':
@@ -0,0 +1,263 @@
+from collections import Counter
+from typing import List, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .morphological_lexer import Token
+from .symbols import SymbolTable
+from .token_buffer import TokenBuffer
+
+# Identifier flag bits, matching the pattern_stats keys of ResultAnalyzer
+HAS_NUMBER = 1
+HAS_UNDERSCORE = 2
+HAS_CAMEL_CASE = 4
+_NON_ASCII = 8
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Character flags of ASCII code points; index 128 stands for any non-ASCII
+# character, whose identifiers are classified with str methods instead
+_UPPER = 16
+_CHARACTER_FLAGS = np.zeros(129, dtype=np.uint8)
+_CHARACTER_FLAGS[ord('0'):ord('9') + 1] = HAS_NUMBER
+_CHARACTER_FLAGS[ord('_')] = HAS_UNDERSCORE
+_CHARACTER_FLAGS[ord('A'):ord('Z') + 1] = _UPPER
+_CHARACTER_FLAGS[128] = _NON_ASCII
+
+
+def identifier_flags(value: str) -> int:
+    """Flag bits of one identifier, as ResultAnalyzer._analyze_patterns counts them"""
+    flags = 0
+    if any(c.isdigit() for c in value):
+        flags |= HAS_NUMBER
+    if '_' in value:
+        flags |= HAS_UNDERSCORE
+    if any(c.isupper() for c in value[1:]):
+        flags |= HAS_CAMEL_CASE
+    return flags
+
+
+def update_from_buffer(analyzer: 'ResultAnalyzer', buffer: TokenBuffer) -> None:
+    """
+    Fold a TokenBuffer into the analyzer using array operations only.
+
+    Type counts and lengths come straight from the buffer's columns.
+    Identifier flags are OR-reductions of per-character flags over each
+    identifier's span of the source; identifiers containing non-ASCII
+    characters are classified one by one.
+    """
+    if not len(buffer):
+        return
+    types = np.frombuffer(buffer.types, dtype=np.uint8)
+    starts = np.frombuffer(buffer.starts, dtype=np.int64)
+    ends = np.frombuffer(buffer.ends, dtype=np.int64)
+    lengths = ends - starts
+
+    type_counts = np.bincount(types, minlength=len(buffer.type_names))
+    for type_id, count in enumerate(type_counts.tolist()):
+        if count:
+            analyzer.token_stats[buffer.type_names[type_id]] += count
+    analyzer.total_length += int(lengths.sum())
+
+    identifier_type = buffer._type_index.get('identifier')
+    if identifier_type is None:
+        return
+    rows = np.flatnonzero(types == identifier_type)
+    if not len(rows):
+        return
+
+    starts, ends, lengths = starts[rows], ends[rows], lengths[rows]
+    flags = _span_flags(buffer.source, starts, ends)
+    for index in np.flatnonzero(flags & _NON_ASCII).tolist():
+        flags[index] = identifier_flags(buffer.source[starts[index]:ends[index]])
+
+    _accumulate(analyzer, lengths, flags,
+                np.frombuffer(buffer.convention_ids, dtype=np.int8)[rows],
+                buffer.convention_names,
+                np.frombuffer(buffer.morpheme_ids, dtype=np.int32)[rows],
+                buffer.morpheme_table)
+
+
+def update_from_tokens(analyzer: 'ResultAnalyzer', tokens: Iterable[Token]) -> None:
+    """
+    Fold Token objects into the analyzer.
+
+    Tokens are encoded into arrays of type ids and lengths; identifiers are
+    counted per distinct (value, convention, morphemes) so each distinct
+    identifier is classified once, then weighted by its count.
+    """
+    tokens = tokens if isinstance(tokens, list) else list(tokens)
+    if not tokens:
+        return
+
+    type_index: Dict[str, int] = {}
+    types = np.fromiter((type_index.setdefault(token.type, len(type_index))
+                         for token in tokens), dtype=np.int64, count=len(tokens))
+    type_counts = np.bincount(types, minlength=len(type_index)).tolist()
+    for name, type_id in type_index.items():
+        analyzer.token_stats[name] += type_counts[type_id]
+    analyzer.total_length += sum(len(token.value) for token in tokens)
+
+    identifiers = Counter((token.value, token.convention, tuple(token.morphemes))
+                          for token in tokens if token.type == 'identifier')
+    if not identifiers:
+        return
+
+    convention_index: Dict[str, int] = {}
+    morpheme_index: Dict[Tuple[str, ...], int] = {}
+    lengths, flags, conventions, morphemes = [], [], [], []
+    for value, convention, parts in identifiers:
+        lengths.append(len(value))
+        flags.append(identifier_flags(value))
+        conventions.append(-1 if convention is None else
+                           convention_index.setdefault(convention, len(convention_index)))
+        morphemes.append(morpheme_index.setdefault(parts, len(morpheme_index))
+                         if parts else -1)
+
+    _accumulate(analyzer, np.array(lengths, dtype=np.int64), np.array(flags, dtype=np.uint8),
+                np.array(conventions, dtype=np.int64), list(convention_index),
+                np.array(morphemes, dtype=np.int64), list(morpheme_index),
+                weights=np.fromiter(identifiers.values(), dtype=np.int64,
+                                    count=len(identifiers)))
+
+
+def _span_flags(source: str, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Per span, the OR of HAS_NUMBER/HAS_UNDERSCORE over all characters,
+    HAS_CAMEL_CASE for an upper-case letter after the first and _NON_ASCII"""
+    if source.isascii():
+        codes = np.frombuffer(source.encode('ascii'), dtype=np.uint8)
+    else:
+        codes = np.minimum(np.frombuffer(source.encode('utf-32-le'), dtype=np.uint32), 128)
+    # One trailing element so spans may end at the end of the source
+    characters = np.append(_CHARACTER_FLAGS[codes], np.uint8(0))
+
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2], bounds[1::2] = starts, ends
+    whole = np.bitwise_or.reduceat(characters, bounds)[0::2]
+
+    # Upper-case letters after the first character; one-character spans
+    # would reduce over a single element, so they are masked out
+    bounds[0::2] = starts + 1
+    tail = np.bitwise_or.reduceat(characters, bounds)[0::2]
+    tail[ends - starts < 2] = 0
+
+    flags = whole & (HAS_NUMBER | HAS_UNDERSCORE | _NON_ASCII)
+    flags |= np.where(tail & _UPPER, HAS_CAMEL_CASE, 0).astype(np.uint8)
+    return flags
+
+
+def _accumulate(analyzer: 'ResultAnalyzer', lengths: np.ndarray, flags: np.ndarray,
+                convention_ids: np.ndarray, convention_names: Sequence[str],
+                morpheme_ids: np.ndarray, morpheme_table: Sequence[Tuple[str, ...]],
+                weights: Optional[np.ndarray] = None) -> None:
+    """Fold identifier rows (optionally weighted) into the analyzer's counters"""
+    count = int(weights.sum()) if weights is not None else len(lengths)
+    analyzer.identifier_count += count
+
+    # Length histograms, overall and per convention (-1: no convention)
+    width = int(lengths.max()) + 1
+    conventions = convention_ids.astype(np.int64) + 1
+    table = np.bincount(conventions * width + lengths, weights=weights,
+                        minlength=(len(convention_names) + 1) * width)
+    table = table.reshape(len(convention_names) + 1, width).astype(np.int64)
+    _add_counts(analyzer.length_histogram, table.sum(axis=0))
+    for convention, row in zip([None] + list(convention_names), table):
+        if row.any():
+            analyzer.convention_stats[convention] += int(row.sum())
+            _add_counts(analyzer.convention_lengths.setdefault(convention, Counter()), row)
+
+    for flag, name in ((HAS_NUMBER, 'has_number'), (HAS_UNDERSCORE, 'has_underscore'),
+                       (HAS_CAMEL_CASE, 'has_camel_case')):
+        selected = (flags & flag) != 0
+        total = int(weights[selected].sum()) if weights is not None else int(selected.sum())
+        if total:
+            analyzer.pattern_stats[name] += total
+
+    # Morphemes and their co-occurrence, once per distinct morpheme tuple
+    present = morpheme_ids >= 0
+    if present.any():
+        per_tuple = np.bincount(morpheme_ids[present],
+                                weights=weights[present] if weights is not None else None,
+                                minlength=len(morpheme_table)).astype(np.int64)
+        _count_morphemes(analyzer, per_tuple, morpheme_table)
+
+
+def _count_morphemes(analyzer: 'ResultAnalyzer', per_tuple: np.ndarray,
+                     morpheme_table: Sequence[Tuple[str, ...]]) -> None:
+    """
+    Count morphemes and unordered pairs of distinct morphemes per
+    identifier, given how many identifiers have each morpheme tuple.
+    Counters are keyed by the analyzer's symbol ids, pairs lower id first.
+    """
+    vocabulary: Dict[str, int] = {}
+    flat = np.fromiter((vocabulary.setdefault(part, len(vocabulary))
+                        for parts in morpheme_table for part in parts), dtype=np.int64)
+    sizes = np.fromiter((len(parts) for parts in morpheme_table), dtype=np.int64,
+                        count=len(morpheme_table))
+    owners = np.repeat(np.arange(len(morpheme_table)), sizes)
+    names = list(vocabulary)
+
+    symbol_ids = analyzer.symbols.intern_all(names)
+    counts = np.bincount(flat, weights=per_tuple[owners], minlength=len(names))
+    _add_counts(analyzer.morpheme_stats, counts.astype(np.int64), symbol_ids)
+
+    # Distinct morphemes per tuple, sorted by tuple then morpheme id, so
+    # partners at any distance d within a tuple form (lower, higher) pairs
+    width = len(names)
+    distinct = np.unique(owners * width + flat)
+    owners, flat = distinct // width, distinct % width
+    keys, pair_weights = [], []
+    for distance in range(1, int(sizes.max(initial=0))):
+        same = owners[distance:] == owners[:-distance]
+        if not same.any():
+            break
+        keys.append(flat[:-distance][same] * width + flat[distance:][same])
+        pair_weights.append(per_tuple[owners[distance:][same]])
+    if not keys:
+        return
+
+    pairs, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate(pair_weights)).astype(np.int64)
+    morpheme_pairs = analyzer.morpheme_pairs
+    for key, total in zip(pairs.tolist(), totals.tolist()):
+        if total:
+            first, second = symbol_ids[key // width], symbol_ids[key % width]
+            morpheme_pairs[(first, second) if first < second else (second, first)] += total
+
+
+def _add_counts(counter: Counter, counts: np.ndarray,
+                keys: Optional[Sequence] = None) -> None:
+    """Add nonzero counts to a Counter, keyed by index or by ``keys``"""
+    for index in np.flatnonzero(counts).tolist():
+        counter[index if keys is None else keys[index]] += int(counts[index])
+
+
+def histogram_percentiles(histogram: Dict[int, int],
+                          points: Sequence[int] = PERCENTILES) -> Dict[str, Optional[int]]:
+    """
+    Nearest-rank percentiles of the values counted in a histogram.
+
+    Returns:
+        Dict[str, Optional[int]]: 'p50', 'p90', ... plus 'min' and 'max';
+        None when the histogram is empty
+    """
+    keys = [f'p{point}' for point in points] + ['min', 'max']
+    values = np.array(sorted(value for value, count in histogram.items() if count),
+                      dtype=np.int64)
+    if not len(values):
+        return dict.fromkeys(keys)
+
+    cumulative = np.cumsum([histogram[value] for value in values.tolist()])
+    ranks = np.ceil(np.array(points) / 100 * cumulative[-1]).astype(np.int64)
+    found = values[np.searchsorted(cumulative, np.maximum(ranks, 1))]
+    result = dict(zip(keys, found.tolist()))
+    result['min'], result['max'] = int(values[0]), int(values[-1])
+    return result
+
+
+def top_pairs(pairs: Counter, limit: int, symbols: SymbolTable) -> List[Dict]:
+    """Most frequent morpheme id pairs as JSON-ready records of names,
+    each pair and ties ordered by name"""
+    named = [(sorted(symbols.resolve(pair)), count) for pair, count in pairs.items()]
+    ranked = sorted(named, key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'morphemes': pair, 'count': count} for pair, count in ranked]
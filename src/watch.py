@@ -0,0 +1,169 @@
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+import os
+import time
+
+from .corpus import CorpusAnalyzer, DEFAULT_EXTENSIONS, STAGES, collect_files
+from .result_analyzer import ResultAnalyzer
+from .result_cache import DEFAULT_MAX_BYTES
+
+
+class CorpusWatcher:
+    """
+    Keep a corpus report up to date by polling a directory tree.
+
+    Each poll stats the files under the watched paths and re-analyzes only
+    those that were added or whose modification time or size changed. The
+    analyzer and violations of every file are kept, so the corpus totals
+    are updated by subtracting a file's old contribution and adding its new
+    one instead of re-running the whole corpus; deleted files are simply
+    subtracted. Changes that keep both the size and the modification time
+    of a file (within the filesystem's timestamp resolution) go unnoticed.
+    """
+
+    def __init__(self, paths: Iterable[str],
+                 extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+                 workers: Optional[int] = None, batch_size: int = 32,
+                 cache_path: Optional[str] = None,
+                 cache_size: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            paths (Iterable[str]): Files, directories and/or glob patterns
+                to watch, expanded again on every poll
+            extensions (Sequence[str]): Extensions collected from directories
+            workers (Optional[int]): Worker processes used when more than
+                batch_size files changed at once (defaults to the CPU count)
+            batch_size (int): Files handed to a worker at a time
+            cache_path (Optional[str]): ResultCache database, so a restarted
+                watcher does not re-analyze unchanged files
+            cache_size (int): Size budget of the cache in bytes
+        """
+        self.paths = list(paths)
+        self.batch_size = batch_size
+        self.corpus = CorpusAnalyzer(workers=workers, extensions=extensions,
+                                     cache_path=cache_path, cache_size=cache_size)
+        self.analyzer = ResultAnalyzer()
+        self.updated: Optional[datetime] = None
+
+        # Per-file contributions: (mtime_ns, size) signature, analyzer,
+        # violations per rule and read error
+        self.signatures: Dict[str, Tuple[int, int]] = {}
+        self.analyzers: Dict[str, ResultAnalyzer] = {}
+        self.violations: Dict[str, Dict[str, List[Dict]]] = {}
+        self.errors: Dict[str, str] = {}
+
+    def poll(self) -> Dict[str, List[str]]:
+        """
+        Re-analyze added and changed files and drop deleted ones.
+
+        Returns:
+            Dict[str, List[str]]: Sorted 'added', 'modified' and 'removed'
+            paths; all empty when nothing changed
+        """
+        current = {}
+        for path in collect_files(self.paths, self.corpus.extensions):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Deleted between listing and stat
+                continue
+            current[path] = (stat.st_mtime_ns, stat.st_size)
+
+        changes = {
+            'added': sorted(path for path in current if path not in self.signatures),
+            'modified': sorted(path for path, signature in current.items()
+                               if path in self.signatures
+                               and self.signatures[path] != signature),
+            'removed': sorted(path for path in self.signatures if path not in current)
+        }
+
+        for path in changes['removed'] + changes['modified']:
+            self._remove(path)
+        stale = changes['added'] + changes['modified']
+        while stale:
+            try:
+                for batch in self.corpus.iter_batches(stale, STAGES, self.batch_size):
+                    for result in batch['results']:
+                        self.signatures[result['file']] = current[result['file']]
+                        self._add(result)
+                break
+            except FileNotFoundError:
+                # Deleted since the stat; picked up as removed next poll
+                stale = [path for path in stale
+                         if path not in self.signatures and os.path.isfile(path)]
+
+        if any(changes.values()):
+            self.updated = datetime.now()
+        return changes
+
+    def watch(self, interval: float = 2.0,
+              polls: Optional[int] = None) -> Iterator[Dict[str, List[str]]]:
+        """
+        Poll every interval seconds, yielding the changes of each poll that
+        found any (the first poll always does unless the tree is empty).
+
+        Args:
+            interval (float): Seconds between the start of two polls
+            polls (Optional[int]): Stop after this many polls; forever if None
+
+        Returns:
+            Iterator[Dict[str, List[str]]]: Changes, see poll; the report is
+            current when each is yielded
+        """
+        count = 0
+        while polls is None or count < polls:
+            started = time.monotonic()
+            changes = self.poll()
+            count += 1
+            if any(changes.values()):
+                yield changes
+            if polls is None or count < polls:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def _add(self, result: Dict) -> None:
+        """Fold in one per-file result from CorpusAnalyzer.iter_batches"""
+        path = result['file']
+        if 'error' in result:
+            self.errors[path] = result['error']
+            return
+
+        self.analyzers[path] = result['analyzer']
+        self.analyzer.merge(result['analyzer'])
+        for rule, rule_violations in result['violations'].items():
+            by_file = self.violations.setdefault(rule, {})
+            if rule_violations:
+                by_file[path] = [dict(violation, file=path) for violation in rule_violations]
+
+    def _remove(self, path: str) -> None:
+        """Subtract the contribution of one file"""
+        self.signatures.pop(path, None)
+        self.errors.pop(path, None)
+        analyzer = self.analyzers.pop(path, None)
+        if analyzer is not None:
+            self.analyzer.subtract(analyzer)
+        for by_file in self.violations.values():
+            by_file.pop(path, None)
+
+    def report(self) -> Dict:
+        """
+        Build the report for the current state of the tree.
+
+        Returns:
+            Dict: The keys of ResultAnalyzer.analyze_tokens plus
+            'files_analyzed', 'validation' (violations in file order),
+            'errors' and 'updated', the time of the last change
+        """
+        if self.analyzer.analysis_timestamp is None:
+            self.analyzer.analysis_timestamp = datetime.now()
+        report = self.analyzer.snapshot()
+        report['files_analyzed'] = len(self.analyzers)
+        report['validation'] = {}
+        for rule, by_file in self.violations.items():
+            rule_violations = [violation for path in sorted(by_file)
+                               for violation in by_file[path]]
+            report['validation'][rule] = {'valid': not rule_violations,
+                                          'violations': rule_violations}
+        report['errors'] = [{'file': path, 'error': error}
+                            for path, error in sorted(self.errors.items())]
+        report['updated'] = self.updated
+        return report
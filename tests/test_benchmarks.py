@@ -0,0 +1,84 @@
+import copy
+import unittest
+from benchmarks.compare import compare_results
+from benchmarks.startup import compare_startup, measure_startup
+from benchmarks.suite import SCHEMA_VERSION, parse_size, run_benchmarks
+from benchmarks.synthetic import SyntheticCorpus
+from src.morphological_lexer import MorphologicalLexer
+
+
+class TestSyntheticCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        corpus = SyntheticCorpus(seed=7)
+        self.assertEqual(corpus.generate(4096), SyntheticCorpus(seed=7).generate(4096))
+        self.assertNotEqual(corpus.generate(4096), SyntheticCorpus(seed=8).generate(4096))
+
+    def test_size_and_styles(self):
+        code = SyntheticCorpus(style_mix={'snake_case': 1.0}).generate(8192)
+        self.assertGreaterEqual(len(code), 8192)
+        self.assertLess(len(code), 8192 + 200)
+
+        conventions = {token.convention
+                       for token in MorphologicalLexer().tokenize(code)
+                       if token.type == 'identifier' and '_' in token.value}
+        self.assertEqual(conventions, {'snake_case'})
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('10KB'), 10 * 1024)
+        self.assertEqual(parse_size('1.5mb'), 3 * 512 * 1024)
+        with self.assertRaises(ValueError):
+            parse_size('ten')
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.results = run_benchmarks([1024], SyntheticCorpus(), repeat=1)
+
+    def test_result_document(self):
+        self.assertEqual(self.results['schema_version'], SCHEMA_VERSION)
+        self.assertEqual([r['stage'] for r in self.results['results']],
+                         ['tokenize', 'analyze', 'validate'])
+        for result in self.results['results']:
+            self.assertGreater(result['tokens_per_second'], 0)
+            self.assertIsNotNone(result['peak_memory_mb'])
+
+    def test_compare_flags_regressions(self):
+        slower = copy.deepcopy(self.results)
+        slower['results'][0]['tokens_per_second'] *= 0.5
+        slower['results'][1]['peak_memory_mb'] = self.results['results'][1]['peak_memory_mb'] * 2 + 1
+
+        rows = compare_results(self.results, slower)
+        self.assertEqual([row['regressions'] for row in rows],
+                         [['throughput'], ['peak_memory'], []])
+        self.assertFalse(any(row['regressions']
+                             for row in compare_results(self.results, self.results)))
+
+    def test_compare_rejects_other_schema(self):
+        other = dict(self.results, schema_version=SCHEMA_VERSION + 1)
+        with self.assertRaises(ValueError):
+            compare_results(self.results, other)
+
+
+class TestStartup(unittest.TestCase):
+    def test_lexer_import_defers_heavy_modules(self):
+        document = measure_startup(repeat=1)
+        results = document['results']
+        self.assertEqual(results['deferred_modules_loaded'], [])
+        self.assertGreater(results['import_seconds'], 0)
+        self.assertGreater(results['first_tokenize_seconds'], 0)
+
+        rows = compare_startup(document, document)
+        self.assertFalse(any(row['regressed'] for row in rows))
+
+        slower = copy.deepcopy(document)
+        slower['results']['import_seconds'] = results['import_seconds'] * 2 + 0.01
+        slower['results']['first_tokenize_seconds'] *= 1.5
+        slower['results']['deferred_modules_loaded'] = ['tracemalloc']
+        self.assertEqual([row['metric'] for row in compare_startup(document, slower)
+                          if row['regressed']],
+                         ['import_seconds', 'deferred_modules_loaded'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+from main import main
+from src.corpus import CorpusAnalyzer, CorpusReport, collect_files
+from src.morphological_lexer import MorphologicalLexer
+from src.result_analyzer import ResultAnalyzer
+
+
+SOURCES = {
+    'a.py': "def processUserData(pre_processed_input):\n    return 1\n",
+    'pkg/b.py': "MAX_RETRY_COUNT = 3\nunvalidatedResult = MAX_RETRY_COUNT\nretry_Count = 1\n",
+    'pkg/c.py': "class UserAccount:\n    user_name = \"x\" @\n",
+    'pkg/notes.txt': "not collected"
+}
+
+
+class TestCorpusAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, code in SOURCES.items():
+            path = os.path.join(self.tmp.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as handle:
+                handle.write(code)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_collect_files(self):
+        files = collect_files([self.tmp.name])
+        self.assertEqual([os.path.relpath(f, self.tmp.name) for f in files],
+                         ['a.py', os.path.join('pkg', 'b.py'),
+                          os.path.join('pkg', 'c.py')])
+
+        pattern = os.path.join(self.tmp.name, '**', '*.txt')
+        self.assertEqual([os.path.basename(f) for f in collect_files([pattern])],
+                         ['notes.txt'])
+        with self.assertRaises(FileNotFoundError):
+            collect_files([os.path.join(self.tmp.name, '*.md')])
+
+    def test_merged_report_matches_per_file_totals(self):
+        expected = Counter()
+        morphemes = Counter()
+        for name in ('a.py', 'pkg/b.py', 'pkg/c.py'):
+            analysis = ResultAnalyzer().analyze_tokens(
+                MorphologicalLexer().tokenize(SOURCES[name]))
+            expected.update(analysis['token_distribution'])
+            morphemes.update(analysis['morpheme_frequency'])
+
+        for workers in (1, 2):
+            report = CorpusAnalyzer(workers=workers).analyze([self.tmp.name])
+            self.assertEqual(report['files_analyzed'], 3)
+            self.assertEqual(report['token_distribution'], dict(expected))
+            self.assertEqual(report['morpheme_frequency'], dict(morphemes))
+            self.assertEqual(report['total_tokens'], sum(expected.values()))
+            self.assertEqual(report['lexer_metrics']['total_tokens'],
+                             sum(expected.values()))
+            self.assertIn('naming_convention', report['validation'])
+            self.assertEqual(set(ResultAnalyzer().analyze_tokens([])) - set(report),
+                             set())
+
+    def test_streamed_batches_match_report(self):
+        expected = CorpusAnalyzer(workers=1).analyze([self.tmp.name])
+        for workers in (1, 2):
+            corpus = CorpusAnalyzer(workers=workers)
+            report = CorpusReport()
+            files = []
+            for batch in corpus.iter_batches([self.tmp.name], batch_size=1):
+                report.add_lexer_stats(batch)
+                for result in batch['results']:
+                    files.append(result['file'])
+                    report.add_file(result)
+            self.assertEqual(len(files), 3)
+
+            compiled = report.compile()
+            for key in ('token_distribution', 'morpheme_frequency', 'files_analyzed'):
+                self.assertEqual(compiled[key], expected[key])
+            self.assertEqual(
+                {rule: len(result['violations']) for rule, result in compiled['validation'].items()},
+                {rule: len(result['violations']) for rule, result in expected['validation'].items()})
+
+    def test_stage_selection(self):
+        batch = next(CorpusAnalyzer(workers=1).iter_batches([self.tmp.name], ['validate']))
+        result = batch['results'][0]
+        self.assertIn('violations', result)
+        self.assertNotIn('analyzer', result)
+
+        report = CorpusReport(['tokenize']).compile()
+        self.assertNotIn('validation', report)
+        self.assertNotIn('token_distribution', report)
+        with self.assertRaises(ValueError):
+            CorpusReport(['parse'])
+
+    def test_cli_ndjson(self):
+        output = os.path.join(self.tmp.name, 'out.ndjson')
+        status = main([self.tmp.name, '-w', '1', '--stages', 'analyze', '-o', output])
+        self.assertEqual(status, 0)
+
+        with open(output) as handle:
+            records = [json.loads(line) for line in handle]
+        self.assertEqual(len(records), 3)
+        self.assertTrue(all('analysis' in r and 'validation' not in r for r in records))
+
+        self.assertEqual(main([self.tmp.name, '-w', '1', '--fail-on-violations',
+                               '-o', output]), 1)
+        self.assertEqual(main([os.path.join(self.tmp.name, 'missing'), '-o', output]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
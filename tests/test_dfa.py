@@ -0,0 +1,129 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from src import dfa
+from src.dfa import compile_dfa, load_dfa, pattern_key
+from src.incremental import TextEdit
+from src.morphological_lexer import MorphologicalLexer
+
+
+CODE = '''
+def processUserData(pre_processed_input):
+    message = "a string literal\\n that \\"spans\\" chunks"
+    MAX_RETRY_COUNT = 3.14159 + 1. + 1def + defé
+    return unvalidatedResult @ 42 ١٢ "unterminated
+    classify = import_data != from_
+'''
+
+
+class TestDFAEngine(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.addCleanup(dfa._loaded.clear)
+        dfa._loaded.clear()
+
+    def make_lexer(self, **kwargs):
+        return MorphologicalLexer(engine='dfa', dfa_cache_dir=self.cache_dir.name, **kwargs)
+
+    def test_matches_regex_engine(self):
+        regex = MorphologicalLexer()
+        lexer = self.make_lexer()
+        self.assertEqual(lexer.tokenize(CODE), regex.tokenize(CODE))
+        self.assertEqual(lexer.error_count, regex.error_count)
+        self.assertEqual(list(lexer.tokenize_buffer(CODE)), regex.tokenize(CODE))
+        self.assertEqual(self.make_lexer(positions='lazy').tokenize(CODE),
+                         MorphologicalLexer(positions='lazy').tokenize(CODE))
+
+    def test_streaming_and_retokenize(self):
+        expected = MorphologicalLexer().tokenize(CODE)
+        for chunk_size in (1, 3, 16):
+            tokens = list(self.make_lexer().iter_tokens(io.StringIO(CODE), chunk_size=chunk_size))
+            self.assertEqual(tokens, expected, chunk_size)
+
+        lexer = self.make_lexer()
+        edit = TextEdit(CODE.index('"unterminated'), 0, '"closed" ')
+        new_text = edit.apply(CODE)
+        self.assertEqual(lexer.retokenize(lexer.tokenize(CODE), CODE, edit),
+                         MorphologicalLexer().tokenize(new_text))
+
+    def test_longest_match(self):
+        patterns = {'assign': '=', 'equals': '==', 'name': '[a-z]+', 'whitespace': r'\s+'}
+        regex = MorphologicalLexer(patterns=patterns)
+        lexer = self.make_lexer(patterns=patterns)
+        self.assertEqual([t.type for t in regex.tokenize('a == b')],
+                         ['name', 'assign', 'assign', 'name'])
+        self.assertEqual([t.type for t in lexer.tokenize('a == b')],
+                         ['name', 'equals', 'name'])
+
+    def test_custom_language_in_linear_time(self):
+        lexer = self.make_lexer(patterns={
+            'keyword': r'\b(SELECT|FROM|WHERE)\b',
+            'identifier': r'[A-Za-z_][A-Za-z0-9_]*',
+            'number': r'\d+',
+            'operator': r'[=<>]+|(?:a+)+!',
+            'delimiter': r'[,;*]',
+            'whitespace': r'\s+'
+        })
+        tokens = lexer.tokenize('SELECT a, SELECTED FROM t WHERE n >= 42;')
+        self.assertEqual([(t.type, t.value) for t in tokens[:4]],
+                         [('keyword', 'SELECT'), ('identifier', 'a'),
+                          ('delimiter', ','), ('identifier', 'SELECTED')])
+
+        # (a+)+! backtracks exponentially in re when the '!' is missing
+        started = time.perf_counter()
+        tokens = lexer.tokenize('a' * 5000)
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertEqual([(t.type, t.value) for t in tokens], [('identifier', 'a' * 5000)])
+
+    def test_table_cached_on_disk(self):
+        lexer = self.make_lexer()
+        path = os.path.join(self.cache_dir.name,
+                            f'dfa-{pattern_key(dict(lexer._scan_order(lexer.patterns)))}.json')
+        self.assertTrue(os.path.exists(path))
+
+        dfa._loaded.clear()
+        with mock.patch.object(dfa, 'compile_dfa', side_effect=AssertionError('recompiled')):
+            self.assertEqual(self.make_lexer().tokenize(CODE), lexer.tokenize(CODE))
+
+        dfa._loaded.clear()
+        with open(path, 'w') as handle:
+            handle.write('{"format": 1')
+        self.assertEqual(self.make_lexer().tokenize(CODE), lexer.tokenize(CODE))
+
+    def test_table_roundtrip(self):
+        compiled = compile_dfa({'number': r'\d+(\.\d+)?', 'name': r'\w+'})
+        loaded = dfa.CompiledDFA.from_json(compiled.to_json())
+        text = '12.5 x_1 ١٢'
+        self.assertEqual([m.span() for m in loaded.finditer(text)],
+                         [m.span() for m in compiled.finditer(text)])
+        self.assertEqual(loaded.match(text).lastgroup, 'number')
+        self.assertIsNone(loaded.match(text, 4))
+
+    def test_rejects_unsupported_patterns(self):
+        for pattern in (r'a(?=b)', r'(a)\1', r'^a', r'a*', r'(?i)a'):
+            with self.assertRaises(ValueError, msg=pattern):
+                compile_dfa({'token': pattern})
+        with self.assertRaises(ValueError):
+            MorphologicalLexer(engine='backtracking')
+        self.assertEqual(load_dfa({'token': 'a'}, self.cache_dir.name).names, ['token'])
+
+    def test_lazy_quantifiers_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'lazy'):
+            compile_dfa({'comment': r'/\*.*?\*/'})
+
+        # The greedy form suggested instead finds the same comments as regex
+        patterns = {'comment': r'/\*([^*]|\*+[^*/])*\*+/', 'name': r'[a-z]+', 'space': r'\s+'}
+        text = '/* a */ x /* b ** c */'
+        lexer = MorphologicalLexer(patterns=patterns)
+        dfa_lexer = MorphologicalLexer(patterns=patterns, engine='dfa')
+        self.assertEqual(dfa_lexer.tokenize(text), lexer.tokenize(text))
+        self.assertEqual([t.value for t in lexer.tokenize(text) if t.type == 'comment'],
+                         ['/* a */', '/* b ** c */'])
+
+
+if __name__ == '__main__':
+    unittest.main()
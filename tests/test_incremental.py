@@ -0,0 +1,83 @@
+import unittest
+from src.incremental import TextEdit
+from src.morphological_lexer import MorphologicalLexer
+
+
+CODE = """def processUserData(pre_processed_input):
+    MAX_RETRY_COUNT = 3
+    unvalidatedResult = 0
+    for item in pre_processed_input:
+        unvalidatedResult += processImplementation(item)
+    return unvalidatedResult
+"""
+
+
+class TestRetokenize(unittest.TestCase):
+    def setUp(self):
+        self.lexer = MorphologicalLexer()
+
+    def assertRetokenizes(self, text, edit):
+        expected = self.lexer.tokenize(edit.apply(text))
+        tokens = self.lexer.retokenize(self.lexer.tokenize(text), text, edit)
+        self.assertEqual(tokens, expected)
+        buffer = self.lexer.retokenize(self.lexer.tokenize_buffer(text),
+                                       text, edit)
+        self.assertEqual(buffer.to_tokens(), expected)
+
+    def test_edit_inside_identifier(self):
+        offset = CODE.index('RETRY')
+        self.assertRetokenizes(CODE, TextEdit(offset, 5, 'ATTEMPT'))
+
+    def test_inserted_line_shifts_following_tokens(self):
+        offset = CODE.index('    unvalidatedResult = 0')
+        self.assertRetokenizes(CODE, TextEdit(offset, 0, '    x = 1\n'))
+
+    def test_deletion_joining_tokens(self):
+        offset = CODE.index(' = 3')
+        self.assertRetokenizes(CODE, TextEdit(offset, 3, ''))
+
+    def test_number_extended_by_edit(self):
+        self.assertRetokenizes("x = 3.y + 1", TextEdit(6, 1, '5'))
+
+    def test_edit_closing_unterminated_string(self):
+        text = 'name = "abc def\nghi = 1\n'
+        self.assertRetokenizes(text, TextEdit(len(text) - 1, 0, '"'))
+
+    def test_rescan_is_local(self):
+        text = CODE * 50
+        tokens = self.lexer.tokenize(text)
+        before = self.lexer.token_count
+        edit = TextEdit(text.index('item', len(text) // 2), 4, 'entry')
+        self.lexer.retokenize(tokens, text, edit)
+        self.assertLess(self.lexer.token_count - before, 5)
+
+    def test_gap_index_follows_edits(self):
+        from src.incremental import GapIndex
+
+        for errors in ('skip', 'token'):
+            lexer = MorphologicalLexer(errors=errors)
+            text = 'a = "open\n' + CODE * 20 + 'b @ c $ d\n'
+            tokens = lexer.tokenize(text)
+            edits = [lambda t: TextEdit(t.index('RETRY'), 5, '@'),
+                     lambda t: TextEdit(len(t) - 3, 0, '"'),
+                     lambda t: TextEdit(2, 0, '$$ '),
+                     lambda t: TextEdit(len(t) // 2, 0, '#')]
+            for make_edit in edits:
+                edit = make_edit(text)
+                new_text = edit.apply(text)
+                tokens = lexer.retokenize(tokens, text, edit)
+                self.assertEqual(tokens, lexer.tokenize(new_text))
+                # An equal text built by the caller reuses the index
+                text = (' ' + new_text)[1:]
+                fresh = GapIndex.build(text, len(tokens), lambda i: tokens[i].type,
+                                       lambda i: tokens[i].start, lambda i: tokens[i].end)
+                self.assertEqual((lexer._gap_index.starts, lexer._gap_index.ends),
+                                 (fresh.starts, fresh.ends), errors)
+
+    def test_edit_out_of_range(self):
+        with self.assertRaises(ValueError):
+            TextEdit(3, 10, '').apply("abc")
+
+
+if __name__ == '__main__':
+    unittest.main()
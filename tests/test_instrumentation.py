@@ -0,0 +1,98 @@
+import os
+import pickle
+import tempfile
+import unittest
+from src.instrumentation import Histogram, Instrumentation
+from src.morphological_lexer import MorphologicalLexer
+from src.result_analyzer import ResultAnalyzer
+from src.validation_framework import ValidationFramework
+
+
+CODE = "def processUserData(pre_processed_input):\n    bad_Name = processUserData @ 1\n"
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+        self.lexer = MorphologicalLexer(instrumentation=self.instrumentation)
+
+    def test_pipeline_spans_and_counters(self):
+        tokens = self.lexer.tokenize(CODE)
+        ResultAnalyzer(self.instrumentation).analyze_tokens(tokens)
+        ValidationFramework(self.instrumentation).validate_tokens(tokens)
+
+        snapshot = self.instrumentation.snapshot()
+        spans = snapshot['spans']
+        for name in ('lexer.tokenize', 'lexer.pattern_matching', 'analyzer.update',
+                     'analyzer.snapshot', 'validation.rule{rule=naming_convention}'):
+            self.assertEqual(spans[name]['count'], 1, name)
+        self.assertEqual(spans['lexer.analyze_morphemes']['count'], 3)
+        self.assertEqual(spans['lexer.detect_naming_convention']['count'], 3)
+
+        counters = snapshot['counters']
+        self.assertEqual(counters['tokens{type=identifier}'], 4)
+        self.assertEqual(counters['identifier_cache_hits'], 1)
+        self.assertEqual(counters['identifier_cache_misses'], 3)
+        self.assertEqual(counters['unrecognized_characters'], 1)
+        self.assertEqual(counters['violations{rule=naming_convention}'], 1)
+
+    def test_streaming_and_buffer_count_tokens(self):
+        expected = len(MorphologicalLexer().tokenize(CODE))
+        self.lexer.tokenize_buffer(CODE)
+        list(self.lexer.iter_tokens(CODE, chunk_size=8))
+        counters = self.instrumentation.snapshot()['counters']
+        self.assertEqual(sum(value for key, value in counters.items()
+                             if key.startswith('tokens{')), 2 * expected)
+        self.assertNotIn('lexer.iter_tokens', self.instrumentation.snapshot()['spans'])
+
+    def test_hooks(self):
+        seen = []
+        hook = lambda name, seconds, labels: seen.append(name)
+        self.instrumentation.add_hook(hook)
+        with self.instrumentation.span('custom', stage='x'):
+            pass
+        self.instrumentation.remove_hook(hook)
+        self.lexer.tokenize(CODE)
+        self.assertEqual(seen, ['custom'])
+
+    def test_prometheus_export(self):
+        self.lexer.tokenize(CODE)
+        text = self.instrumentation.to_prometheus()
+        self.assertIn('# TYPE morphological_lexer_span_seconds histogram', text)
+        self.assertIn('morphological_lexer_span_seconds_count{span="lexer.tokenize"} 1', text)
+        self.assertIn('morphological_lexer_span_seconds_bucket{span="lexer.tokenize",le="+Inf"} 1',
+                      text)
+        self.assertIn('morphological_lexer_tokens_total{type="identifier"} 4', text)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lexer.prom')
+            self.instrumentation.write_prometheus(path)
+            with open(path) as handle:
+                self.assertEqual(handle.read(), text)
+            self.assertEqual(os.listdir(tmp), ['lexer.prom'])
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+    def test_merge_and_pickle(self):
+        self.lexer.tokenize(CODE)
+        self.instrumentation.add_hook(lambda *args: None)
+        copy = pickle.loads(pickle.dumps(self.instrumentation))
+        self.assertEqual(copy.hooks, [])
+
+        copy.merge(self.instrumentation)
+        self.assertEqual(copy.snapshot()['counters']['tokens{type=identifier}'], 8)
+        self.assertEqual(copy.snapshot()['spans']['lexer.tokenize']['count'], 2)
+
+        analyzer = ResultAnalyzer(self.instrumentation)
+        self.assertIsNone(pickle.loads(pickle.dumps(analyzer)).instrumentation)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [(0.1, 2), (1.0, 3), (float('inf'), 4)])
+        with self.assertRaises(ValueError):
+            histogram.merge(Histogram((0.5,)))
+
+
+if __name__ == '__main__':
+    unittest.main()
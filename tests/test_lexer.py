@@ -1,5 +1,8 @@
+import os
+import tempfile
 import unittest
-from src.morphological_lexer import MorphologicalLexer, Token
+from src.incremental import TextEdit
+from src.morphological_lexer import LexerError, MorphologicalLexer, Token
 
 
 class TestMorphologicalLexer(unittest.TestCase):
@@ -115,6 +118,34 @@ class TestMorphologicalLexer(unittest.TestCase):
         self.assertTrue(any(t.value == 'valid_identifier' for t in tokens))
         self.assertEqual(self.lexer.error_count, 2)  # For @ and #
 
+    def test_keyword_priority(self):
+        code = "define def classy class"
+        tokens = self.lexer.tokenize(code)
+
+        self.assertEqual([(t.type, t.value) for t in tokens], [
+            ('identifier', 'define'),
+            ('keyword', 'def'),
+            ('identifier', 'classy'),
+            ('keyword', 'class')
+        ])
+
+    def test_token_positions(self):
+        code = "x = 1\n\n  if y:\n\treturn z"
+        tokens = self.lexer.tokenize(code)
+
+        positions = [(t.value, t.start, t.end, t.line_number, t.column)
+                     for t in tokens]
+        self.assertEqual(positions, [
+            ('x', 0, 1, 1, 0),
+            ('=', 2, 3, 1, 2),
+            ('1', 4, 5, 1, 4),
+            ('if', 9, 11, 3, 2),
+            ('y', 12, 13, 3, 5),
+            (':', 13, 14, 3, 6),
+            ('return', 16, 22, 4, 1),
+            ('z', 23, 24, 4, 8)
+        ])
+
     def test_performance_metrics(self):
         code = "def test_function(): pass"
         self.lexer.tokenize(code)
@@ -124,6 +155,150 @@ class TestMorphologicalLexer(unittest.TestCase):
         self.assertIn('total_tokens', metrics)
         self.assertIn('error_rate', metrics)
 
+    def test_metrics_levels(self):
+        code = "def test_function(): pass"
+        expected_keys = {
+            'average_processing_time', 'total_tokens', 'error_rate',
+            'average_memory_usage', 'peak_memory_usage', 'tokens_per_second'
+        }
+
+        for level in ('off', 'timing', 'memory'):
+            lexer = MorphologicalLexer(metrics_level=level)
+            for _ in range(3):
+                lexer.tokenize(code)
+            metrics = lexer.get_metrics()
+
+            self.assertTrue(expected_keys <= set(metrics))
+            self.assertEqual(metrics['total_tokens'], 18)
+            self.assertEqual(metrics['average_processing_time'] is None,
+                             level == 'off')
+            self.assertEqual(metrics['peak_memory_usage'] is None,
+                             level != 'memory')
+
+        with self.assertRaises(ValueError):
+            MorphologicalLexer(metrics_level='verbose')
+
+    def test_metrics_are_bounded(self):
+        lexer = MorphologicalLexer(metrics_window=4)
+        for _ in range(10):
+            lexer.tokenize("x = 1")
+
+        series = lexer.metrics['processing_time']
+        self.assertEqual(series.count, 10)
+        self.assertEqual(len(series.recent()), 4)
+
+    def test_identifier_cache(self):
+        lexer = MorphologicalLexer(identifier_cache_size=2)
+        lexer.tokenize("userName userName userName")
+
+        stats = lexer.get_metrics()['identifier_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+        lexer.tokenize("alpha beta gamma")
+        self.assertEqual(lexer.get_metrics()['identifier_cache']['evictions'], 2)
+        self.assertEqual(len(lexer.identifier_cache), 2)
+
+    def test_identifier_cache_invalidation(self):
+        self.assertEqual(self.lexer.tokenize("reloadConfig")[0].morphemes,
+                         ['reload', 'Config'])
+
+        # In-place edits are detected on the next call
+        self.lexer.morpheme_patterns['prefix'].append('re')
+        self.assertEqual(self.lexer.tokenize("reloadConfig")[0].morphemes,
+                         ['re', 'load', 'Config'])
+        # The shared default table is copied, not edited
+        self.assertEqual(MorphologicalLexer().tokenize("reloadConfig")[0].morphemes,
+                         ['reload', 'Config'])
+
+        # Replacing the configuration clears the cache immediately
+        self.lexer.morpheme_patterns = {'prefix': [], 'suffix': ['ig']}
+        self.assertEqual(len(self.lexer.identifier_cache), 0)
+        self.assertEqual(self.lexer.tokenize("reloadConfig")[0].morphemes,
+                         ['reload', 'Conf', 'ig'])
+
+    def test_compiled_patterns_shared(self):
+        other = MorphologicalLexer()
+        self.assertIs(other.master_pattern, self.lexer.master_pattern)
+        self.assertIs(other.compiled_patterns['number'], self.lexer.compiled_patterns['number'])
+        self.assertIs(other._morpheme_patterns, self.lexer._morpheme_patterns)
+
+        other.set_patterns(dict(other.patterns, number=r'\d+'))
+        self.assertIsNot(other.master_pattern, self.lexer.master_pattern)
+        self.assertEqual([t.value for t in other.tokenize("x = 3.5")], ['x', '=', '3', '5'])
+        self.assertEqual(other.error_count, 1)
+
+
+class TestErrorRecovery(unittest.TestCase):
+    CODE = "x = 1 @@@ y\n  €€ z = '#'\n"
+
+    def test_error_tokens_cover_runs(self):
+        skipping = MorphologicalLexer()
+        expected = skipping.tokenize(self.CODE)
+        for options in ({}, {'positions': 'lazy'}, {'engine': 'dfa'}):
+            lexer = MorphologicalLexer(errors='token', **options)
+            tokens = lexer.tokenize(self.CODE)
+            errors = [(t.value, t.start, t.line_number, t.column)
+                      for t in tokens if t.type == 'error']
+            self.assertEqual(errors, [('@@@', 6, 1, 6), ('€€', 14, 2, 2),
+                                      ("'#'", 21, 2, 9)], options)
+            self.assertEqual([t for t in tokens if t.type != 'error'], expected)
+            self.assertEqual(lexer.error_count, skipping.error_count)
+
+        lexer = MorphologicalLexer(errors='token')
+        tokens = lexer.tokenize(self.CODE)
+        self.assertEqual(list(lexer.iter_tokens(self.CODE, chunk_size=3)), tokens)
+        self.assertEqual(lexer.tokenize_buffer(self.CODE).to_tokens(), tokens)
+
+        edit = TextEdit(self.CODE.index('€'), 2, '"')
+        updated = lexer.retokenize(tokens, self.CODE, edit)
+        self.assertEqual(updated, lexer.tokenize(edit.apply(self.CODE)))
+
+    def test_mapped_error_tokens_use_bytes(self):
+        handle, path = tempfile.mkstemp(suffix='.py')
+        with os.fdopen(handle, 'w', encoding='utf-8') as source:
+            source.write(self.CODE)
+        try:
+            lexer = MorphologicalLexer(errors='token')
+            errors = [(t.value, t.start, t.end) for t in lexer.iter_mmap_tokens(path)
+                      if t.type == 'error']
+        finally:
+            os.unlink(path)
+        self.assertEqual(errors, [('@@@', 6, 9), ('€€', 14, 20), ("'#'", 25, 28)])
+        self.assertEqual(lexer.error_count, 8)
+
+    def test_error_spans_in_metrics(self):
+        lexer = MorphologicalLexer()
+        lexer.tokenize(self.CODE)
+        spans = lexer.get_metrics()['error_spans']
+        self.assertEqual(spans['count'], 3)
+        self.assertEqual(spans['characters'], 8)
+        self.assertEqual(spans['longest'], 3)
+        self.assertEqual(spans['recent'][1], {'start': 14, 'end': 16, 'line': 2, 'column': 2})
+
+    def test_max_errors(self):
+        lexer = MorphologicalLexer(max_errors=5)
+        lexer.tokenize("x @@@ y")
+        lexer.tokenize("x @@@ y")   # counted per input
+        with self.assertRaises(LexerError) as raised:
+            lexer.tokenize(self.CODE)
+        self.assertEqual((raised.exception.line, raised.exception.column), (2, 9))
+
+        with self.assertRaises(ValueError):
+            MorphologicalLexer(errors='raise')
+
+    def test_max_errors_still_records_metrics(self):
+        import tracemalloc
+
+        for positions in ('eager', 'lazy'):
+            lexer = MorphologicalLexer(metrics_level='memory', max_errors=0,
+                                       positions=positions)
+            for tokenize in (lexer.tokenize, lexer.tokenize_buffer):
+                with self.assertRaises(LexerError):
+                    tokenize("x @ y")
+                self.assertFalse(tracemalloc.is_tracing())
+            self.assertEqual(lexer.metrics['processing_time'].count, 2)
+            self.assertEqual(lexer.metrics['peak_memory'].count, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from src.line_index import LineIndex
+from src.incremental import TextEdit
+from src.morphological_lexer import LazyToken, MorphologicalLexer
+from src.validation_framework import ValidationFramework
+
+
+CODE = '''
+def processUserData(pre_processed_input):
+    MAX_RETRY_COUNT = 3
+    bad_Name = unvalidatedResult @ 42
+'''
+
+
+class TestLineIndex(unittest.TestCase):
+    def test_positions_match_a_character_scan(self):
+        for source in ('', 'x', '\n', 'ab\ncd\n\nx', CODE):
+            index = LineIndex(source)
+            self.assertEqual(list(index.starts), list(LineIndex(source.encode()).starts))
+            self.assertEqual(len(index), source.count('\n') + 1)
+            for offset in range(len(source) + 1):
+                line = source.count('\n', 0, offset) + 1
+                column = offset - (source.rfind('\n', 0, offset) + 1)
+                self.assertEqual(index.position(offset), (line, column))
+                self.assertEqual(index.offset(line, column), offset)
+
+    def test_out_of_range(self):
+        index = LineIndex('ab\ncd')
+        with self.assertRaises(IndexError):
+            index.position(6)
+        with self.assertRaises(IndexError):
+            index.offset(3)
+
+
+class TestLazyPositions(unittest.TestCase):
+    def test_lazy_tokens_match_eager(self):
+        eager = MorphologicalLexer()
+        lazy = MorphologicalLexer(positions='lazy')
+        tokens = lazy.tokenize(CODE)
+        self.assertTrue(all(isinstance(t, LazyToken) for t in tokens))
+        self.assertTrue(all(t._position is None for t in tokens))
+        expected = eager.tokenize(CODE)
+        self.assertEqual(lazy.error_count, eager.error_count)
+        self.assertEqual(tokens, expected)
+        self.assertEqual(expected, tokens)
+
+    def test_lazy_positions_count_every_newline(self):
+        code = 'x = "a\nb"\ny'
+        token = MorphologicalLexer(positions='lazy').tokenize(code)[-1]
+        self.assertEqual((token.line_number, token.column), (3, 0))
+
+    def test_index_is_exposed_and_reused(self):
+        lexer = MorphologicalLexer(positions='lazy')
+        tokens = lexer.tokenize(CODE)
+        index = lexer.line_index(CODE)
+        self.assertIs(tokens[0].line_index, index)
+        self.assertEqual(index.position(CODE.index('@')), (4, 33))
+
+    def test_retokenize_lazy_tokens(self):
+        lexer = MorphologicalLexer(positions='lazy')
+        edit = TextEdit(CODE.index('MAX'), 0, 'x = 1\n    ')
+        updated = lexer.retokenize(lexer.tokenize(CODE), CODE, edit)
+        self.assertEqual(updated, MorphologicalLexer().tokenize(edit.apply(CODE)))
+
+    def test_violation_position(self):
+        tokens = MorphologicalLexer(positions='lazy').tokenize(CODE)
+        result = ValidationFramework().validate_tokens(tokens, fused=True)
+        violation, = result['naming_convention']['violations']
+        self.assertEqual(violation.token.value, 'bad_Name')
+        self.assertEqual(violation.position, (4, 4))
+
+    def test_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            MorphologicalLexer(positions='sometimes')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from src.mapped_source import MappedToken, MappedTokenBuffer
+from src.morphological_lexer import MorphologicalLexer
+from src.result_analyzer import ResultAnalyzer
+
+
+CODE = '''
+def processUserData(pre_processed_input):
+    message = "café \\"quoted\\" text"
+    MAX_RETRY_COUNT = 3.14159
+    return unvalidatedResult @ 42
+'''
+
+
+def fields(token):
+    return (token.type, token.value, token.start, token.end, token.line_number,
+            token.column, list(token.morphemes), token.convention)
+
+
+class TestMappedTokenization(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.py')
+        with os.fdopen(handle, 'w', encoding='utf-8') as source:
+            source.write(CODE)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def expected(self):
+        # Byte offsets equal character offsets up to the non-ASCII literal
+        return MorphologicalLexer().tokenize(CODE)
+
+    def test_buffer_matches_tokenize(self):
+        lexer = MorphologicalLexer()
+        with lexer.tokenize_mmap(self.path) as buffer:
+            self.assertIsInstance(buffer, MappedTokenBuffer)
+            tokens = buffer.to_tokens()
+        expected = self.expected()
+
+        self.assertEqual([t.value for t in tokens], [t.value for t in expected])
+        literal = next(i for i, t in enumerate(expected) if t.type == 'string')
+        self.assertEqual([fields(t) for t in tokens[:literal]],
+                         [fields(t) for t in expected[:literal]])
+        # Offsets count bytes: one extra for the two-byte character
+        self.assertEqual(tokens[literal].end, expected[literal].end + 1)
+        self.assertEqual(tokens[-1].start, expected[-1].start + 1)
+        self.assertEqual(lexer.error_count, 1)
+        self.assertEqual(lexer.token_count, len(expected))
+
+    def test_iterator_is_offset_only(self):
+        lexer = MorphologicalLexer()
+        tokens = list(lexer.iter_mmap_tokens(self.path))
+        self.assertTrue(all(isinstance(t, MappedToken) for t in tokens))
+        self.assertNotIn('value', MappedToken.__slots__)
+        self.assertEqual([t.value for t in tokens],
+                         [t.value for t in self.expected()])
+
+        analysis = ResultAnalyzer().analyze_tokens(tokens)
+        self.assertEqual(analysis, dict(
+            ResultAnalyzer().analyze_tokens(self.expected()),
+            timestamp=analysis['timestamp'], average_token_length=analysis['average_token_length']))
+
+    def test_release_keeps_values_readable(self):
+        lexer = MorphologicalLexer()
+        tokens = list(lexer.iter_mmap_tokens(self.path, release_every=1))
+        self.assertEqual(tokens[-1].value, '42')
+        self.assertEqual(tokens[1].value, 'processUserData')
+
+    def test_empty_file(self):
+        with open(self.path, 'w'):
+            pass
+        self.assertEqual(len(MorphologicalLexer().tokenize_mmap(self.path)), 0)
+        self.assertEqual(list(MorphologicalLexer().iter_mmap_tokens(self.path)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from src.morpheme_dictionary import MorphemeDictionary, AffixTrie
+from src.morphological_lexer import MorphologicalLexer
+
+
+class TestAffixTrie(unittest.TestCase):
+    def test_prefix_and_suffix_matches(self):
+        prefixes = AffixTrie(['in', 'inter', 'internal'])
+        self.assertEqual(prefixes.matches('internationalize'), ['in', 'inter'])
+
+        suffixes = AffixTrie(['ize', 'alize', 'ment'], reverse=True)
+        self.assertEqual(suffixes.matches('internationalize'), ['ize', 'alize'])
+        self.assertIn('MENT', suffixes)
+        self.assertEqual(len(suffixes), 3)
+
+
+class TestMorphemeDictionary(unittest.TestCase):
+    def setUp(self):
+        self.dictionary = MorphemeDictionary(
+            prefixes=['un', 're', 'pre', 'inter'],
+            suffixes=['able', 'ation', 'tion', 'ize', 'al', 'ly'],
+            roots=['station', 'nation'])
+
+    def test_longest_match_and_multi_affix(self):
+        self.assertEqual(self.dictionary.decompose('unreprocessable'),
+                         ['un', 're', 'process', 'able'])
+        self.assertEqual(self.dictionary.decompose('Implementation'),
+                         ['Implement', 'ation'])
+        self.assertEqual(self.dictionary.decompose('normalizationally'),
+                         ['normaliz', 'ation', 'al', 'ly'])
+
+    def test_roots_are_not_split(self):
+        self.assertEqual(self.dictionary.decompose('station'), ['station'])
+        self.assertEqual(self.dictionary.decompose('international'),
+                         ['inter', 'nation', 'al'])
+        self.assertEqual(self.dictionary.decompose('internationalize'),
+                         ['inter', 'nation', 'al', 'ize'])
+
+    def test_min_stem_length(self):
+        self.assertEqual(self.dictionary.decompose('ably'), ['ab', 'ly'])
+        self.assertEqual(self.dictionary.decompose('una'), ['una'])
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lexicon.txt')
+            with open(path, 'w') as handle:
+                handle.write("# domain lexicon\nprefix geo\nsuffix graphy\n"
+                             "root photo\n")
+            dictionary = MorphemeDictionary.from_file(path)
+        self.assertEqual(dictionary.decompose('geology'), ['geo', 'logy'])
+        self.assertEqual(dictionary.decompose('photography'), ['photo', 'graphy'])
+        self.assertEqual(len(dictionary), 3)
+
+    def test_lexer_integration_and_invalidation(self):
+        lexer = MorphologicalLexer(morpheme_dictionary=self.dictionary)
+        tokens = lexer.tokenize('unreadableInternationalization')
+        self.assertEqual(tokens[0].morphemes,
+                         ['un', 're', 'ad', 'able', 'inter', 'nationaliz',
+                          'ation'])
+
+        # Lexicon edits invalidate the lexer's identifier cache
+        self.dictionary.add_root('read')
+        tokens = lexer.tokenize('unreadableInternationalization')
+        self.assertEqual(tokens[0].morphemes[:3], ['un', 'read', 'able'])
+
+    def test_large_lexicon(self):
+        prefixes = [f'p{i:05d}' for i in range(20000)] + ['un']
+        dictionary = MorphemeDictionary(prefixes=prefixes, suffixes=['able'])
+        self.assertEqual(dictionary.decompose('unbreakable'),
+                         ['un', 'break', 'able'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from src.morpheme_index import MorphemeIndex, Occurrence
+from src.morphological_lexer import MorphologicalLexer
+
+
+FIRST = "def validateUser(user):\n    return user_validation\n"
+SECOND = "MAX_VALIDATION_COUNT = 3\nprocessImplementation(validateUser)\n"
+
+
+class TestMorphemeIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(os.path.realpath(self.tmp.name), 'src')
+        os.mkdir(self.root)
+        self.first = self.write('first.py', FIRST)
+        self.second = self.write('second.py', SECOND)
+        self.index = MorphemeIndex(os.path.join(self.tmp.name, 'index.db'))
+        self.assertEqual(self.index.update([self.root])['indexed'], 2)
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def write(self, name, code):
+        path = os.path.join(self.root, name)
+        with open(path, 'w') as source:
+            source.write(code)
+        return path
+
+    def test_find_occurrences(self):
+        # validateUser -> validate, Us, er; user_validation -> us, er, valida, tion
+        self.assertEqual(self.index.find('validate', 'ER'), [
+            Occurrence(self.first, 1, 4, 'validateUser'),
+            Occurrence(self.second, 2, 22, 'validateUser')
+        ])
+        self.assertEqual(self.index.identifiers('tion'),
+                         ['processImplementation', 'user_validation'])
+        self.assertEqual(self.index.identifiers('valid*'), ['user_validation', 'validateUser'])
+        self.assertEqual(self.index.identifiers('valid*', 'tion'), ['user_validation'])
+        self.assertEqual(self.index.identifiers('us', 'er', convention='camelCase'),
+                         ['validateUser'])
+        self.assertEqual(self.index.find('validate', 'tion'), [])
+        self.assertEqual(self.index.find('missing'), [])
+
+    def test_conventions(self):
+        lexer = MorphologicalLexer()
+        expected = {}
+        for token in lexer.tokenize(FIRST) + lexer.tokenize(SECOND):
+            if token.type == 'identifier':
+                expected.setdefault(token.convention, set()).add(token.value)
+        self.assertEqual(self.index.conventions(),
+                         {convention: len(names) for convention, names in expected.items()})
+        self.assertEqual(self.index.identifiers(convention='CONSTANT_CASE'),
+                         sorted(expected['CONSTANT_CASE']))
+
+    def test_incremental_update(self):
+        self.assertEqual(self.index.update([self.root]), {
+            'indexed': 0, 'unchanged': 2, 'unreadable': 0})
+
+        self.write('first.py', "def checkUser(user):\n    pass\n")
+        os.utime(self.first, ns=(1, 1))
+        self.assertEqual(self.index.update([self.root])['indexed'], 1)
+        self.assertEqual(self.index.identifiers('validate'), ['validateUser'])
+        self.assertEqual([o.file for o in self.index.find('validate')], [self.second])
+
+        os.remove(self.second)
+        self.assertEqual(self.index.remove_missing(), 1)
+        self.assertEqual(self.index.find('validate'), [])
+        self.assertEqual(self.index.prune(), 4)
+        self.assertEqual(self.index.stats()['identifiers'], 3)
+
+    def test_paths_are_canonical(self):
+        link = os.path.join(self.tmp.name, 'link')
+        os.symlink(self.root, link)
+        relative = os.path.relpath(self.root)
+        for spelling in (relative, os.path.join(os.curdir, relative), link):
+            self.assertEqual(self.index.update([spelling]), {
+                'indexed': 0, 'unchanged': 2, 'unreadable': 0})
+        self.assertEqual(self.index.stats()['files'], 2)
+        self.assertEqual(len(self.index.find('validate')), 2)
+
+        self.assertTrue(self.index.remove(os.path.join(link, 'first.py')))
+        self.assertEqual([o.file for o in self.index.find('validate')], [self.second])
+
+    def test_lexer_configuration_change_resets(self):
+        self.index.close()
+        lexer = MorphologicalLexer()
+        lexer.morpheme_patterns = dict(lexer.morpheme_patterns, suffix=['ation'])
+        self.index = MorphemeIndex(self.index.path, lexer)
+        self.assertEqual(self.index.stats()['files'], 0)
+        self.index.update([self.root])
+        self.assertEqual(self.index.identifiers('tion'), [])
+        self.assertIn('user_validation', self.index.identifiers('ation'))
+
+    def test_add_source(self):
+        self.index.add_source('<buffer>', "validateInput = 1")
+        self.assertEqual(self.index.find('input'), [Occurrence('<buffer>', 1, 0, 'validateInput')])
+        self.assertEqual(self.index.remove_missing(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import pickle
+import unittest
+from src.morphological_lexer import MorphologicalLexer, Token
+from src.result_analyzer import ResultAnalyzer
+from src.symbols import SymbolTable, shared_symbols
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+FIRST = "def processUserData(pre_processed_input):\n    return item2\n"
+SECOND = "MAX_RETRY_COUNT = 3\nunvalidatedResult = processImplementation(x)\n"
+
+
+def without_timestamp(report):
+    report = dict(report)
+    report.pop('timestamp')
+    return report
+
+
+class TestResultAnalyzer(unittest.TestCase):
+    def setUp(self):
+        lexer = MorphologicalLexer()
+        self.first = lexer.tokenize(FIRST)
+        self.second = lexer.tokenize(SECOND)
+        self.combined = ResultAnalyzer().analyze_tokens(self.first + self.second)
+
+    def test_pattern_accuracy(self):
+        accuracy = ResultAnalyzer().analyze_tokens(self.first)['pattern_accuracy']
+        # processUserData, pre_processed_input, item2
+        self.assertAlmostEqual(accuracy['number_usage'], 100 / 3)
+        self.assertAlmostEqual(accuracy['underscore_usage'], 100 / 3)
+        self.assertAlmostEqual(accuracy['camel_case_usage'], 100 / 3)
+
+    def test_incremental_update(self):
+        analyzer = ResultAnalyzer()
+        analyzer.update(self.first)
+        partial = analyzer.snapshot()
+        analyzer.update(self.second)
+
+        self.assertEqual(partial['total_tokens'], len(self.first))
+        self.assertEqual(without_timestamp(analyzer.snapshot()),
+                         without_timestamp(self.combined))
+
+    def test_merge(self):
+        left = ResultAnalyzer().update(self.first)
+        right = ResultAnalyzer().update(self.second)
+        self.assertEqual(without_timestamp(left.merge(right).snapshot()),
+                         without_timestamp(self.combined))
+
+    def test_subtract(self):
+        first = ResultAnalyzer().update(self.first)
+        analyzer = ResultAnalyzer().merge(first)
+        analyzer.merge(ResultAnalyzer(symbols=SymbolTable()).update(self.second))
+        analyzer.subtract(ResultAnalyzer(symbols=SymbolTable()).update(self.second))
+        self.assertEqual(without_timestamp(analyzer.snapshot()),
+                         without_timestamp(first.snapshot()))
+        self.assertEqual(analyzer.subtract(first).morpheme_stats, {})
+
+    def test_replaced_files_do_not_grow_the_table(self):
+        # A watcher merges each file's analyzer and subtracts the old one
+        lexer = MorphologicalLexer()
+        shared = len(shared_symbols())
+        analyzer = ResultAnalyzer()
+        previous = None
+        for version in range(20):
+            code = ' '.join(f"load{version}x{i}Item" for i in range(300))
+            current = ResultAnalyzer().update(lexer.tokenize(code))
+            analyzer.merge(current)
+            if previous is not None:
+                analyzer.subtract(previous)
+            previous = current
+        self.assertLess(len(analyzer.symbols), 2 * len(analyzer.morpheme_stats) + 1024)
+        self.assertEqual(analyzer.snapshot()['morpheme_frequency'],
+                         previous.snapshot()['morpheme_frequency'])
+        self.assertEqual(len(shared_symbols()), shared)
+
+    def test_analyze_tokens_resets(self):
+        analyzer = ResultAnalyzer()
+        analyzer.analyze_tokens(self.first)
+        report = analyzer.analyze_tokens(self.second)
+        self.assertEqual(report['total_tokens'], len(self.second))
+
+    def test_morphemes_counted_by_symbol_id(self):
+        analyzer = ResultAnalyzer().update(self.first)
+        report = analyzer.snapshot()
+        self.assertTrue(all(isinstance(key, int) for key in analyzer.morpheme_stats))
+        self.assertEqual(report['morpheme_frequency']['process'], 1)
+
+        # Hand-built tokens without ids, and analyzers with their own table
+        isolated = ResultAnalyzer(symbols=SymbolTable()).update(self.first)
+        hand_built = [Token(t.type, t.value, t.start, t.end, list(t.morphemes), t.convention)
+                      for t in self.first]
+        for other in (isolated, ResultAnalyzer().update(hand_built)):
+            self.assertEqual(other.snapshot()['morpheme_frequency'],
+                             report['morpheme_frequency'])
+
+    def test_pickle_ships_used_symbols_only(self):
+        analyzer = ResultAnalyzer(symbols=SymbolTable(['unused', 'other'])).update(self.first)
+        restored = pickle.loads(pickle.dumps(analyzer))
+        self.assertIsNot(restored.symbols, shared_symbols())
+        self.assertNotIn('unused', restored.symbols)
+        self.assertEqual(restored.snapshot()['morpheme_frequency'],
+                         analyzer.snapshot()['morpheme_frequency'])
+
+        state = analyzer.__getstate__()
+        self.assertNotIn('unused', state['symbols'])
+        merged = restored.merge(analyzer).snapshot()['morpheme_frequency']
+        self.assertEqual(merged['process'], 2)
+
+    def test_approximate_mode(self):
+        tokens = self.first + self.second
+        exact = ResultAnalyzer().analyze_tokens(tokens)
+        analyzer = ResultAnalyzer(approximate=True)
+        report = analyzer.analyze_tokens(tokens)
+
+        self.assertEqual(analyzer.morpheme_stats, {})
+        self.assertEqual(report['unique_morphemes'], exact['unique_morphemes'])
+        self.assertEqual(report['morpheme_frequency'], exact['morpheme_frequency'])
+        self.assertEqual(report['token_distribution'], exact['token_distribution'])
+        self.assertEqual(report['approximation']['unique_identifiers'], 7)
+        self.assertEqual(analyzer.sketches.identifier_frequency('MAX_RETRY_COUNT'), 1)
+
+        left = ResultAnalyzer(approximate=True).update(self.first)
+        right = pickle.loads(pickle.dumps(ResultAnalyzer(approximate=True).update(self.second)))
+        merged = left.merge(right).snapshot()
+        self.assertEqual(without_timestamp(merged), without_timestamp(report))
+
+        with self.assertRaises(ValueError):
+            left.merge(ResultAnalyzer())
+        with self.assertRaises(ValueError):
+            left.subtract(right)
+        with self.assertRaises(ValueError):
+            ResultAnalyzer(backend='numpy', approximate=True)
+
+    def test_state_is_constant_size(self):
+        analyzer = ResultAnalyzer()
+        for _ in range(50):
+            analyzer.update(self.first)
+        self.assertEqual(len(analyzer.length_histogram), 3)
+        self.assertEqual(analyzer.identifier_count, 150)
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class TestNumpyBackend(unittest.TestCase):
+    CODE = FIRST + SECOND + "naïveCount = x²y + pre_pre_load + A + preProcess\n"
+
+    def setUp(self):
+        self.lexer = MorphologicalLexer()
+        self.tokens = self.lexer.tokenize(self.CODE)
+
+    def test_same_report_as_python_backend(self):
+        unicode_lexer = MorphologicalLexer(
+            patterns=dict(self.lexer.patterns, identifier=r'[^\W\d]\w*'))
+        for lexer in (self.lexer, unicode_lexer):
+            tokens = lexer.tokenize(self.CODE)
+            expected = without_timestamp(ResultAnalyzer().analyze_tokens(tokens))
+            for batch in (tokens, lexer.tokenize_buffer(self.CODE)):
+                report = without_timestamp(ResultAnalyzer(backend='numpy').analyze_tokens(batch))
+                self.assertEqual({key: report[key] for key in expected}, expected)
+
+    def test_distribution_fields(self):
+        report = ResultAnalyzer(backend='numpy', top_pairs=100).analyze_tokens(self.tokens)
+        lengths = sorted(len(t.value) for t in self.tokens if t.type == 'identifier')
+
+        percentiles = report['identifier_length_percentiles']
+        self.assertEqual(percentiles['min'], lengths[0])
+        self.assertEqual(percentiles['max'], lengths[-1])
+        self.assertEqual(percentiles['p50'], lengths[(len(lengths) + 1) // 2 - 1])
+        self.assertEqual(sum(report['identifier_length_histogram'].values()), len(lengths))
+        self.assertEqual(report['convention_length_percentiles']['camelCase']['max'],
+                         len('processImplementation'))
+
+        pairs = {tuple(row['morphemes']): row['count'] for row in report['morpheme_cooccurrence']}
+        self.assertEqual(pairs[('load', 'pre')], 1)
+        self.assertEqual(pairs[('Data', 'Us')], 1)
+        self.assertNotIn(('pre', 'pre'), pairs)
+
+    def test_merge_and_pickle(self):
+        left = ResultAnalyzer(backend='numpy').update(self.tokens[:20])
+        right = ResultAnalyzer(backend='numpy').update(self.tokens[20:])
+        merged = pickle.loads(pickle.dumps(left)).merge(right).snapshot()
+        whole = ResultAnalyzer(backend='numpy').analyze_tokens(self.tokens)
+        self.assertEqual(without_timestamp(merged), without_timestamp(whole))
+
+    def test_empty_and_invalid(self):
+        report = ResultAnalyzer(backend='numpy').analyze_tokens([])
+        self.assertEqual(report['identifier_length_percentiles']['p99'], None)
+        self.assertEqual(report['morpheme_cooccurrence'], [])
+        with self.assertRaises(ValueError):
+            ResultAnalyzer(backend='pandas')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src import result_cache
+from src.corpus import STAGES, CorpusAnalyzer, analyze_source
+from src.morpheme_dictionary import MorphemeDictionary
+from src.morphological_lexer import MorphologicalLexer
+from src.result_cache import ResultCache
+from src.token_buffer import TokenBuffer
+from src.validation_framework import ValidationFramework
+
+
+CODE = "def processUserData(pre_processed_input):\n    return unvalidatedResult\n"
+
+
+def short_names(token):
+    return len(token.value) < 12
+
+
+def no_digits(token):
+    return not any(char.isdigit() for char in token.value)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.db')
+        self.cache = ResultCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_hit_returns_stored_result_and_tokens(self):
+        lexer = MorphologicalLexer()
+        first = analyze_source(CODE, lexer, cache=self.cache)
+        second = analyze_source(CODE, lexer, cache=self.cache)
+        self.assertFalse(first['cached'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['analyzer'].snapshot(), first['analyzer'].snapshot())
+        self.assertEqual(second['violations'], first['violations'])
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0})
+
+        key = self.cache.key(CODE, lexer, STAGES, ValidationFramework())
+        tokens = self.cache.get_tokens(key, CODE)
+        self.assertIsInstance(tokens, TokenBuffer)
+        self.assertEqual(tokens.to_tokens(), lexer.tokenize(CODE))
+
+    def test_hit_counts_in_lexer_metrics(self):
+        code = CODE + " @"
+        fresh = MorphologicalLexer()
+        for _ in range(2):
+            analyze_source(code, fresh)
+
+        lexer = MorphologicalLexer()
+        first = analyze_source(code, lexer, cache=self.cache)
+        self.assertTrue(analyze_source(code, lexer, cache=self.cache)['cached'])
+        metrics = lexer.get_metrics()
+        self.assertEqual(metrics['total_tokens'], fresh.get_metrics()['total_tokens'])
+        self.assertEqual(lexer.error_count, fresh.error_count)
+        self.assertEqual(lexer.metrics['processing_time'].count, 2)
+        self.assertAlmostEqual(lexer.metrics['processing_time'].total, 2 * first['lexing_time'])
+
+    def test_key_tracks_configuration(self):
+        lexer = MorphologicalLexer()
+        key = self.cache.key(CODE, lexer)
+        self.assertEqual(self.cache.key(CODE, MorphologicalLexer()), key)
+        self.assertNotEqual(self.cache.key(CODE + ' ', lexer), key)
+        self.assertNotEqual(self.cache.key(CODE, lexer, ('tokenize',)), key)
+
+        lexer.morpheme_patterns['prefix'].append('re')
+        edited = self.cache.key(CODE, lexer)
+        self.assertNotEqual(edited, key)
+
+        lexer.morpheme_dictionary = MorphemeDictionary(prefixes=['un'])
+        with_dictionary = self.cache.key(CODE, lexer)
+        self.assertNotEqual(with_dictionary, edited)
+        lexer.morpheme_dictionary.add_root('process')
+        self.assertNotEqual(self.cache.key(CODE, lexer), with_dictionary)
+
+        other = MorphologicalLexer()
+        other.patterns = dict(other.patterns, number=r'\d+')
+        self.assertNotEqual(self.cache.key(CODE, other), key)
+
+        # Error tokens, and whether an input aborts, depend on the error handling
+        self.assertNotEqual(self.cache.key(CODE, MorphologicalLexer(errors='token')), key)
+        self.assertNotEqual(self.cache.key(CODE, MorphologicalLexer(max_errors=0)), key)
+
+        with mock.patch.object(result_cache, '__version__', '0.0.0'):
+            self.assertNotEqual(ResultCache(self.path).key(CODE, MorphologicalLexer()), key)
+
+    def test_key_tracks_rule_logic(self):
+        def validator(check, **options):
+            validator = ValidationFramework()
+            validator.register_rule('custom', check, 'Custom rule', **options)
+            return validator
+
+        lexer = MorphologicalLexer()
+        key = self.cache.key(CODE, lexer, STAGES, validator(short_names))
+        self.assertEqual(self.cache.key(CODE, lexer, STAGES, validator(short_names)), key)
+        self.assertNotEqual(self.cache.key(CODE, lexer, STAGES, validator(no_digits)), key)
+        self.assertNotEqual(
+            self.cache.key(CODE, lexer, STAGES, validator(short_names, version='2')), key)
+
+        class Strict(ValidationFramework):
+            def _is_valid_convention(self, token):
+                return False
+        self.assertNotEqual(self.cache.key(CODE, lexer, STAGES, Strict()),
+                            self.cache.key(CODE, lexer, STAGES, ValidationFramework()))
+
+        # Lambdas share a name whatever they check, so only a version keys them
+        anonymous = validator(lambda token: False)
+        self.assertIsNone(self.cache.key(CODE, lexer, STAGES, anonymous))
+        for _ in range(2):
+            result = analyze_source(CODE, lexer, anonymous, cache=self.cache)
+            self.assertFalse(result['cached'])
+        self.assertEqual(len(result['violations']['custom']), len(lexer.tokenize(CODE)))
+        self.assertIsNotNone(self.cache.key(
+            CODE, lexer, STAGES, validator(lambda token: False, version='1')))
+
+    def test_size_eviction(self):
+        cache = ResultCache(self.path, max_bytes=2000, check_every=1)
+        for i in range(20):
+            cache.put(f'key{i}', {'payload': os.urandom(200)})
+        self.assertLessEqual(cache.size(), 2000)
+        self.assertGreater(cache.evictions, 0)
+        self.assertIsNotNone(cache.get('key19'))
+        self.assertIsNone(cache.get('key0'))
+        cache.close()
+
+    def test_corpus_warm_run(self):
+        source = os.path.join(self.tmp.name, 'a.py')
+        with open(source, 'w') as handle:
+            handle.write(CODE)
+
+        corpus = CorpusAnalyzer(workers=1, cache_path=self.path)
+        cold = corpus.analyze([source])
+        warm = corpus.analyze([source])
+        self.assertEqual(cold['result_cache']['misses'], 1)
+        self.assertEqual(warm['result_cache'], {'hits': 1, 'misses': 0, 'evictions': 0})
+        self.assertEqual(warm['token_distribution'], cold['token_distribution'])
+        self.assertEqual(warm['validation'], cold['validation'])
+
+
+if __name__ == '__main__':
+    unittest.main()
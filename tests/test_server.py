@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from src.morphological_lexer import MorphologicalLexer
+from src import server as server_module
+from src.server import LexerClient, LexerServer
+from src.validation_framework import ValidationFramework
+
+
+CODE = "def processUserData(pre_processed_input):\n    bad_Name = 1 @\n"
+
+
+class TestLexerServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = LexerServer(workers=0, queue_size=4, batch_size=8)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def send(self, *requests):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+        for request in requests:
+            writer.write((request if isinstance(request, str) else json.dumps(request))
+                         .encode() + b'\n')
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in requests]
+        writer.close()
+        return responses
+
+    async def test_operations(self):
+        tokenized, validated, analyzed = await self.send(
+            {'id': 1, 'op': 'tokenize', 'code': CODE},
+            {'id': 2, 'op': 'validate', 'code': CODE},
+            {'id': 3, 'op': 'analyze', 'code': CODE})
+
+        tokens = MorphologicalLexer().tokenize(CODE)
+        self.assertEqual(tokenized['id'], 1)
+        self.assertEqual([t['value'] for t in tokenized['result']], [t.value for t in tokens])
+        self.assertEqual(tokenized['result'][1]['morphemes'], tokens[1].morphemes)
+        self.assertEqual(validated['result'], ValidationFramework().validate_tokens(tokens))
+        self.assertEqual(analyzed['result']['total_tokens'], len(tokens))
+
+    async def test_errors(self):
+        responses = await self.send('not json', {'id': 7, 'op': 'compile', 'code': ''},
+                                    {'id': 8, 'op': 'tokenize'})
+        self.assertEqual([r['ok'] for r in responses], [False, False, False])
+        self.assertEqual([r['id'] for r in responses], [None, 7, 8])
+
+    async def test_concurrent_clients_are_batched_and_bounded(self):
+        batches = await asyncio.gather(*(
+            self.send(*({'id': i, 'op': 'tokenize', 'code': CODE} for i in range(20)))
+            for _ in range(10)))
+        self.assertTrue(all(r['ok'] for batch in batches for r in batch))
+
+        stats, = await self.send({'op': 'stats'})
+        stats = stats['result']
+        self.assertEqual(stats['errors'], 0)
+        self.assertLessEqual(stats['max_queue_depth'], 4)
+        self.assertGreater(stats['mean_batch_size'], 1)
+        self.assertIsNotNone(stats['latency']['p99'])
+
+    async def test_slow_request_does_not_delay_other_connections(self):
+        process_request = server_module.process_request
+
+        def slow_process_request(op, code, *args):
+            if code == 'slow':
+                time.sleep(0.5)
+            return process_request(op, code, *args)
+
+        with mock.patch.object(server_module, 'process_request', slow_process_request):
+            slow = asyncio.ensure_future(self.send({'op': 'tokenize', 'code': 'slow'}))
+            await asyncio.sleep(0.05)
+            started = time.perf_counter()
+            fast, = await self.send({'op': 'tokenize', 'code': 'x = 1'})
+            elapsed = time.perf_counter() - started
+            self.assertFalse(slow.done())
+            (slow_reply,) = await slow
+
+        self.assertTrue(fast['ok'] and slow_reply['ok'])
+        self.assertLess(elapsed, 0.25)
+
+
+class TestOffloadAndClient(unittest.IsolatedAsyncioTestCase):
+    async def test_large_requests_use_pool_over_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'lexer.sock')
+            server = LexerServer(path=path, workers=1, large_request=100)
+            await server.start()
+            try:
+                def use_client():
+                    with LexerClient(path, timeout=30) as client:
+                        large = client.call('tokenize', CODE * 10)
+                        small = client.call('tokenize', 'x = 1')
+                        with self.assertRaises(RuntimeError):
+                            client.call('compile', '')
+                        return large, small
+
+                large, small = await asyncio.get_running_loop().run_in_executor(
+                    None, use_client)
+                self.assertEqual(len(large), 10 * len(MorphologicalLexer().tokenize(CODE)))
+                self.assertEqual(len(small), 3)
+                self.assertEqual(server.stats()['offloaded'], 1)
+            finally:
+                await server.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
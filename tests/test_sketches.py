@@ -0,0 +1,98 @@
+import pickle
+import random
+import unittest
+from collections import Counter
+from src.sketches import (AnalysisSketches, CountMinSketch, HeavyHitters, HyperLogLog,
+                          Reservoir, stable_hash)
+
+
+def zipf_stream(length, vocabulary, seed=7):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(vocabulary)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    return rng.choices(words, weights, k=length)
+
+
+class TestSketches(unittest.TestCase):
+    def test_hyperloglog_error(self):
+        sketch = HyperLogLog.for_error(0.02)
+        self.assertLessEqual(sketch.standard_error, 0.02)
+        for i in range(50000):
+            sketch.add(f"item{i}")
+        self.assertAlmostEqual(sketch.estimate(), 50000, delta=50000 * 4 * sketch.standard_error)
+
+        small = HyperLogLog()
+        for item in ('a', 'b', 'c', 'a'):
+            small.add(item)
+        self.assertEqual(small.estimate(), 3)
+        with self.assertRaises(ValueError):
+            HyperLogLog(2)
+
+    def test_count_min_bounds(self):
+        stream = zipf_stream(20000, 2000)
+        sketch = CountMinSketch.for_error(0.001, 0.01)
+        for word in stream:
+            sketch.add(word)
+        bound = sketch.epsilon * sketch.total
+        for word, count in Counter(stream).items():
+            estimate = sketch.estimate(word)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate, count + bound)
+        with self.assertRaises(ValueError):
+            sketch.merge(CountMinSketch(10, 2))
+
+    def test_heavy_hitters(self):
+        stream = zipf_stream(20000, 2000)
+        sketch, top = CountMinSketch.for_error(0.001, 0.01), HeavyHitters(10)
+        for word in stream:
+            top.offer(word, sketch.add(word))
+        expected = [word for word, _ in Counter(stream).most_common(5)]
+        self.assertEqual([word for word, _ in top.top(5)], expected)
+
+    def test_merge_equals_single_pass(self):
+        stream = zipf_stream(10000, 3000)
+        whole, left, right = AnalysisSketches(), AnalysisSketches(), AnalysisSketches()
+        for index, word in enumerate(stream):
+            whole.add_identifier(word, [word[:4], word[4:]])
+            (left if index % 2 else right).add_identifier(word, [word[:4], word[4:]])
+        merged = left.merge(pickle.loads(pickle.dumps(right)))
+
+        self.assertEqual(merged.unique_morphemes.estimate(), whole.unique_morphemes.estimate())
+        self.assertEqual(merged.morphemes.table, whole.morphemes.table)
+        self.assertEqual(merged.examples.sample(), whole.examples.sample())
+        self.assertEqual(merged.top_morphemes.top(3), whole.top_morphemes.top(3))
+        self.assertEqual(merged.identifier_frequency('word0'), whole.identifier_frequency('word0'))
+
+    def test_reservoir_samples_distinct_items(self):
+        reservoir = Reservoir(5)
+        for word in zipf_stream(5000, 100):
+            reservoir.add(word)
+        sample = reservoir.sample()
+        self.assertEqual(len(set(sample)), 5)
+        kept = sorted(set(zipf_stream(5000, 100)), key=stable_hash)[:5]
+        self.assertEqual(sample, sorted(kept))
+
+    def test_approximate_analysis_memory_is_flat(self):
+        import tracemalloc
+        from src.morphological_lexer import MorphologicalLexer
+        from src.result_analyzer import ResultAnalyzer
+
+        lexer = MorphologicalLexer(metrics_level='off', identifier_cache_size=256)
+        analyzer = ResultAnalyzer(approximate=True)
+        batches = (' '.join(f"load{batch}x{i}Item" for i in range(1000))
+                   for batch in range(10))
+        tracemalloc.start()
+        try:
+            for batch, code in enumerate(batches):
+                analyzer.update(lexer.tokenize(code))
+                if batch == 1:
+                    warm = tracemalloc.get_traced_memory()[0]
+            grown = tracemalloc.get_traced_memory()[0] - warm
+        finally:
+            tracemalloc.stop()
+        # 8K more unique identifiers; interning them alone takes ~1 MB
+        self.assertLess(grown, 256 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import itertools
+import unittest
+from src.morphological_lexer import MorphologicalLexer
+
+
+CODE = '''
+def processUserData(pre_processed_input):
+    message = "a string literal\\n that \\"spans\\" chunks"
+    MAX_RETRY_COUNT = 3.14159
+    return unvalidatedResult @ 42
+'''
+
+
+class TestIterTokens(unittest.TestCase):
+    def setUp(self):
+        self.lexer = MorphologicalLexer()
+
+    def test_matches_tokenize_for_any_chunk_size(self):
+        expected = self.lexer.tokenize(CODE)
+        for chunk_size in (1, 2, 3, 7, 16, 1024):
+            lexer = MorphologicalLexer()
+            tokens = list(lexer.iter_tokens(io.StringIO(CODE),
+                                            chunk_size=chunk_size))
+            self.assertEqual(tokens, expected, chunk_size)
+            self.assertEqual(lexer.error_count, 1)
+
+    def test_accepts_binary_and_chunk_iterables(self):
+        expected = self.lexer.tokenize(CODE)
+        encoded = io.BytesIO(CODE.encode('utf-8'))
+        self.assertEqual(list(self.lexer.iter_tokens(encoded, chunk_size=5)),
+                         expected)
+        chunks = [CODE[i:i + 4] for i in range(0, len(CODE), 4)]
+        self.assertEqual(list(self.lexer.iter_tokens(chunks)), expected)
+
+    def test_first_token_is_lazy(self):
+        endless = itertools.chain(["first second "],
+                                  itertools.repeat("x = 1\n"))
+        tokens = self.lexer.iter_tokens(endless)
+        self.assertEqual(next(tokens).value, 'first')
+        tokens.close()
+
+    def test_unterminated_string_is_bounded(self):
+        code = '"never closed ' + 'word ' * 50
+        tokens = list(self.lexer.iter_tokens(code, chunk_size=8,
+                                             max_token_size=32))
+        self.assertEqual(tokens, MorphologicalLexer().tokenize(code))
+
+    def test_word_boundary_keeps_left_context(self):
+        expected = self.lexer.tokenize('3def x')
+        self.assertEqual([t.type for t in expected], ['number', 'identifier', 'identifier'])
+        for engine in ('regex', 'dfa'):
+            lexer = MorphologicalLexer(engine=engine)
+            self.assertEqual(list(lexer.iter_tokens(['3de', 'f x'])), expected, engine)
+            self.assertEqual(list(lexer.iter_tokens('3def x', chunk_size=2)), expected, engine)
+
+    def test_unrecognized_character_does_not_hold_back_output(self):
+        # Only a run with a quote may still open a string literal; '@' is
+        # final as soon as the next token is found
+        read = []
+        chunks = itertools.chain(["a @ b = 1\n"], itertools.repeat("x"))
+        tokens = self.lexer.iter_tokens(read.append(chunk) or chunk for chunk in chunks)
+        self.assertEqual([next(tokens).value for _ in range(4)], ['a', 'b', '=', '1'])
+        self.assertLess(len(read), 3)
+        tokens.close()
+
+        code = 'left @ right ' * 200
+        lexer = MorphologicalLexer()
+        self.assertEqual(list(lexer.iter_tokens(code, chunk_size=2)),
+                         MorphologicalLexer().tokenize(code))
+        self.assertEqual(lexer.error_count, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
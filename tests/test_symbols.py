@@ -0,0 +1,61 @@
+import os
+import pickle
+import tempfile
+import unittest
+from src.morphological_lexer import MorphologicalLexer
+from src.symbols import SymbolTable, shared_symbols
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_intern_and_resolve(self):
+        table = SymbolTable(['process', 'user'])
+        self.assertEqual(table.intern_all(['user', 'data', 'process', 'data']), (1, 2, 0, 2))
+        self.assertEqual(table.resolve([2, 0]), ['data', 'process'])
+        self.assertEqual(table.get('missing'), None)
+        self.assertIn('data', table)
+        self.assertEqual(list(table), ['process', 'user', 'data'])
+
+        # Equal strings built separately come back as one object
+        first, second = ''.join(['us', 'er']), ''.join(['u', 'ser'])
+        self.assertIs(table.symbol(table.intern(first)), table.symbol(table.intern(second)))
+
+    def test_serialization_keeps_ids(self):
+        table = SymbolTable(['process', 'ür', 'Data'])
+        self.assertEqual(list(pickle.loads(pickle.dumps(table))), list(table))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'symbols.json')
+            table.save(path)
+            loaded = SymbolTable.load(path)
+        self.assertEqual(loaded.intern('Data'), 2)
+        self.assertEqual(loaded.intern('new'), 3)
+
+    def test_remap(self):
+        table = SymbolTable(['a', 'b'])
+        other = SymbolTable(['c', 'b'])
+        self.assertEqual(table.remap(other), [2, 1])
+        self.assertEqual(table.remap(table), [0, 1, 2])
+
+    def test_lexer_tokens_carry_shared_ids(self):
+        tokens = MorphologicalLexer(intern_morphemes=True).tokenize(
+            "processUserData = process_user")
+        symbols = shared_symbols()
+        first, second = tokens[0], tokens[2]
+        self.assertEqual(symbols.resolve(first.morpheme_ids), first.morphemes)
+        self.assertEqual(symbols.resolve(second.morpheme_ids), second.morphemes)
+        self.assertEqual(first.morpheme_ids[0], second.morpheme_ids[0])
+        self.assertIs(first.morphemes[0], second.morphemes[0])
+
+    def test_lexer_does_not_grow_shared_table_by_default(self):
+        symbols = shared_symbols()
+        lexer = MorphologicalLexer(identifier_cache_size=64)
+        size = len(symbols)
+        for batch in range(20):
+            code = ' '.join(f"fetch{batch}x{i}Value" for i in range(500))
+            tokens = lexer.tokenize(code)
+            self.assertEqual(tokens[0].morpheme_ids, ())
+        self.assertEqual(len(symbols), size)
+
+
+if __name__ == '__main__':
+    unittest.main()
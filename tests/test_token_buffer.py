@@ -0,0 +1,62 @@
+import unittest
+from src.morphological_lexer import MorphologicalLexer
+from src.result_analyzer import ResultAnalyzer
+from src.token_buffer import TokenBuffer
+from src.validation_framework import ValidationFramework
+
+
+CODE = """
+def processUserData(pre_processed_input):
+    MAX_RETRY_COUNT = 3
+    for item in pre_processed_input:
+        if item > MAX_RETRY_COUNT:
+            unvalidatedResult += processImplementation(item, "x")
+    return unvalidatedResult
+"""
+
+
+class TestTokenBuffer(unittest.TestCase):
+    def setUp(self):
+        self.lexer = MorphologicalLexer()
+        self.tokens = self.lexer.tokenize(CODE)
+        self.buffer = self.lexer.tokenize_buffer(CODE)
+
+    def test_matches_token_list(self):
+        self.assertEqual(len(self.buffer), len(self.tokens))
+        self.assertEqual(list(self.buffer), self.tokens)
+        self.assertEqual(self.buffer.to_tokens(), self.tokens)
+
+    def test_indexing(self):
+        self.assertEqual(self.buffer[0], self.tokens[0])
+        self.assertEqual(self.buffer[-1], self.tokens[-1])
+        self.assertEqual(self.buffer[2:5], self.tokens[2:5])
+        self.assertEqual(self.buffer.value(1), 'processUserData')
+        with self.assertRaises(IndexError):
+            self.buffer[len(self.tokens)]
+
+    def test_interned_morphemes(self):
+        indices = [i for i, t in enumerate(self.tokens)
+                   if t.value == 'pre_processed_input']
+        self.assertEqual(len(indices), 2)
+        first, second = (self.buffer.morphemes(i) for i in indices)
+        self.assertIs(first, second)
+
+    def test_from_tokens_round_trip(self):
+        buffer = TokenBuffer.from_tokens(self.tokens, CODE)
+        self.assertEqual(buffer.to_tokens(), self.tokens)
+
+    def test_analysis_accepts_buffer(self):
+        analyzer = ResultAnalyzer()
+        expected = analyzer.analyze_tokens(self.tokens)
+        actual = analyzer.analyze_tokens(self.buffer)
+        expected.pop('timestamp')
+        actual.pop('timestamp')
+        self.assertEqual(actual, expected)
+
+        validator = ValidationFramework()
+        self.assertEqual(validator.validate_tokens(self.buffer),
+                         validator.validate_tokens(self.tokens))
+
+
+if __name__ == '__main__':
+    unittest.main()
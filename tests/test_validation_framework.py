@@ -0,0 +1,115 @@
+import unittest
+from src.morphological_lexer import MorphologicalLexer
+from src.validation_framework import ValidationFramework, Violation
+
+
+CODE = "Bad_name = 1\nOther_Bad = Bad_name + good_name\nfine = Third_bad"
+
+
+class TestValidationFramework(unittest.TestCase):
+    def setUp(self):
+        self.tokens = MorphologicalLexer().tokenize(CODE)
+        self.validator = ValidationFramework()
+
+    def test_fused_matches_eager(self):
+        eager = self.validator.validate_tokens(self.tokens)
+        fused = self.validator.validate_tokens(self.tokens, fused=True)
+
+        self.assertEqual(list(fused), list(eager))
+        for rule, result in eager.items():
+            self.assertEqual(fused[rule]['valid'], result['valid'])
+            self.assertEqual([v.to_dict() for v in fused[rule]['violations']],
+                             result['violations'])
+        self.assertEqual(len(eager['naming_convention']['violations']), 4)
+
+    def test_violations_are_lazy_records(self):
+        result = self.validator.validate_fused(self.tokens)
+        violation = result['naming_convention']['violations'][0]
+
+        self.assertIsInstance(violation, Violation)
+        self.assertEqual(violation.index, 0)
+        self.assertEqual(violation.offset, 0)
+        self.assertEqual(violation['issue'], 'Invalid naming convention')
+        self.assertIn("value='Bad_name'", violation['token'])
+
+    def test_violation_cap_and_early_exit(self):
+        checked = []
+
+        def no_numbers(token):
+            checked.append(token)
+            return token.type != 'number'
+
+        self.validator.register_rule('no_numbers', no_numbers, 'Number found')
+        result = self.validator.validate_tokens(
+            self.tokens, max_violations={'naming_convention': 2, 'no_numbers': 1})
+
+        self.assertEqual(len(result['naming_convention']['violations']), 2)
+        self.assertTrue(result['naming_convention']['truncated'])
+        self.assertEqual(result['naming_convention']['violations'][-1].index, 3)
+        self.assertEqual(len(result['no_numbers']['violations']), 1)
+        self.assertFalse(result['no_numbers']['truncated'])
+        # Uncapped rules keep the pass going to the end
+        self.assertEqual(len(checked), len(self.tokens))
+
+        # The pass stops once every rule found one violation past its cap
+        only_numbers = ValidationFramework()
+        for rules in (only_numbers.validation_rules, only_numbers.token_checks,
+                      only_numbers.sequence_checks):
+            rules.clear()
+        only_numbers.register_rule('no_numbers', no_numbers, 'Number found')
+        checked.clear()
+        result = only_numbers.validate_tokens(self.tokens, max_violations=0)
+        self.assertEqual(result['no_numbers'],
+                         {'valid': False, 'violations': [], 'truncated': True})
+        # Stops at '1' (token 2)
+        self.assertEqual(len(checked), 3)
+
+    def test_cap_edges(self):
+        tokens = MorphologicalLexer().tokenize('badName_mixed = 1')
+
+        # A cap of 0 records nothing but still reports invalid input
+        naming = self.validator.validate_tokens(tokens, max_violations=0)['naming_convention']
+        self.assertEqual((naming['valid'], naming['violations'], naming['truncated']),
+                         (False, [], True))
+
+        # Exactly cap violations are not truncated
+        naming = self.validator.validate_tokens(tokens, max_violations=1)['naming_convention']
+        self.assertEqual((naming['valid'], len(naming['violations']), naming['truncated']),
+                         (False, 1, False))
+        clean = self.validator.validate_tokens(tokens[1:], max_violations=0)['naming_convention']
+        self.assertEqual((clean['valid'], clean['truncated']), (True, False))
+
+    def test_custom_pairwise_rule(self):
+        self.validator.register_rule(
+            'no_double_identifier',
+            lambda a, b: not (a.type == b.type == 'identifier'),
+            'Adjacent identifiers', pairwise=True)
+        tokens = MorphologicalLexer().tokenize("a b = c")
+
+        eager = self.validator.validate_tokens(tokens)['no_double_identifier']
+        fused = self.validator.validate_fused(tokens)['no_double_identifier']
+        self.assertEqual(len(eager['violations']), 1)
+        self.assertEqual(fused['violations'][0].to_dict(), eager['violations'][0])
+
+    def test_unfused_rule_still_runs(self):
+        def no_bad(tokens):
+            violations = [{'token': str(token), 'issue': 'Bad in name'}
+                          for token in tokens if 'Bad' in token.value]
+            return {'valid': not violations, 'violations': violations}
+
+        self.validator.validation_rules['no_bad'] = no_bad
+        eager = self.validator.validate_tokens(self.tokens)['no_bad']
+        fused = self.validator.validate_tokens(self.tokens, fused=True)['no_bad']
+        self.assertEqual(fused['violations'], eager['violations'])
+        self.assertEqual(len(fused['violations']), 3)
+        self.assertFalse(fused['truncated'])
+
+        capped = self.validator.validate_tokens(self.tokens, max_violations=2)['no_bad']
+        self.assertEqual(capped['violations'], eager['violations'][:2])
+        self.assertTrue(capped['truncated'])
+        exact = self.validator.validate_tokens(self.tokens, max_violations=3)['no_bad']
+        self.assertFalse(exact['truncated'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from main import parse_args, run_watch
+from src.corpus import CorpusAnalyzer
+from src.watch import CorpusWatcher
+
+
+SOURCES = {
+    'a.py': "def processUserData(pre_processed_input):\n    return 1\n",
+    'pkg/b.py': "MAX_RETRY_COUNT = 3\nunvalidatedResult = MAX_RETRY_COUNT\nretry_Count = 1\n",
+    'pkg/c.py': "class UserAccount:\n    user_name = \"x\"\n"
+}
+
+
+def comparable(report):
+    report = dict(report)
+    for key in ('timestamp', 'updated', 'lexer_metrics', 'changes'):
+        report.pop(key, None)
+    report['validation'] = {
+        rule: sorted(map(str, outcome['violations']))
+        for rule, outcome in report['validation'].items()
+    }
+    return report
+
+
+class TestCorpusWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        for name, code in SOURCES.items():
+            self.write(name, code)
+        self.watcher = CorpusWatcher([self.tmp.name], workers=1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, code):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), 'w') as handle:
+            handle.write(code)
+
+    def assert_matches_full_run(self):
+        expected = CorpusAnalyzer(workers=1).analyze([self.tmp.name])
+        self.assertEqual(comparable(self.watcher.report()), comparable(expected))
+
+    def test_initial_poll(self):
+        changes = self.watcher.poll()
+        self.assertEqual(changes['added'], sorted(map(self.path, SOURCES)))
+        self.assert_matches_full_run()
+        self.assertEqual(self.watcher.poll(), {'added': [], 'modified': [], 'removed': []})
+
+    def test_changes_update_totals(self):
+        self.watcher.poll()
+        self.write('pkg/b.py', "retryCount = 1\n")
+        self.write('pkg/d.py', "newFeature_flag = processUserData\n")
+        os.remove(self.path('pkg/c.py'))
+
+        changes = self.watcher.poll()
+        self.assertEqual(changes, {'added': [self.path('pkg/d.py')],
+                                   'modified': [self.path('pkg/b.py')],
+                                   'removed': [self.path('pkg/c.py')]})
+        self.assert_matches_full_run()
+        self.assertNotIn('MAX_RETRY_COUNT', str(self.watcher.report()['validation']))
+
+        for name in list(SOURCES) + ['pkg/d.py']:
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+        self.watcher.poll()
+        report = self.watcher.report()
+        self.assertEqual(report['total_tokens'], 0)
+        self.assertEqual(report['morpheme_frequency'], {})
+        self.assertEqual(self.watcher.analyzer.morpheme_pairs, {})
+
+    def test_cli_writes_report_per_change(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            status = run_watch(parse_args([self.tmp.name, '--watch', '0']), polls=2)
+        self.assertEqual(status, 0)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        report = json.loads(lines[0])
+        self.assertEqual(report['files_analyzed'], 3)
+        self.assertEqual(len(report['changes']['added']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()